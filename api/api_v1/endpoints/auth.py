@@ -3,11 +3,14 @@ from typing import Any
 
 from fastapi import APIRouter, Body, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
 
 from core.config import settings
-from core.security import create_access_token, get_password_hash, verify_password
-from core.db import get_db
+from core.security import create_access_token, get_password_hash_async, hash_busy, verify_password_async
+from core.hash_pool import HashPoolBusy
+from core.db import get_async_db
 from models.user import User
 from api.deps import get_current_user
 
@@ -15,8 +18,8 @@ router = APIRouter()
 
 
 @router.post("/register", response_model=dict, status_code=status.HTTP_201_CREATED)
-def register(
-    db: Session = Depends(get_db),
+async def register(
+    db: AsyncSession = Depends(get_async_db),
     username: str = Body(...),
     email: str = Body(...),
     password: str = Body(...),
@@ -24,32 +27,34 @@ def register(
     """
     用户注册
     """
-    # 检查用户名是否已存在
-    user_by_username = db.query(User).filter(User.username == username).first()
-    if user_by_username:
+    # 检查用户名、邮箱是否已存在 (一次查询)
+    result = await db.execute(
+        select(User.username, User.email).where(or_(User.username == username, User.email == email))
+    )
+    existing = result.all()
+    if any(row.username == username for row in existing):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
-    
-    # 检查邮箱是否已存在
-    user_by_email = db.query(User).filter(User.email == email).first()
-    if user_by_email:
+    if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    # 创建新用户
-    hashed_password = get_password_hash(password)
+    # 创建新用户 (哈希在独立线程池里算，不阻塞事件循环)
+    try:
+        hashed_password = await get_password_hash_async(password)
+    except HashPoolBusy:
+        raise hash_busy()
     user = User(
         username=username,
         email=email,
         hashed_password=hashed_password
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
     
     return {
         "message": "User registered successfully",
@@ -59,16 +64,21 @@ def register(
 
 
 @router.post("/login", response_model=dict)
-def login(
-    db: Session = Depends(get_db),
+async def login(
+    db: AsyncSession = Depends(get_async_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     用户登录，获取访问令牌
     """
     # 查找用户
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    result = await db.execute(select(User).where(User.username == form_data.username))
+    user = result.scalars().first()
+    try:
+        password_ok = user is not None and await verify_password_async(form_data.password, user.hashed_password)
+    except HashPoolBusy:
+        raise hash_busy()
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password"
@@ -87,7 +97,7 @@ def login(
 
 
 @router.get("/me", response_model=dict)
-def read_users_me(
+async def read_users_me(
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
@@ -0,0 +1,34 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from models.user import User
+from api.deps import get_current_user
+from core.leaderboard import leaderboard, watch_points
+
+router = APIRouter()
+
+# 积分变更提交后同步到内存排行榜
+watch_points(leaderboard, User)
+
+
+@router.get("/", response_model=dict)
+async def get_top(limit: int = Query(50, ge=1, le=200)) -> Any:
+    """
+    积分排行榜前 N 名
+    """
+    return {"total": len(leaderboard), "items": leaderboard.top(limit)}
+
+
+@router.get("/me", response_model=dict)
+async def get_my_rank(
+    radius: int = Query(5, ge=0, le=50),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    当前用户的名次及前后的玩家
+    """
+    rank = leaderboard.rank(current_user.id)
+    if rank is None:
+        raise HTTPException(status_code=404, detail="User not ranked")
+    return {"rank": rank, "total": len(leaderboard), "items": leaderboard.around(current_user.id, radius)}
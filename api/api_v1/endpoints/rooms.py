@@ -1,62 +1,71 @@
-import random
-import string
 from typing import Any, List
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy.future import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.config import settings
-from core.db import get_db, get_async_db
+from core.db import get_async_db
 from models.room import Room, PlayerInRoom
 from models.user import User
 from api.deps import get_current_user
+from core.room_store import room_store
+from core.room_codes import room_code_allocator
+from core import room_repo
 
 router = APIRouter()
 
+# 房间号唯一约束冲突 (只会在多进程部署时出现) 后的重试次数
+ROOM_CODE_RETRIES = 3
 
-def generate_room_code(length: int = settings.ROOM_CODE_LENGTH) -> str:
+
+def is_room_code_conflict(error: IntegrityError) -> bool:
     """
-    生成随机房间号
+    是否是 rooms.room_code 唯一约束冲突
+    SQLite: "UNIQUE constraint failed: rooms.room_code"；MySQL: "Duplicate entry ... for key 'ix_rooms_room_code'"
     """
-    characters = string.ascii_uppercase + string.digits
-    return ''.join(random.choice(characters) for _ in range(length))
+    return "room_code" in str(error.orig)
 
 
 @router.post("/", response_model=dict)
 async def create_room(
     max_players: int = settings.MAX_PLAYERS_PER_ROOM,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_async_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Any:
     """
     创建新房间
     """
-    # 生成唯一房间号
-    while True:
-        room_code = generate_room_code()
-        # 检查房间号是否已存在
-        result = await db.execute(select(Room).filter(Room.room_code == room_code))
-        if not result.scalars().first():
+    for _ in range(ROOM_CODE_RETRIES):
+        # 房间号由分配器保证不重复，不用查库
+        room_code = room_code_allocator.allocate()
+        room = Room(
+            room_code=room_code,
+            max_players=max_players,
+            created_by=current_user.id
+        )
+        # 创建者默认为管理员，和房间在同一次提交里写入
+        room.members.append(PlayerInRoom(user_id=current_user.id, is_admin=True))
+        db.add(room)
+        try:
+            await db.commit()
             break
-    
-    # 创建房间
-    room = Room(
-        room_code=room_code,
-        max_players=max_players,
-        created_by=current_user.id
-    )
-    db.add(room)
-    await db.flush()  # 获取room.id
-    
-    # 添加创建者到房间
-    player_in_room = PlayerInRoom(
-        user_id=current_user.id,
-        room_id=room.id,
-        is_admin=True  # 创建者默认为管理员
-    )
-    db.add(player_in_room)
-    await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            if not is_room_code_conflict(e):
+                # 其他约束失败 (例如创建者已不存在)：号码没用上，归还后照常报错
+                room_code_allocator.release(room_code)
+                raise
+            # 号码被其他进程占用：保持占用状态，换一个重试
+        except Exception:
+            await db.rollback()
+            room_code_allocator.release(room_code)
+            raise
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Could not allocate a room code"
+        )
     
     return {
         "message": "Room created successfully",
@@ -67,42 +76,23 @@ async def create_room(
 
 @router.get("/", response_model=List[dict])
 async def get_rooms(
-    db: Session = Depends(get_async_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Any:
     """
-    获取所有房间列表
+    获取所有房间列表 (人数在同一条查询里聚合)
     """
-    result = await db.execute(select(Room))
-    rooms = result.scalars().all()
-    
-    room_list = []
-    for room in rooms:
-        # 获取房间内玩家数量
-        player_count = await db.scalar(
-            select(PlayerInRoom).filter(PlayerInRoom.room_id == room.id).count()
-        )
-        
-        room_list.append({
-            "room_code": room.room_code,
-            "max_players": room.max_players,
-            "current_players": player_count,
-            "is_game_started": room.is_game_started,
-            "created_at": room.created_at
-        })
-    
-    return room_list
+    return await room_repo.list_rooms(db)
 
 
 @router.get("/{room_code}", response_model=dict)
 async def get_room_detail(
     room_code: str,
-    db: Session = Depends(get_async_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Any:
     """
     获取房间详情
     """
-    result = await db.execute(select(Room).filter(Room.room_code == room_code))
-    room = result.scalars().first()
+    room = await room_repo.get_room_with_members(db, room_code)
     
     if not room:
         raise HTTPException(
@@ -110,48 +100,23 @@ async def get_room_detail(
             detail="Room not found"
         )
     
-    # 获取房间内玩家列表
-    result = await db.execute(
-        select(PlayerInRoom).filter(PlayerInRoom.room_id == room.id)
-    )
-    players = result.scalars().all()
-    
-    player_list = []
-    for player in players:
-        # 获取玩家信息
-        result = await db.execute(select(User).filter(User.id == player.user_id))
-        user = result.scalars().first()
-        
-        player_list.append({
-            "user_id": user.id,
-            "username": user.username,
-            "is_ready": player.is_ready,
-            "is_admin": player.is_admin,
-            "joined_at": player.joined_at
-        })
-    
-    return {
-        "room_code": room.room_code,
-        "max_players": room.max_players,
-        "current_players": len(player_list),
-        "is_game_started": room.is_game_started,
-        "created_at": room.created_at,
-        "players": player_list
-    }
+    return room_repo.room_detail(room)
 
 
 @router.post("/{room_code}/join", response_model=dict)
 async def join_room(
     room_code: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_async_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Any:
     """
     加入房间
     """
-    # 查找房间
-    result = await db.execute(select(Room).filter(Room.room_code == room_code))
-    room = result.scalars().first()
+    # 房间状态以内存为准，先把未写回的修改落库再读
+    await room_store.flush_room(room_code)
+    
+    # 房间、人数、是否已在房间内一次查出
+    room, player_count, already_in = await room_repo.get_room_for_join(db, room_code, current_user.id)
     
     if not room:
         raise HTTPException(
@@ -160,9 +125,6 @@ async def join_room(
         )
     
     # 检查房间是否已满
-    player_count = await db.scalar(
-        select(PlayerInRoom).filter(PlayerInRoom.room_id == room.id).count()
-    )
     if player_count >= room.max_players:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -177,13 +139,7 @@ async def join_room(
         )
     
     # 检查用户是否已在房间内
-    result = await db.execute(
-        select(PlayerInRoom).filter(
-            PlayerInRoom.user_id == current_user.id,
-            PlayerInRoom.room_id == room.id
-        )
-    )
-    if result.scalars().first():
+    if already_in:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="You are already in this room"
@@ -197,6 +153,8 @@ async def join_room(
     )
     db.add(player_in_room)
     await db.commit()
+    # 成员变化后丢弃内存状态 (期间的修改先写回)，下次 WebSocket 事件重新加载
+    await room_store.evict(room_code)
     
     return {
         "message": "Joined room successfully",
@@ -208,14 +166,13 @@ async def join_room(
 async def leave_room(
     room_code: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_async_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Any:
     """
     离开房间
     """
-    # 查找房间
-    result = await db.execute(select(Room).filter(Room.room_code == room_code))
-    room = result.scalars().first()
+    # 成员和管理员信息都在内存状态里，不用再把整个房间的成员重新查一遍
+    room = await room_store.get(room_code, db)
     
     if not room:
         raise HTTPException(
@@ -223,44 +180,16 @@ async def leave_room(
             detail="Room not found"
         )
     
-    # 查找用户在房间中的记录
-    result = await db.execute(
-        select(PlayerInRoom).filter(
-            PlayerInRoom.user_id == current_user.id,
-            PlayerInRoom.room_id == room.id
-        )
-    )
-    player_in_room = result.scalars().first()
-    
-    if not player_in_room:
+    if current_user.id not in room.members:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="You are not in this room"
         )
     
-    # 检查是否为管理员
-    is_admin = player_in_room.is_admin
-    
-    # 删除用户在房间中的记录
-    await db.delete(player_in_room)
-    
-    # 如果是管理员且房间还有其他玩家，需要转移管理员权限
-    if is_admin:
-        # 获取房间内剩余玩家
-        result = await db.execute(
-            select(PlayerInRoom).filter(PlayerInRoom.room_id == room.id)
-        )
-        remaining_players = result.scalars().all()
-        
-        if remaining_players:
-            # 选择最早加入的玩家作为新管理员
-            new_admin = min(remaining_players, key=lambda p: p.joined_at)
-            new_admin.is_admin = True
-        else:
-            # 如果没有其他玩家，删除房间
-            await db.delete(room)
-    
-    await db.commit()
+    # 移除玩家；管理员离开时转给最早加入的玩家，最后一人离开时删除房间
+    room.remove_member(current_user.id)
+    room_store.mark_dirty(room)
+    await room_store.flush_room(room_code)
     
     return {
         "message": "Left room successfully"
@@ -2,14 +2,17 @@ import json
 from typing import Dict, List, Optional, Set
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import Session
 
 from core.config import settings
-from core.db import get_async_db
-from models.room import Room, PlayerInRoom
+from core.db import AsyncSessionLocal, get_async_db
+from core.security import decode_token
+from core.room_store import RoomState, room_store
+from app.utils.wire_codec import encode_frame
 from models.user import User
+from api.deps import user_cache
 
 router = APIRouter()
 
@@ -18,32 +21,50 @@ class ConnectionManager:
     def __init__(self):
         # 存储房间连接：room_code -> Set[WebSocket]
         self.active_connections: Dict[str, Set[WebSocket]] = {}
+        # 握手时协商了二进制协议的连接
+        self.binary_connections: Set[WebSocket] = set()
     
-    async def connect(self, websocket: WebSocket, room_code: str):
+    async def connect(self, websocket: WebSocket, room_code: str, proto: Optional[str] = None):
         await websocket.accept()
         if room_code not in self.active_connections:
             self.active_connections[room_code] = set()
         self.active_connections[room_code].add(websocket)
+        if proto == "bin":
+            self.binary_connections.add(websocket)
     
     def disconnect(self, websocket: WebSocket, room_code: str):
+        self.binary_connections.discard(websocket)
         if room_code in self.active_connections:
             self.active_connections[room_code].discard(websocket)
             if not self.active_connections[room_code]:
                 del self.active_connections[room_code]
     
+    async def _send(self, websocket: WebSocket, message: dict, frame: Optional[bytes]):
+        if frame is not None and websocket in self.binary_connections:
+            await websocket.send_bytes(frame)
+        else:
+            await websocket.send_json(message)
+    
+    @staticmethod
+    def _encode(message: dict) -> Optional[bytes]:
+        return encode_frame([(message.get("event"), message.get("data"), 0)])
+    
     async def broadcast(self, room_code: str, message: dict):
         """
         向房间内所有连接的客户端广播消息
         """
         if room_code in self.active_connections:
+            # 二进制帧只编码一次，所有二进制连接共用
+            frame = self._encode(message) if self.binary_connections else None
             for connection in self.active_connections[room_code].copy():
-                await connection.send_json(message)
+                await self._send(connection, message, frame)
     
     async def send_personal_message(self, message: dict, websocket: WebSocket):
         """
         向特定客户端发送消息
         """
-        await websocket.send_json(message)
+        frame = self._encode(message) if websocket in self.binary_connections else None
+        await self._send(websocket, message, frame)
 
 
 manager = ConnectionManager()
@@ -53,12 +74,10 @@ oauth2_scheme_ws = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/lo
 
 async def get_current_user_ws(
     token: str = Depends(oauth2_scheme_ws),
-    db: Session = Depends(get_async_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = decode_token(token)
         user_id: str = payload.get("sub")
         if user_id is None:
             raise HTTPException(
@@ -71,7 +90,7 @@ async def get_current_user_ws(
             detail="Could not validate credentials",
         )
 
-    result = await db.execute(select(User).filter(User.id == user_id))
+    result = await db.execute(select(User).filter(User.id == int(user_id)))
     user = result.scalars().first()
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
@@ -84,13 +103,12 @@ async def get_current_user_ws(
 async def websocket_endpoint(
     websocket: WebSocket,
     room_code: str,
-    token: str
+    token: str,
+    proto: Optional[str] = None  # "bin" 协商二进制事件帧，缺省为 JSON
 ):
     # 验证用户
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = decode_token(token)
         user_id: str = payload.get("sub")
         if user_id is None:
             await websocket.close(code=1008)  # Policy violation
@@ -99,79 +117,80 @@ async def websocket_endpoint(
         await websocket.close(code=1008)
         return
     
-    # 获取数据库连接
-    db = next(get_async_db())
-    
-    try:
-        # 验证用户是否存在
-        result = await db.execute(select(User).filter(User.id == user_id))
-        user = result.scalars().first()
+    # 握手阶段用一个短会话查用户和房间，查完即释放连接，不在整个 WebSocket 生命周期里占着连接
+    async with AsyncSessionLocal() as db:
+        # 验证用户是否存在 (走鉴权用户缓存)
+        async def load(uid: int):
+            result = await db.execute(select(User).filter(User.id == uid))
+            return result.scalars().first()
+
+        user = await user_cache.get(int(user_id), load)
         if not user or not user.is_active:
             await websocket.close(code=1008)
             return
         
-        # 验证房间是否存在
-        result = await db.execute(select(Room).filter(Room.room_code == room_code))
-        room = result.scalars().first()
-        if not room:
-            await websocket.close(code=1008)
-            return
-        
-        # 验证用户是否在房间内
-        result = await db.execute(
-            select(PlayerInRoom).filter(
-                PlayerInRoom.user_id == user.id,
-                PlayerInRoom.room_id == room.id
-            )
-        )
-        player_in_room = result.scalars().first()
-        if not player_in_room:
-            await websocket.close(code=1008)
-            return
-        
-        # 接受连接
-        await manager.connect(websocket, room_code)
+        # 验证房间是否存在 (房间状态常驻内存，只有第一次访问时读库)
+        room = await room_store.get(room_code, db)
+    if not room:
+        await websocket.close(code=1008)
+        return
+    
+    # 验证用户是否在房间内
+    member = room.members.get(user.id)
+    if not member:
+        await websocket.close(code=1008)
+        return
+    
+    # 接受连接
+    await manager.connect(websocket, room_code, proto)
+    
+    try:
+        # 通知其他玩家有新玩家加入
+        await manager.broadcast(room_code, {
+            "event": "player_joined",
+            "data": {
+                "user_id": user.id,
+                "username": user.username,
+                "is_admin": member.is_admin
+            }
+        })
         
-        try:
-            # 通知其他玩家有新玩家加入
-            await manager.broadcast(room_code, {
-                "event": "player_joined",
-                "data": {
-                    "user_id": user.id,
-                    "username": user.username,
-                    "is_admin": player_in_room.is_admin
-                }
-            })
+        while True:
+            data = await websocket.receive_json()
+            event = data.get("event")
+            event_data = data.get("data", {})
             
-            while True:
-                data = await websocket.receive_json()
-                event = data.get("event")
-                event_data = data.get("data", {})
-                
-                if event == "player_ready":
-                    # 处理玩家准备
-                    await handle_player_ready(room, user, db, manager)
-                elif event == "player_unready":
-                    # 处理玩家取消准备
-                    await handle_player_unready(room, user, db, manager)
-                elif event == "start_game":
-                    # 处理开始游戏
-                    await handle_start_game(room, user, db, manager)
-                elif event == "game_action":
-                    # 处理游戏动作（示例）
-                    await handle_game_action(room, user, event_data, db, manager)
-        
-        except WebSocketDisconnect:
-            # 处理玩家断开连接
-            await handle_player_disconnect(room, user, db, manager)
-        finally:
-            manager.disconnect(websocket, room_code)
-    
+            # 每个事件重新取一次：REST 加入/离开会让内存状态失效重载，通常直接命中内存，
+            # 会话只在未命中时才真正拿连接
+            async with AsyncSessionLocal() as db:
+                room = await room_store.get(room_code, db)
+            if not room:
+                break
+            
+            if event == "player_ready":
+                # 处理玩家准备
+                await handle_player_ready(room, user, websocket, manager)
+            elif event == "player_unready":
+                # 处理玩家取消准备
+                await handle_player_unready(room, user, websocket, manager)
+            elif event == "start_game":
+                # 处理开始游戏
+                await handle_start_game(room, user, websocket, manager)
+            elif event == "game_action":
+                # 处理游戏动作（示例）
+                await handle_game_action(room, user, event_data, websocket, manager)
+    
+    except WebSocketDisconnect:
+        # 处理玩家断开连接
+        await handle_player_disconnect(room_code, user, manager)
     finally:
-        await db.close()
+        manager.disconnect(websocket, room_code)
+
+
+# 以下处理函数只读写内存中的房间状态，数据库由 room_store 在后台批量写回
 
 
-async def handle_player_ready(room: Room, user: User, db: Session, manager: ConnectionManager):
+async def handle_player_ready(room: RoomState, user: User, websocket: WebSocket, manager: ConnectionManager):
     """
     处理玩家准备事件
     """
@@ -182,28 +201,12 @@ async def handle_player_ready(room: Room, user: User, db: Session, manager: Conn
         }, websocket)
         return
     
-    result = await db.execute(
-        select(PlayerInRoom).filter(
-            PlayerInRoom.user_id == user.id,
-            PlayerInRoom.room_id == room.id
-        )
-    )
-    player_in_room = result.scalars().first()
-    
-    if not player_in_room:
+    member = room.members.get(user.id)
+    if not member:
         return
     
-    player_in_room.is_ready = True
-    await db.commit()
-    
-    # 获取房间内所有玩家
-    result = await db.execute(
-        select(PlayerInRoom).filter(PlayerInRoom.room_id == room.id)
-    )
-    players = result.scalars().all()
-    
-    # 检查是否所有玩家都已准备
-    all_ready = all(player.is_ready for player in players)
+    member.is_ready = True
+    room_store.mark_dirty(room)
     
     # 广播玩家准备状态
     await manager.broadcast(room.room_code, {
@@ -211,12 +214,12 @@ async def handle_player_ready(room: Room, user: User, db: Session, manager: Conn
         "data": {
             "user_id": user.id,
             "username": user.username,
-            "all_ready": all_ready
+            "all_ready": room.all_ready()
         }
     })
 
 
-async def handle_player_unready(room: Room, user: User, db: Session, manager: ConnectionManager):
+async def handle_player_unready(room: RoomState, user: User, websocket: WebSocket, manager: ConnectionManager):
     """
     处理玩家取消准备事件
     """
@@ -227,19 +230,12 @@ async def handle_player_unready(room: Room, user: User, db: Session, manager: Co
         }, websocket)
         return
     
-    result = await db.execute(
-        select(PlayerInRoom).filter(
-            PlayerInRoom.user_id == user.id,
-            PlayerInRoom.room_id == room.id
-        )
-    )
-    player_in_room = result.scalars().first()
-    
-    if not player_in_room:
+    member = room.members.get(user.id)
+    if not member:
         return
     
-    player_in_room.is_ready = False
-    await db.commit()
+    member.is_ready = False
+    room_store.mark_dirty(room)
     
     # 广播玩家取消准备状态
     await manager.broadcast(room.room_code, {
@@ -251,7 +247,7 @@ async def handle_player_unready(room: Room, user: User, db: Session, manager: Co
     })
 
 
-async def handle_start_game(room: Room, user: User, db: Session, manager: ConnectionManager):
+async def handle_start_game(room: RoomState, user: User, websocket: WebSocket, manager: ConnectionManager):
     """
     处理开始游戏事件
     """
@@ -263,49 +259,32 @@ async def handle_start_game(room: Room, user: User, db: Session, manager: Connec
         return
     
     # 检查是否为管理员
-    result = await db.execute(
-        select(PlayerInRoom).filter(
-            PlayerInRoom.user_id == user.id,
-            PlayerInRoom.room_id == room.id
-        )
-    )
-    player_in_room = result.scalars().first()
-    
-    if not player_in_room or not player_in_room.is_admin:
+    member = room.members.get(user.id)
+    if not member or not member.is_admin:
         await manager.send_personal_message({
             "event": "error",
             "data": {"message": "Only the room admin can start the game"}
         }, websocket)
         return
     
-    # 获取房间内所有玩家
-    result = await db.execute(
-        select(PlayerInRoom).filter(PlayerInRoom.room_id == room.id)
-    )
-    players = result.scalars().all()
-    
     # 检查是否所有玩家都已准备
-    all_ready = all(player.is_ready for player in players)
-    if not all_ready:
+    if not room.all_ready():
         await manager.send_personal_message({
             "event": "error",
             "data": {"message": "All players must be ready to start the game"}
         }, websocket)
         return
     
-    # 开始游戏
+    # 开始游戏：生命周期节点，立即落库，避免 REST 接口在写回前放人进来
     room.is_game_started = True
-    await db.commit()
+    room_store.mark_dirty(room)
+    await room_store.flush_room(room.room_code)
     
-    # 获取玩家信息
-    player_list = []
-    for player in players:
-        result = await db.execute(select(User).filter(User.id == player.user_id))
-        player_user = result.scalars().first()
-        player_list.append({
-            "user_id": player_user.id,
-            "username": player_user.username
-        })
+    # 玩家信息直接取内存中的成员列表
+    player_list = [
+        {"user_id": m.user_id, "username": m.username}
+        for m in room.members.values()
+    ]
     
     # 广播游戏开始
     await manager.broadcast(room.room_code, {
@@ -316,7 +295,7 @@ async def handle_start_game(room: Room, user: User, db: Session, manager: Connec
     })
 
 
-async def handle_game_action(room: Room, user: User, action_data: dict, db: Session, manager: ConnectionManager):
+async def handle_game_action(room: RoomState, user: User, action_data: dict, websocket: WebSocket, manager: ConnectionManager):
     """
     处理游戏动作事件（示例）
     """
@@ -328,15 +307,7 @@ async def handle_game_action(room: Room, user: User, action_data: dict, db: Sess
         return
     
     # 验证用户是否在房间内
-    result = await db.execute(
-        select(PlayerInRoom).filter(
-            PlayerInRoom.user_id == user.id,
-            PlayerInRoom.room_id == room.id
-        )
-    )
-    player_in_room = result.scalars().first()
-    
-    if not player_in_room:
+    if user.id not in room.members:
         return
     
     # 广播游戏动作
@@ -351,50 +322,22 @@ async def handle_game_action(room: Room, user: User, action_data: dict, db: Sess
     })
 
 
-async def handle_player_disconnect(room: Room, user: User, db: Session, manager: ConnectionManager):
+async def handle_player_disconnect(room_code: str, user: User, manager: ConnectionManager):
     """
     处理玩家断开连接事件
     """
-    # 查找用户在房间中的记录
-    result = await db.execute(
-        select(PlayerInRoom).filter(
-            PlayerInRoom.user_id == user.id,
-            PlayerInRoom.room_id == room.id
-        )
-    )
-    player_in_room = result.scalars().first()
-    
-    if not player_in_room:
+    # 重新取一次：最后一个事件之后的 REST 加入/离开会丢弃之前拿到的状态，改旧对象不会被写回
+    async with AsyncSessionLocal() as db:
+        room = await room_store.get(room_code, db)
+    if not room or user.id not in room.members:
         return
     
-    # 检查是否为管理员
-    is_admin = player_in_room.is_admin
-    
-    # 删除用户在房间中的记录
-    await db.delete(player_in_room)
-    
-    # 如果是管理员且房间还有其他玩家，需要转移管理员权限
-    new_admin = None
-    if is_admin:
-        # 获取房间内剩余玩家
-        result = await db.execute(
-            select(PlayerInRoom).filter(PlayerInRoom.room_id == room.id)
-        )
-        remaining_players = result.scalars().all()
-        
-        if remaining_players:
-            # 选择最早加入的玩家作为新管理员
-            new_admin = min(remaining_players, key=lambda p: p.joined_at)
-            new_admin.is_admin = True
-            
-            # 获取新管理员的用户信息
-            result = await db.execute(select(User).filter(User.id == new_admin.user_id))
-            new_admin_user = result.scalars().first()
-        else:
-            # 如果没有其他玩家，删除房间
-            await db.delete(room)
-    
-    await db.commit()
+    # 移除玩家；管理员离开时转移给最早加入的玩家
+    new_admin = room.remove_member(user.id)
+    room_store.mark_dirty(room)
+    if room.deleted:
+        # 最后一人离开，房间删除，立即落库
+        await room_store.flush_room(room.room_code)
     
     # 广播玩家离开
     message = {
@@ -406,10 +349,10 @@ async def handle_player_disconnect(room: Room, user: User, db: Session, manager:
     }
     
     # 如果有新管理员，添加到消息中
-    if new_admin and new_admin_user:
+    if new_admin:
         message["data"]["new_admin"] = {
-            "user_id": new_admin_user.id,
-            "username": new_admin_user.username
+            "user_id": new_admin.user_id,
+            "username": new_admin.username
         }
     
     await manager.broadcast(room.room_code, message)
@@ -2,27 +2,31 @@ from typing import Generator, Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
 
 from core.config import settings
-from core.db import get_db
+from core.db import get_async_db
 from models.user import User
-from core.security import verify_password
+from core.security import decode_token, verify_password
+from core.user_cache import CachedUser, UserCache, watch_user_model
 
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
 )
 
+# 鉴权用的用户缓存，积分/停用状态变更时自动失效
+user_cache = UserCache(ttl=settings.USER_CACHE_TTL_SECONDS)
+watch_user_model(user_cache, User)
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> User:
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)
+) -> CachedUser:
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = decode_token(token)
         user_id: str = payload.get("sub")
         if user_id is None:
             raise HTTPException(
@@ -35,7 +39,12 @@ def get_current_user(
             detail="Could not validate credentials",
         )
 
-    user = db.query(User).filter(User.id == user_id).first()
+    async def load(uid: int):
+        result = await db.execute(select(User).where(User.id == uid))
+        return result.scalars().first()
+
+    # 通常命中缓存，不查 users 表
+    user = await user_cache.get(int(user_id), load)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
@@ -0,0 +1,215 @@
+import asyncio
+import base64
+import time
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import update
+from sqlalchemy.future import select
+
+from app.game_manager import MajRoom, RoomManager, offline_sid, room_manager
+from app.models import Room
+from app.utils.replay_codec import ReplayEncoder
+from app.utils.wire_codec import WireDecodeError, read_fields, read_varint, write_fields, write_varint
+from core.background import BackgroundWriter
+
+# MajRoom 快照格式 (存入 Room.on_time_data，base64 文本)
+#   版本号(1字节) + HEADER_FIELDS + varint 座位数 + 每个座位 (user_id, 手牌) + BODY_FIELDS
+# 快照不含当前局的牌谱编码器，恢复后从恢复时的状态开始新的关键帧
+# 版本 2 在头部末尾加了 seq_reserved，版本 1 的快照仍可读取
+
+CHECKPOINT_VERSION = 2
+
+HEADER_FIELDS = [
+    ("room_id", "uint"), ("room_name", "str"), ("round_index", "uint"),
+    ("turn_index", "uint"), ("is_playing", "bool"), ("last_seq", "uint"),
+    ("seq_reserved", "uint"),
+]
+
+# 快照里的序号上限比写入时的 last_seq 多出的余量：快照之后、崩溃之前发出的事件序号都不超过上限，
+# 从快照恢复时从上限续号，不会把同一个序号再发给另一条事件。用掉一半余量时立即再写一次快照
+SEQ_LEASE = 256
+SEAT_FIELDS = [("user_id", "uint"), ("hand", "tiles")]
+BODY_FIELDS = [("wall", "tiles"), ("discards", "tiles"), ("settings", "json")]
+
+
+def serialize_room(room: MajRoom) -> bytes:
+    buf = bytearray([CHECKPOINT_VERSION])
+    write_fields(buf, HEADER_FIELDS, {
+        "room_id": room.room_id,
+        "room_name": room.room_name,
+        "round_index": room.round_index,
+        "turn_index": room.turn_index,
+        "is_playing": room.is_playing,
+        "last_seq": room.event_log.last_seq,
+        "seq_reserved": room.event_log.last_seq + SEQ_LEASE,
+    })
+    write_varint(buf, len(room.players))
+    for sid, user_id in zip(room.players, room.player_ids):
+        write_fields(buf, SEAT_FIELDS, {"user_id": user_id, "hand": room.hands.get(sid, [])})
+    write_fields(buf, BODY_FIELDS, {"wall": room.wall, "discards": room.discards, "settings": room.settings})
+    return bytes(buf)
+
+
+def restore_room(data: bytes) -> MajRoom:
+    """
+    从快照重建 MajRoom，所有座位先放离线占位，玩家重连时换成真实 sid
+    """
+    if not data or data[0] not in (1, CHECKPOINT_VERSION):
+        raise WireDecodeError("Unsupported checkpoint version")
+    header, pos = read_fields(data, 1, HEADER_FIELDS if data[0] == CHECKPOINT_VERSION else HEADER_FIELDS[:-1])
+    room = MajRoom(header["room_id"], header["room_name"])
+    room.round_index = header["round_index"]
+    room.turn_index = header["turn_index"]
+    room.is_playing = header["is_playing"]
+    room.event_log.last_seq = header["last_seq"]
+    room.event_log.reserved_seq = header.get("seq_reserved", header["last_seq"] + SEQ_LEASE)
+
+    seats, pos = read_varint(data, pos)
+    for _ in range(seats):
+        seat, pos = read_fields(data, pos, SEAT_FIELDS)
+        sid = offline_sid(seat["user_id"])
+        room.add_player(sid, seat["user_id"])
+        room.hands[sid] = seat["hand"]
+    body, pos = read_fields(data, pos, BODY_FIELDS)
+    room.wall = body["wall"]
+    room.discards = body["discards"]
+    room.settings = body["settings"]
+    # 牌谱从恢复时的状态重新开始记关键帧
+    room.replay = ReplayEncoder(snapshot=room.replay_state)
+    return room
+
+
+def encode_checkpoint(room: MajRoom) -> str:
+    return base64.b64encode(serialize_room(room)).decode("ascii")
+
+
+def decode_checkpoint(text: str) -> MajRoom:
+    """
+    从落库的快照恢复 (进程崩溃/重启后)
+
+    快照可能落后于崩溃前实际发出的事件，序号从快照记录的上限续起，重连的客户端改发快照。
+    滚动重启移交的是冻结后的房间，直接用 restore_room，序号不跳。
+    """
+    room = restore_room(base64.b64decode(text))
+    room.event_log.last_seq = room.event_log.reserved_seq
+    return room
+
+
+class Checkpointer(BackgroundWriter):
+    """
+    定期把活跃房间的快照写入 Room.on_time_data
+
+    出牌等处理函数只调用 mark 标记，序列化和写库都在后台任务里做；
+    每轮序列化有时间预算，超出预算的房间顺延到下一轮，保证不会拖慢出牌。
+    """
+
+    label = "Checkpoint"
+
+    def __init__(self, room_manager: RoomManager, interval: float = 5.0, budget_ms: float = 20.0):
+        super().__init__(interval)
+        self.room_manager = room_manager
+        self.budget = budget_ms / 1000
+        self.dirty: Dict[str, None] = {}  # 保持标记顺序的集合
+        self._wakeup = asyncio.Event()
+        # 开销统计
+        self.stats = {"checkpoints": 0, "bytes": 0, "serialize_ms_total": 0.0,
+                      "serialize_ms_max": 0.0, "last_pass_ms": 0.0, "deferred": 0}
+
+    def mark(self, room: MajRoom, urgent: bool = False):
+        """
+        标记房间需要快照；开局、局终等关键节点 urgent=True 立即触发一轮
+        """
+        self.dirty[room.room_name] = None
+        if urgent:
+            self._wakeup.set()
+
+    def reserve_seq(self, room: MajRoom):
+        """
+        每发出一条事件调用：序号用掉一半余量时立即写快照，把落库的序号上限往后推
+        """
+        log = room.event_log
+        if log.last_seq > log.reserved_seq - SEQ_LEASE // 2:
+            self.mark(room, urgent=True)
+
+    async def flush(self):
+        if self._session_factory is None or not self.dirty:
+            return
+        started = time.perf_counter()
+        rows, names, reserved = [], [], []
+        for room_name in list(self.dirty):
+            if rows and time.perf_counter() - started > self.budget:
+                # 超出本轮预算，剩下的房间顺延
+                self.stats["deferred"] += 1
+                break
+            del self.dirty[room_name]
+            room = self.room_manager.get_room(room_name)
+            if room is None:
+                continue
+            t0 = time.perf_counter()
+            text = encode_checkpoint(room)
+            cost = (time.perf_counter() - t0) * 1000
+            self.stats["serialize_ms_total"] += cost
+            self.stats["serialize_ms_max"] = max(self.stats["serialize_ms_max"], cost)
+            self.stats["bytes"] += len(text)
+            rows.append({"id": room.room_id, "on_time_data": text})
+            names.append(room_name)
+            reserved.append((room, room.event_log.last_seq + SEQ_LEASE))
+
+        if rows:
+            try:
+                async with self._session_factory() as db:
+                    await db.execute(update(Room), rows)
+                    await db.commit()
+            except Exception:
+                # 写失败的房间重新标脏，下一轮再写
+                for room_name in names:
+                    self.dirty[room_name] = None
+                raise
+            # 提交之后上限才算数
+            for room, seq in reserved:
+                room.event_log.reserved_seq = max(room.event_log.reserved_seq, seq)
+            self.stats["checkpoints"] += len(rows)
+        self.stats["last_pass_ms"] = (time.perf_counter() - started) * 1000
+
+    async def _wait(self):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def final_flush(self):
+        # 停机前把剩余的脏房间全部写掉
+        self.budget = float("inf")
+        await self.flush()
+
+
+async def get_or_restore_room(room_manager: RoomManager, room_name: str, db,
+                              on_restore: Optional[Callable[[MajRoom], None]] = None) -> Optional[MajRoom]:
+    """
+    内存中没有房间时 (例如进程重启后) 尝试从 Room.on_time_data 恢复
+    恢复的房间放进 RoomManager 后调用 on_restore，和滚动重启移交的 on_room 是同一个钩子
+    """
+    room = room_manager.get_room(room_name)
+    if room is not None:
+        return room
+    result = await db.execute(select(Room.on_time_data).where(Room.name == room_name))
+    text = result.scalar()
+    if not text:
+        return None
+    try:
+        restored = decode_checkpoint(text)
+    except (WireDecodeError, ValueError) as e:
+        print(f"Checkpoint restore failed for {room_name}: {e}")
+        return None
+    # 恢复过程中 await 期间可能已被别的请求创建，以内存中的为准
+    room = room_manager.get_room(room_name)
+    if room is not None:
+        return room
+    room_manager.install_room(restored)
+    if on_restore:
+        on_restore(restored)
+    return restored
+
+
+checkpointer = Checkpointer(room_manager)
@@ -1,12 +1,16 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite+aiosqlite:///./maj_game.db"
+from core.config import settings
+from core.engine import make_async_engine
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+DATABASE_URL = settings.APP_DATABASE_URL
+
+# 连接池、WAL、语句缓存等都由 settings 控制 (core/engine.py)；不再 echo 每条 SQL
+engine = make_async_engine(DATABASE_URL, name="app")
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
 async def get_db():
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
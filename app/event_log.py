@@ -0,0 +1,47 @@
+from collections import deque
+from typing import Any, Deque, List, Optional, Tuple
+
+
+class RoomEventLog:
+    """
+    房间出站事件的环形缓冲区，每个事件带递增序号
+
+    断线重连的客户端带上最后收到的序号，只补发缺失的事件；
+    缺口超出缓冲区时 since() 返回 None，由调用方改发快照。
+    """
+
+    def __init__(self, capacity: int = 256):
+        # (seq, event, data, to_seat, skip_seat)
+        # to_seat 为 None 表示全房间可见；skip_seat 为该座位不可见 (例如摸牌的暗牌广播)
+        self.events: Deque[Tuple[int, str, Any, Optional[int], Optional[int]]] = deque(maxlen=capacity)
+        self.last_seq = 0
+        # 已落库快照里记录的序号上限 (app/checkpoint.py)，从快照恢复时从这里续号
+        self.reserved_seq = 0
+
+    def append(self, event: str, data: Any, to_seat: Optional[int] = None, skip_seat: Optional[int] = None) -> int:
+        self.last_seq += 1
+        self.events.append((self.last_seq, event, data, to_seat, skip_seat))
+        return self.last_seq
+
+    def since(self, last_seq: int, seat: int) -> Optional[List[Tuple[str, Any, int]]]:
+        """
+        返回座位 seat 在 last_seq 之后应收到的事件 [(event, data, seq), ...]
+        """
+        if last_seq > self.last_seq:
+            # 客户端收到过本进程没有的事件 (例如崩溃后从较旧的快照恢复)，只能改发快照
+            return None
+        if last_seq == self.last_seq:
+            return []
+        oldest = self.events[0][0] if self.events else self.last_seq + 1
+        if last_seq + 1 < oldest:
+            return None
+        missed = []
+        for seq, event, data, to_seat, skip_seat in self.events:
+            if seq <= last_seq:
+                continue
+            if to_seat is not None and to_seat != seat:
+                continue
+            if skip_seat == seat:
+                continue
+            missed.append((event, data, seq))
+        return missed
@@ -1,6 +1,19 @@
-from typing import List, Dict, Optional
+from typing import Any, Callable, List, Dict, Optional, Tuple
 import random
-from app.utils.yaku_han import yaku_han
+import time
+from app.utils.riichi.yaku_han import yaku_han
+from app.event_log import RoomEventLog
+from app.utils.replay_codec import ReplayEncoder
+from app.timing_wheel import Timer, TimingWheel
+from app.room_actor import RoomActors
+from app.seats import OFFLINE_PREFIX, is_online, offline_sid  # noqa: F401
+
+# 房间定时器种类：出牌超时、掉线宽限 (按座位区分)；以后的鸣牌窗口同样挂在这里
+TIMER_TURN = "turn"
+TIMER_KINDS = (TIMER_TURN,) + tuple(f"grace:{seat}" for seat in range(4))
+
+def grace_timer(seat: int) -> str:
+    return f"grace:{seat}"
 
 class MajRoom:
     def __init__(self, room_id: int, room_name: str):
@@ -13,6 +26,12 @@ class MajRoom:
         self.wall: List[str] = [] 
         self.turn_index = 0
         self.is_playing = False
+        self.event_log = RoomEventLog()  # 带序号的出站事件，用于断线续传
+        self.replay = ReplayEncoder(snapshot=self.replay_state)  # 当前这一局的牌谱，边打边编码，局终时批量写入 records
+        self.round_index = 0              # 第几局，对应 Record.turn_count
+        self.auto_seats = set()           # 掉线超过宽限期的座位，轮到时立即托管出牌
+        self.last_active = time.monotonic()  # 最近一次有玩家加入或产生事件，回收空闲房间用
+        self.user_rooms: Optional[Dict[int, str]] = None  # 所在 RoomManager 的 user_id -> room_name 索引
         
         # 游戏规则设置
         self.settings = {
@@ -29,11 +48,84 @@ class MajRoom:
         在内存中添加玩家
         """
         if len(self.players) < 4:
+            self.last_active = time.monotonic()
             self.players.append(sid)
             self.player_ids.append(user_id)
+            if self.user_rooms is not None:
+                self.user_rooms[user_id] = self.room_name
             return True
         return False
 
+    def seat_of(self, sid: str) -> Optional[int]:
+        if sid in self.players:
+            return self.players.index(sid)
+        return None
+
+    def replace_sid(self, seat: int, new_sid: str) -> str:
+        """
+        重连时把座位上的旧 sid (或离线占位) 换成新 sid，手牌跟着迁移
+        座位上的 user_id 不变，RoomManager 的用户索引不用更新
+        """
+        old_sid = self.players[seat]
+        self.players[seat] = new_sid
+        if old_sid in self.hands:
+            self.hands[new_sid] = self.hands.pop(old_sid)
+        return old_sid
+
+    def record_event(self, event: str, data: dict, to_sid: Optional[str] = None, skip_sid: Optional[str] = None) -> int:
+        """
+        记录一条出站事件，返回序号
+        """
+        self.last_active = time.monotonic()
+        to_seat = self.seat_of(to_sid) if to_sid else None
+        skip_seat = self.seat_of(skip_sid) if skip_sid else None
+        return self.event_log.append(event, data, to_seat, skip_seat)
+
+    def snapshot(self, seat: int) -> dict:
+        """
+        某个座位视角的精简状态，续传缺口过大时代替逐条补发
+        """
+        sid = self.players[seat]
+        return {
+            'seq': self.event_log.last_seq,
+            'seat': seat,
+            'hand': list(self.hands.get(sid, [])),
+            'discards': list(self.discards),
+            'turn_index': self.turn_index,
+            'wall_count': len(self.wall),
+            'dora': self.settings['dora'][0],
+            'is_playing': self.is_playing,
+        }
+
+    def replay_state(self) -> dict:
+        """
+        牌谱关键帧：各家手牌 (按座位)、牌河、牌山余量、轮次
+        """
+        return {
+            'hands': [list(self.hands.get(sid, [])) for sid in self.players],
+            'discards': list(self.discards),
+            'wall_count': len(self.wall),
+            'turn_index': self.turn_index,
+        }
+
+    def log_action(self, action_type: str, seat: int, **fields):
+        """
+        追加一条牌谱动作，格式: {"type": "discard", "p": 0, "tile": "1m"}
+        """
+        action = {"type": action_type, "p": seat}
+        action.update(fields)
+        self.replay.append(action)
+
+    def end_round(self) -> Tuple[bytes, int]:
+        """
+        结束当前局，返回 (二进制牌谱, 动作数)
+        局终之后不再接受出牌，下一局由 init_game 重新开始
+        """
+        self.is_playing = False
+        replay, self.replay = self.replay, ReplayEncoder(snapshot=self.replay_state)
+        self.round_index += 1
+        return replay.finish(), replay.count
+
     def init_game(self):
         self.is_playing = True
         # 生成牌山 (简化版，实际需136张)
@@ -48,18 +140,30 @@ class MajRoom:
                 self.wall.append(h)
         random.shuffle(self.wall)
 
-        # 发牌
-        for p in self.players:
+        # 发牌 (清掉上一局的手牌和牌河，牌谱第一个关键帧即开局前状态)
+        self.hands = {}
+        self.discards = []
+        self.turn_index = 0  # 庄家 (座位 0) 先出牌
+        self.replay = ReplayEncoder(snapshot=self.replay_state)
+        for seat, p in enumerate(self.players):
             self.hands[p] = [self.wall.pop() for _ in range(13)]
             self.hands[p].sort()
+            self.log_action("deal", seat, hand=list(self.hands[p]))
 
     def draw_tile(self, sid: str):
         if not self.wall:
             return None
         tile = self.wall.pop()
         self.hands[sid].append(tile)
+        self.log_action("draw", self.players.index(sid), tile=tile)
         return tile
 
+    def can_discard(self, sid: str, tile: str) -> bool:
+        """
+        对局中、轮到该座位且手里有这张牌
+        """
+        return self.is_playing and self.seat_of(sid) == self.turn_index and tile in self.hands.get(sid, ())
+
     def check_win(self, sid: str, win_tile: str):
         hand = self.hands[sid]
         # 暂时假设无副露
@@ -71,19 +175,80 @@ class RoomManager:
     def __init__(self):
         # 使用 room_name 作为键来查找内存中的房间
         self.rooms: Dict[str, MajRoom] = {}
+        # 滚动重启 drain 中：不再接新房间和新动作，房间正在移交给新进程
+        self.draining = False
+        # 所有房间共用一个时间轮；每个房间每种定时器同时只有一个
+        self.timers = TimingWheel()
+        self.room_timers: Dict[Tuple[str, str], Timer] = {}
+        # 每个房间一个串行执行器，房间状态只在其中修改
+        self.actors = RoomActors()
+        # user_id -> 已入座的 room_name，匹配排队时按它拒绝已在房间里的用户，不用扫描所有房间
+        self.user_rooms: Dict[int, str] = {}
 
     def create_room(self, room_id: int, room_name: str):
         if room_name not in self.rooms:
             # 初始化时传入数据库 ID
-            self.rooms[room_name] = MajRoom(room_id, room_name)
-            return self.rooms[room_name]
+            return self.install_room(MajRoom(room_id, room_name))
         return None
 
+    def install_room(self, room: MajRoom) -> MajRoom:
+        """
+        把房间放进内存并登记已有的座位 (移交、快照恢复的房间同样走这里)，同名房间直接替换
+        之后 add_player 入座的玩家由房间自己登记
+        """
+        old = self.rooms.get(room.room_name)
+        if old is not None:
+            self._unindex(old)
+        self.rooms[room.room_name] = room
+        room.user_rooms = self.user_rooms
+        for user_id in room.player_ids:
+            self.user_rooms[user_id] = room.room_name
+        return room
+
+    def _unindex(self, room: MajRoom):
+        for user_id in room.player_ids:
+            if self.user_rooms.get(user_id) == room.room_name:
+                del self.user_rooms[user_id]
+        room.user_rooms = None
+
     def get_room(self, room_name: str) -> Optional[MajRoom]:
         return self.rooms.get(room_name)
 
+    def room_of_user(self, user_id: int) -> Optional[MajRoom]:
+        """
+        用户已入座的内存房间 (包括掉线后座位还留着的)
+        """
+        room_name = self.user_rooms.get(user_id)
+        return self.rooms.get(room_name) if room_name is not None else None
+
     def remove_room(self, room_name: str):
-        if room_name in self.rooms:
-            del self.rooms[room_name]
+        room = self.rooms.pop(room_name, None)
+        if room is not None:
+            self._unindex(room)
+        for kind in TIMER_KINDS:
+            self.cancel_timer(room_name, kind)
+        self.actors.close(room_name)
+
+    def set_timer(self, room_name: str, kind: str, delay: float, callback: Callable, *args: Any) -> Timer:
+        """
+        设置房间定时器，同一房间同一种类的旧定时器先取消
+        """
+        self.cancel_timer(room_name, kind)
+        key = (room_name, kind)
+
+        def fire():
+            self.room_timers.pop(key, None)
+            return callback(*args)
+
+        timer = self.timers.schedule(delay, fire)
+        self.room_timers[key] = timer
+        return timer
+
+    def cancel_timer(self, room_name: str, kind: str) -> bool:
+        timer = self.room_timers.pop((room_name, kind), None)
+        if timer is None:
+            return False
+        timer.cancel()
+        return True
 
 room_manager = RoomManager()
\ No newline at end of file
@@ -0,0 +1,158 @@
+import asyncio
+import glob
+import os
+import struct
+import time
+from typing import Callable, List, Optional
+
+from app.checkpoint import Checkpointer, restore_room, serialize_room
+from app.game_manager import MajRoom, RoomManager
+from core.config import settings
+
+# 滚动重启时新旧进程之间移交房间的本地 socket，每个进程一个：
+#   {HANDOFF_SOCKET_DIR}/queshin-handoff-{HANDOFF_WORKER_ID}-{pid}.sock
+# 部署流程: 启动新进程 (监听自己的 socket) -> 向旧进程发 SIGUSR1 进入 drain
+#   -> 旧进程发给同一 worker 编号下最新的另一个进程 -> 移交完成后再停掉旧进程
+# 多 worker 部署时每个 worker 设不同的 HANDOFF_WORKER_ID，新旧进程按编号一一对应
+
+
+def handoff_socket_path(pid: Optional[int] = None) -> str:
+    name = f"queshin-handoff-{settings.HANDOFF_WORKER_ID}-{os.getpid() if pid is None else pid}.sock"
+    return os.path.join(settings.HANDOFF_SOCKET_DIR, name)
+
+
+def handoff_targets() -> List[str]:
+    """
+    同一 worker 编号下其他进程的 socket，最新的在前
+    """
+    pattern = os.path.join(settings.HANDOFF_SOCKET_DIR, f"queshin-handoff-{settings.HANDOFF_WORKER_ID}-*.sock")
+    own = handoff_socket_path()
+    paths = [path for path in glob.glob(pattern) if path != own]
+    return sorted(paths, key=lambda path: os.stat(path).st_mtime, reverse=True)
+
+
+async def _is_live(path: str) -> bool:
+    try:
+        _, writer = await asyncio.open_unix_connection(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        return False
+    writer.close()
+    return True
+
+# 帧格式: 4 字节大端长度 + MajRoom 快照 (app/checkpoint.py)，长度为 0 表示结束
+# 接收方收到结束帧后回一个 4 字节的房间数作为确认
+FRAME = struct.Struct(">I")
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> bytes:
+    (length,) = FRAME.unpack(await reader.readexactly(FRAME.size))
+    if length == 0:
+        return b""
+    return await reader.readexactly(length)
+
+
+class HandoffReceiver:
+    """
+    新进程一侧：接收旧进程移交的房间，直接放进 RoomManager
+    """
+
+    def __init__(self, room_manager: RoomManager, on_room: Optional[Callable[[MajRoom], None]] = None):
+        self.room_manager = room_manager
+        self.on_room = on_room
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.path: Optional[str] = None
+        self.received = 0
+
+    async def start(self, path: Optional[str] = None):
+        path = handoff_socket_path() if path is None else path
+        if os.path.exists(path):
+            # 只清理崩溃进程留下的死 socket；还有进程在监听说明路径配置冲突
+            if await _is_live(path):
+                raise RuntimeError(f"Handoff socket {path} is in use by another process")
+            os.unlink(path)
+        self.server = await asyncio.start_unix_server(self._handle, path=path)
+        self.path = path
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        count = 0
+        started = time.perf_counter()
+        try:
+            while True:
+                payload = await _read_frame(reader)
+                if not payload:
+                    break
+                room = restore_room(payload)
+                # 移交过来的状态比本进程懒恢复的快照新，直接覆盖
+                self.room_manager.install_room(room)
+                if self.on_room:
+                    self.on_room(room)
+                count += 1
+            writer.write(FRAME.pack(count))
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            print(f"Handoff receive aborted after {count} rooms: {e}")
+        finally:
+            writer.close()
+        self.received += count
+        print(f"Handoff: received {count} rooms in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+
+async def send_rooms(rooms: List[MajRoom], path: Optional[str] = None, timeout: float = 5.0) -> int:
+    """
+    旧进程一侧：把房间快照发给新进程，返回对方确认收到的房间数
+    不指定 path 时发给同一 worker 编号下最新的另一个进程；新进程可能还在启动，连接失败时在 timeout 内重试
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        targets = [path] if path is not None else handoff_targets()
+        try:
+            if not targets:
+                raise FileNotFoundError("No handoff socket from a new process")
+            reader, writer = await asyncio.open_unix_connection(targets[0])
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            if time.monotonic() >= deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+    try:
+        for room in rooms:
+            payload = serialize_room(room)
+            writer.write(FRAME.pack(len(payload)) + payload)
+        writer.write(FRAME.pack(0))
+        await writer.drain()
+        remaining = max(deadline - time.monotonic(), 0.5)
+        (count,) = FRAME.unpack(await asyncio.wait_for(reader.readexactly(FRAME.size), remaining))
+        return count
+    finally:
+        writer.close()
+
+
+async def drain_rooms(room_manager: RoomManager, checkpointer: Checkpointer,
+                      receiver: HandoffReceiver, path: Optional[str] = None, timeout: float = 5.0) -> List[MajRoom]:
+    """
+    drain 的移交部分：停止接收移交、等各房间收件箱清空，把所有房间发给新进程；
+    发送失败时把快照全部落库，新进程在首次访问时懒恢复。返回已冻结的房间
+    """
+    await receiver.stop()  # 移交目标是新进程，不能再收回给自己
+    # 等各房间收件箱里已经在排队的事件执行完 (draining 之后的事件直接忽略)，再冻结移交
+    await room_manager.actors.drain()
+    rooms = list(room_manager.rooms.values())
+    started = time.perf_counter()
+    try:
+        count = await send_rooms(rooms, path, timeout)
+        print(f"Handoff: sent {count}/{len(rooms)} rooms in {(time.perf_counter() - started) * 1000:.1f}ms")
+    except Exception as e:
+        print(f"Handoff failed, falling back to checkpoints: {e}")
+        for room in rooms:
+            checkpointer.mark(room)
+        await checkpointer.stop()
+    return rooms
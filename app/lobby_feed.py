@@ -0,0 +1,115 @@
+import asyncio
+from typing import Dict, Optional
+
+from app.lobby_index import ROOM_CREATED, ROOM_REMOVED, ROOM_UPDATED, LobbyEntry, LobbyIndex
+
+# 订阅大厅的客户端所在的 Socket.IO 房间
+LOBBY_ROOM = "lobby"
+SNAPSHOT_EVENT = "lobby_snapshot"
+DIFF_EVENT = "lobby_diff"
+
+
+def entry_data(entry: LobbyEntry) -> dict:
+    data = entry.to_dict()
+    data["created_at"] = entry.created_at.isoformat() if entry.created_at else None
+    return data
+
+
+class LobbyFeed:
+    """
+    大厅推送：订阅时发一次快照，之后把索引的变更按 interval 合并成一条 lobby_diff 广播
+
+    同一个房间在一个周期内的多次变更只发最终状态；创建后又在同一周期内删除的房间不发。
+    每条 diff 带递增的 seq，客户端发现跳号时重新订阅拿快照。
+    """
+
+    def __init__(self, sio, index: LobbyIndex, interval: float = 0.2, snapshot_limit: int = 50):
+        self.sio = sio
+        self.index = index
+        self.interval = interval
+        self.snapshot_limit = snapshot_limit
+        self.seq = 0
+        # room_id -> 变更类型 (保持变更顺序)
+        self.pending: Dict[int, str] = {}
+        self._task: Optional[asyncio.Task] = None
+        index.listeners.append(self.record)
+
+    def record(self, change: str, entry: LobbyEntry):
+        previous = self.pending.get(entry.id)
+        if previous == ROOM_CREATED:
+            if change == ROOM_REMOVED:
+                # 订阅者从没见过这个房间
+                del self.pending[entry.id]
+            return
+        if change == ROOM_CREATED and previous == ROOM_REMOVED:
+            change = ROOM_UPDATED
+        self.pending[entry.id] = change
+
+    def collect(self) -> Optional[dict]:
+        """
+        取出本周期的增量，没有变更时返回 None
+        """
+        if not self.pending:
+            return None
+        pending, self.pending = self.pending, {}
+        diff = {"created": [], "updated": [], "removed": []}
+        for room_id, change in pending.items():
+            entry = self.index.entries.get(room_id)
+            if change == ROOM_REMOVED or entry is None:
+                diff["removed"].append(room_id)
+            else:
+                diff[change].append(entry_data(entry))
+        self.seq += 1
+        diff["seq"] = self.seq
+        return diff
+
+    async def flush(self):
+        diff = self.collect()
+        if diff is not None:
+            await self.sio.emit(DIFF_EVENT, diff, room=LOBBY_ROOM)
+
+    def snapshot_size(self, limit) -> int:
+        """
+        客户端传来的 limit 可能是任意 JSON 值：不是正整数时用默认值，超过上限时截断
+        """
+        if isinstance(limit, bool) or not isinstance(limit, (int, str)):
+            return self.snapshot_limit
+        try:
+            limit = int(limit)
+        except ValueError:
+            return self.snapshot_limit
+        return min(limit, self.snapshot_limit) if limit > 0 else self.snapshot_limit
+
+    async def subscribe(self, sid: str, status: str, limit=None):
+        """
+        加入推送并发送快照；快照和 seq 在同一次同步调用里取，之后的 diff 都接在它后面
+        """
+        entries, next_cursor = self.index.page(status, self.snapshot_size(limit))
+        snapshot = {
+            "seq": self.seq,
+            "status": status,
+            "rooms": [entry_data(entry) for entry in entries],
+            "next_cursor": next_cursor,
+        }
+        await self.sio.enter_room(sid, LOBBY_ROOM)
+        await self.sio.emit(SNAPSHOT_EVENT, snapshot, room=sid)
+
+    async def unsubscribe(self, sid: str):
+        await self.sio.leave_room(sid, LOBBY_ROOM)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Lobby feed error: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
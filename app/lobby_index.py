@@ -0,0 +1,183 @@
+import base64
+from bisect import bisect_right, insort
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from app.models import PlayerInRoom, Room, RoomStatus, User
+
+# 大厅只展示这两种状态的房间
+LISTED_STATUSES = (RoomStatus.WAITING.value, RoomStatus.PLAYING.value)
+
+# 排序键: (-created_at 时间戳, -id)，升序即按创建时间从新到旧
+SortKey = Tuple[float, int]
+
+# 变更通知类型 (见 LobbyIndex.listeners)
+ROOM_CREATED = "created"
+ROOM_UPDATED = "updated"
+ROOM_REMOVED = "removed"
+
+
+def _timestamp(created_at: Optional[datetime]) -> float:
+    if created_at is None:
+        return 0.0
+    # SQLite 读回来是不带时区的 UTC 时间
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.timestamp()
+
+
+def _status(status) -> str:
+    # 新建房间时是 RoomStatus 枚举，从库里读出来是字符串
+    return status.value if isinstance(status, RoomStatus) else status
+
+
+def encode_cursor(key: SortKey) -> str:
+    return base64.urlsafe_b64encode(f"{-key[0]!r}:{-key[1]}".encode()).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    try:
+        ts, room_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode().split(":")
+        return (-float(ts), -int(room_id))
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+
+
+class LobbyEntry:
+    __slots__ = ("id", "name", "capacity", "status", "created_by", "created_at",
+                 "current_player_count", "creator_username")
+
+    def __init__(self, id: int, name: str, capacity: int, status: str, created_by: int,
+                 created_at: datetime, current_player_count: int, creator_username: str):
+        self.id = id
+        self.name = name
+        self.capacity = capacity
+        self.status = _status(status)
+        self.created_by = created_by
+        self.created_at = created_at
+        self.current_player_count = current_player_count
+        self.creator_username = creator_username
+
+    @property
+    def key(self) -> SortKey:
+        return (-_timestamp(self.created_at), -self.id)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class LobbyIndex:
+    """
+    大厅房间索引：启动时从数据库加载一次，之后由建房/加入/开局/结束等事件维护，
+    列表查询只读内存。每个状态一个按创建时间排好序的键列表，翻页用游标 (keyset) 二分定位。
+
+    listeners 在每次变更后以 (变更类型, 房间) 被调用，大厅推送 (app/lobby_feed.py) 靠它生成增量。
+    """
+
+    def __init__(self):
+        self.entries: Dict[int, LobbyEntry] = {}
+        self._sorted: Dict[str, List[SortKey]] = {status: [] for status in LISTED_STATUSES}
+        self.loaded = False
+        self.listeners: List[Callable[[str, LobbyEntry], None]] = []
+
+    def _notify(self, change: str, entry: LobbyEntry):
+        for listener in self.listeners:
+            listener(change, entry)
+
+    async def load(self, db):
+        """
+        一次查询加载所有等待中/游戏中的房间 (人数聚合 + 房主名)
+        """
+        result = await db.execute(
+            select(Room, func.count(PlayerInRoom.id), User.username)
+            .outerjoin(PlayerInRoom, PlayerInRoom.room_id == Room.id)
+            .outerjoin(User, User.id == Room.created_by)
+            .where(Room.status.in_(LISTED_STATUSES))
+            .group_by(Room.id, User.username)
+        )
+        # 全量加载不逐条通知，之后订阅的客户端从快照开始
+        self.entries.clear()
+        for keys in self._sorted.values():
+            keys.clear()
+        for room, count, username in result.all():
+            entry = LobbyEntry(room.id, room.name, room.capacity, room.status, room.created_by,
+                               room.created_at, count, username or "Unknown")
+            if entry.status in self._sorted:
+                self.entries[entry.id] = entry
+                self._sorted[entry.status].append(entry.key)
+        for keys in self._sorted.values():
+            keys.sort()
+        self.loaded = True
+
+    async def ensure_loaded(self, db):
+        if not self.loaded:
+            await self.load(db)
+
+    def add(self, entry: LobbyEntry):
+        old = self._drop(entry.id)
+        if entry.status not in self._sorted:
+            if old is not None:
+                self._notify(ROOM_REMOVED, old)
+            return
+        self.entries[entry.id] = entry
+        insort(self._sorted[entry.status], entry.key)
+        self._notify(ROOM_UPDATED if old is not None else ROOM_CREATED, entry)
+
+    def update(self, room_id: int, **changes) -> Optional[LobbyEntry]:
+        """
+        更新房间字段 (人数、状态等)；状态变成不展示的 (如 FINISHED) 时移出索引
+        """
+        entry = self.entries.get(room_id)
+        if entry is None:
+            return None
+        old_status = entry.status
+        if "status" in changes:
+            changes["status"] = _status(changes["status"])
+        for name, value in changes.items():
+            setattr(entry, name, value)
+        if entry.status != old_status:
+            self._discard_key(old_status, entry.key)
+            if entry.status not in self._sorted:
+                del self.entries[room_id]
+                self._notify(ROOM_REMOVED, entry)
+                return entry
+            insort(self._sorted[entry.status], entry.key)
+        self._notify(ROOM_UPDATED, entry)
+        return entry
+
+    def remove(self, room_id: int) -> Optional[LobbyEntry]:
+        entry = self._drop(room_id)
+        if entry is not None:
+            self._notify(ROOM_REMOVED, entry)
+        return entry
+
+    def _drop(self, room_id: int) -> Optional[LobbyEntry]:
+        entry = self.entries.pop(room_id, None)
+        if entry is not None:
+            self._discard_key(entry.status, entry.key)
+        return entry
+
+    def _discard_key(self, status: str, key: SortKey):
+        keys = self._sorted.get(status)
+        if not keys:
+            return
+        i = bisect_right(keys, key) - 1
+        if i >= 0 and keys[i] == key:
+            del keys[i]
+
+    def page(self, status: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[LobbyEntry], Optional[str]]:
+        """
+        返回 (一页房间, 下一页游标)；游标是上一页最后一个房间的排序键，翻到多深都是 O(log n)
+        """
+        keys = self._sorted.get(_status(status), [])
+        start = bisect_right(keys, decode_cursor(cursor)) if cursor else 0
+        page_keys = keys[start:start + limit]
+        items = [self.entries[-key[1]] for key in page_keys]
+        next_cursor = encode_cursor(page_keys[-1]) if start + limit < len(keys) and page_keys else None
+        return items, next_cursor
+
+
+lobby_index = LobbyIndex()
@@ -1,4 +1,8 @@
 # app/main.py
+import asyncio
+import uuid
+import signal
+from datetime import datetime, timezone
 import socketio
 from fastapi import FastAPI
 from sqlalchemy.future import select
@@ -7,9 +11,24 @@ from sqlalchemy.exc import IntegrityError
 
 # 导入本地模块
 from app.database import engine, Base, AsyncSessionLocal
-from app.routers import auth,lobby
-from app.security import decode_access_token
-from app.game_manager import room_manager
+from app.migrations import add_missing_columns
+from core.engine import pool_stats
+from core.hash_pool import hash_pool
+from core.leaderboard import LeaderboardRefresher, leaderboard as points_board
+from core.config import settings
+from app.routers import auth,lobby,stats,leaderboard
+from app.security import decode_access_token, decode_resume_ticket, create_resume_token, create_resume_ticket
+from app.sessions import session_store
+from app.game_manager import room_manager, offline_sid, is_online, TIMER_TURN, grace_timer
+from app.outbound import Outbound
+from app.replay_writer import replay_writer
+from app.stats import stats_writer
+from app.checkpoint import checkpointer, get_or_restore_room
+from app.handoff import HandoffReceiver, drain_rooms
+from app.lobby_index import LobbyEntry, lobby_index
+from app.lobby_feed import LobbyFeed
+from app.matchmaking import matchmaker
+from app.reaper import Reaper
 from app.models import Room, PlayerInRoom, RoomStatus, User, Record
 
 # --- 1. 配置 FastAPI 和 Socket.IO ---
@@ -19,15 +38,154 @@ app = FastAPI()
 # 挂载认证路由
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(lobby.router, prefix="/api/lobby", tags=["lobby"])
+app.include_router(stats.router, prefix="/api/stats", tags=["stats"])
+app.include_router(leaderboard.router, prefix="/api/leaderboard", tags=["leaderboard"])
 
 # 挂载 Socket.IO
 socket_app = socketio.ASGIApp(sio, app)
 
+# 出站事件合并层：同一次处理中发给同一客户端的事件合并成一帧
+outbound = Outbound(sio)
+
+# 大厅变更推送，代替轮询 GET /api/lobby/
+lobby_feed = LobbyFeed(sio, lobby_index)
+
+# 积分排行榜定时全量重建，追上其他进程的积分变更
+leaderboard_refresher = LeaderboardRefresher(points_board, User, settings.LEADERBOARD_REBUILD_INTERVAL_SECONDS)
+
+# 空闲房间和掉线 sid 的后台回收
+async def close_reaped_room(maj_room):
+    # 回收的房间里如果还有在线的人 (长时间没有动作)，通知后解散 Socket.IO 房间
+    await sio.emit('room_closed', {'room_name': maj_room.room_name, 'reason': 'idle'}, room=maj_room.room_name)
+    await sio.close_room(maj_room.room_name)
+
+def reaped_seat_offline(maj_room, seat):
+    # 回收器发现漏掉 disconnect 的座位：对局中和正常掉线一样开始宽限计时
+    if maj_room.is_playing:
+        start_grace_timer(maj_room, seat)
+
+reaper = Reaper(
+    room_manager, checkpointer, lobby_index,
+    is_connected=lambda sid: sio.manager.is_connected(sid, '/'),
+    idle_ttl=settings.ROOM_IDLE_TTL_SECONDS,
+    abandoned_ttl=settings.ROOM_ABANDONED_TTL_SECONDS,
+    stale_ttl=settings.ROOM_STALE_TTL_SECONDS,
+    interval=settings.REAPER_INTERVAL_SECONDS,
+    batch_size=settings.REAPER_BATCH_SIZE,
+    on_reap=close_reaped_room,
+    on_seat_offline=reaped_seat_offline,
+)
+
+def room_installed(maj_room):
+    """
+    移交过来或从快照恢复的房间：座位全是离线占位，对局中时补上各座位的宽限计时和当前轮次的出牌计时，
+    轮到的人不回来也会托管出牌，不用等回收器按空闲房间处理
+    """
+    checkpointer.mark(maj_room, urgent=True)
+    if maj_room.is_playing:
+        for seat, sid in enumerate(maj_room.players):
+            if not is_online(sid):
+                start_grace_timer(maj_room, seat)
+        start_turn_timer(maj_room, maj_room.turn_index)
+
+# 接收旧进程移交的房间 (滚动重启)
+handoff_receiver = HandoffReceiver(room_manager, on_room=room_installed)
+
 @app.on_event("startup")
 async def startup():
     # 初始化数据库表
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # 老库的已有表补上后来新增的列
+        await conn.run_sync(add_missing_columns)
+    # 牌谱后台批量写入
+    replay_writer.start(AsyncSessionLocal)
+    stats_writer.start(AsyncSessionLocal)
+    # 房间快照后台写入；内存中的房间在首次访问时从快照懒恢复
+    checkpointer.start(AsyncSessionLocal)
+    # 大厅索引只在启动时读一次库，之后由房间事件维护
+    async with AsyncSessionLocal() as db:
+        await lobby_index.load(db)
+    # 积分排行榜同样启动时全量读一次，之后随本进程的积分变更增量维护，定时重建
+    leaderboard_refresher.start(AsyncSessionLocal)
+    await leaderboard_refresher.flush()
+    lobby_feed.start()
+    # 自动配桌：每个周期凑出的桌子批量建房开局
+    matchmaker.start(create_matched_tables)
+    # 所有房间的出牌超时/掉线宽限共用一个时间轮
+    room_manager.timers.start()
+    # 空闲房间、掉线 sid 和陈旧房间行的回收
+    reaper.start(AsyncSessionLocal)
+    # 滚动重启：监听移交 socket，收到 SIGUSR1 时把本进程的房间交给新进程
+    await handoff_receiver.start()
+    asyncio.get_running_loop().add_signal_handler(
+        signal.SIGUSR1, lambda: asyncio.ensure_future(drain_and_handoff())
+    )
+
+@app.on_event("shutdown")
+async def shutdown():
+    await handoff_receiver.stop()
+    await lobby_feed.stop()
+    await matchmaker.stop()
+    await room_manager.timers.stop()
+    await reaper.stop()
+    await leaderboard_refresher.stop()
+    # 停机前写完缓冲中的牌谱和房间快照
+    await replay_writer.stop()
+    await stats_writer.stop()
+    await checkpointer.stop()
+    hash_pool.shutdown()
+
+@app.get("/health/db")
+async def db_health():
+    # 连接池 checkout 等待统计
+    return pool_stats(engine)
+
+@app.get("/health/auth")
+async def auth_health():
+    # 密码哈希线程池的排队深度和耗时
+    return hash_pool.stats()
+
+@app.get("/health/leaderboard")
+async def leaderboard_health():
+    # 只读：榜单大小和最近一次定时重建发现的不一致用户数，用于校验增量维护
+    return leaderboard_refresher.stats()
+
+@app.get("/health/matchmaking")
+async def matchmaking_health():
+    # 排队人数、已配桌人数、排队时长分位数
+    return matchmaker.stats()
+
+@app.get("/health/rooms")
+async def rooms_health():
+    # 各房间收件箱的排队深度
+    return room_manager.actors.stats()
+
+@app.get("/health/reaper")
+async def reaper_health():
+    # 回收的房间数、行数和估算释放的内存
+    return {**reaper.stats, "rooms_in_memory": len(room_manager.rooms)}
+
+async def drain_and_handoff():
+    """
+    drain：停止接新房间、冻结所有房间，移交给新进程后通知客户端带续连令牌重连
+    """
+    if room_manager.draining:
+        return
+    room_manager.draining = True
+    rooms = await drain_rooms(room_manager, checkpointer, handoff_receiver)
+
+    for room in rooms:
+        last_seq = room.event_log.last_seq
+        for sid, user_id in zip(room.players, room.player_ids):
+            if not is_online(sid):
+                continue
+            session = await sio.get_session(sid)
+            await sio.emit('server_handoff', {
+                'room_name': room.room_name,
+                'last_seq': last_seq,
+                'resume': create_resume_token(user_id, session['username'], room.room_name, last_seq)
+            }, room=sid)
 
 # --- 2. Socket.IO 中间件：身份验证 ---
 
@@ -37,8 +195,11 @@ async def connect(sid, environ, auth):
     连接时验证 Token，并将 user_id 存入 session
     """
     token = None
-    # 1. 尝试从 auth 字典获取
-    if auth and 'token' in auth:
+    # 1. 尝试从 auth 字典获取 (上次连接拿到的续连票据优先)
+    is_ticket = bool(auth and 'ticket' in auth)
+    if is_ticket:
+        token = auth['ticket']
+    elif auth and 'token' in auth:
         token = auth['token']
     # 2. 尝试从 URL 参数获取 (方便调试)
     elif 'QUERY_STRING' in environ:
@@ -55,22 +216,116 @@ async def connect(sid, environ, auth):
     if token.startswith("Bearer "):
         token = token.split(" ")[1]
 
-    payload = decode_access_token(token)
+    # 票据只能走票据通道，access token 通道也不接受票据
+    payload = decode_resume_ticket(token) if is_ticket else decode_access_token(token)
     if not payload:
         print(f"Connection rejected: Invalid token {sid}")
         return False
     
     user_id = payload.get("user_id")
     username = payload.get("sub")
+
+    # 绑定了登录会话的令牌/票据：会话被吊销 (注销) 后拒绝；会话通常命中内存缓存
+    session_id = payload.get("sid")
+    if session_id is not None:
+        async with AsyncSessionLocal() as db:
+            login_session = await session_store.get_by_id(db, session_id)
+        if login_session is None:
+            print(f"Connection rejected: Session revoked {sid}")
+            return False
     
     # 将用户信息存入 Socket 会话，后续事件直接使用
     await sio.save_session(sid, {'user_id': user_id, 'username': username})
+    # 客户端能力，例如 {'caps': ['batch'], 'proto': 'bin'}；不声明的老客户端按逐条 JSON 事件处理
+    auth = auth or {}
+    outbound.register(sid, auth.get('caps'), auth.get('proto'))
     
     print(f"User {username}({user_id}) connected as {sid}")
     await sio.emit('response', {'message': f'Welcome {username}!'}, room=sid)
+    if session_id is not None:
+        # 下次重连用票据，token 过期也不用重新登录
+        await sio.emit('session_ticket', {'ticket': create_resume_ticket(session_id, user_id, username)}, room=sid)
+
+    # 续连令牌 (滚动重启时下发)：直接回到原座位，只补发缺失的事件
+    room_name = payload.get("room_name")
+    if room_name and not room_manager.draining:
+        async with AsyncSessionLocal() as db:
+            maj_room = await get_or_restore_room(room_manager, room_name, db, room_installed)
+        if maj_room:
+            await send_to_room(sid, room_name, rejoin_room, sid, user_id, maj_room, auth.get('last_seq', payload.get('seq')))
 
 # --- 3. 业务逻辑事件 ---
 
+def emit_game(out, maj_room, event, data, to_sid=None, skip_sid=None):
+    """
+    游戏事件统一出口：先记入房间事件日志拿到序号，再交给本次批量发送
+    发给离线座位的事件只记录不发送，重连时补发
+    """
+    seq = maj_room.record_event(event, data, to_sid, skip_sid)
+    data['seq'] = seq  # 日志里存的是同一个 dict，补发时同样带序号
+    # 序号快用到快照里记录的上限时加急写快照，崩溃恢复后不会复用已发出的序号
+    checkpointer.reserve_seq(maj_room)
+    if to_sid is None:
+        out.emit(event, data, room=maj_room.room_name, skip_sid=skip_sid, seq=seq)
+    elif is_online(to_sid):
+        out.emit(event, data, room=to_sid, seq=seq)
+
+def resume_events(out, maj_room, seat, sid, last_seq):
+    """
+    断线续传：只补发 last_seq 之后的事件，缺口超出日志范围时发精简快照
+    """
+    missed = maj_room.event_log.since(last_seq, seat) if last_seq is not None else None
+    if missed is None:
+        snapshot = maj_room.snapshot(seat)
+        out.emit('resync', snapshot, room=sid, seq=snapshot['seq'])
+        return
+    for event, event_data, seq in missed:
+        out.emit(event, event_data, room=sid, seq=seq)
+
+async def send_to_room(sid, room_name, fn, *args) -> bool:
+    """
+    把修改房间状态的操作投递到该房间的执行器，按到达顺序串行执行；
+    收件箱满时回复客户端稍后重试
+    """
+    if room_manager.actors.send(room_name, fn, *args):
+        return True
+    await sio.emit('error', {'msg': 'Room is busy, please retry'}, room=sid)
+    return False
+
+async def rejoin_room(sid, user_id, maj_room, last_seq):
+    """
+    重连：用新 sid 替换座位上的旧 sid / 离线占位，并续传事件
+    """
+    room_name = maj_room.room_name
+    await sio.enter_room(sid, room_name)
+    seat = None
+    if user_id in maj_room.player_ids:
+        seat = maj_room.player_ids.index(user_id)
+        old_sid = maj_room.replace_sid(seat, sid)
+        if is_online(old_sid) and old_sid != sid:
+            await sio.leave_room(old_sid, room_name)
+        # 宽限期内回来：取消托管
+        room_manager.cancel_timer(room_name, grace_timer(seat))
+        maj_room.auto_seats.discard(seat)
+
+    async with outbound.batch() as out:
+        out.emit('room_joined', {'room_name': room_name, 'msg': 'Welcome back'}, room=sid)
+        if seat is not None and maj_room.is_playing:
+            resume_events(out, maj_room, seat, sid, last_seq)
+
+@sio.event
+async def lobby_subscribe(sid, data):
+    """
+    订阅大厅：先收到 lobby_snapshot，之后收到合并过的 lobby_diff
+    Data: {'status': 'WAITING', 'limit': 50}，快照只含该状态，diff 包含所有状态，由客户端按 status 过滤
+    """
+    data = data or {}
+    await lobby_feed.subscribe(sid, data.get('status', RoomStatus.WAITING.value), data.get('limit'))
+
+@sio.event
+async def lobby_unsubscribe(sid, data=None):
+    await lobby_feed.unsubscribe(sid)
+
 @sio.event
 async def create_room(sid, data):
     """
@@ -85,10 +340,15 @@ async def create_room(sid, data):
         await sio.emit('error', {'msg': 'Room name required'}, room=sid)
         return
 
+    if room_manager.draining:
+        await sio.emit('error', {'msg': 'Server is restarting'}, room=sid)
+        return
+
     async with AsyncSessionLocal() as db:
         try:
             # 1. 数据库：创建房间
-            new_room = Room(name=room_name, created_by=user_id, status=RoomStatus.WAITING)
+            new_room = Room(name=room_name, created_by=user_id, status=RoomStatus.WAITING,
+                            created_at=datetime.now(timezone.utc))
             db.add(new_room)
             await db.flush() # 获取 ID
 
@@ -101,13 +361,17 @@ async def create_room(sid, data):
             )
             db.add(player_entry)
             await db.commit()
+            lobby_index.add(LobbyEntry(
+                new_room.id, room_name, new_room.capacity, new_room.status, user_id,
+                new_room.created_at, 1, session['username']
+            ))
 
             # 3. 内存：初始化游戏房间
             maj_room = room_manager.create_room(new_room.id, room_name)
             if maj_room:
                 maj_room.add_player(sid, user_id)
                 
-                sio.enter_room(sid, room_name)
+                await sio.enter_room(sid, room_name)
                 await sio.emit('room_joined', {
                     'room_id': new_room.id, 
                     'room_name': room_name,
@@ -128,12 +392,17 @@ async def create_room(sid, data):
 async def join_room(sid, data):
     """
     加入房间
-    Data: {'room_name': 'xxx'}
+    Data: {'room_name': 'xxx', 'last_seq': 123}
+    last_seq 为重连时客户端最后收到的事件序号，可选
     """
     session = await sio.get_session(sid)
     user_id = session['user_id']
     room_name = data.get('room_name')
 
+    if room_manager.draining:
+        await sio.emit('error', {'msg': 'Server is restarting'}, room=sid)
+        return
+
     async with AsyncSessionLocal() as db:
         # 1. 查找房间及当前玩家
         result = await db.execute(
@@ -154,17 +423,13 @@ async def join_room(sid, data):
         # 2. 检查是否已加入
         for p in current_players:
             if p.user_id == user_id:
-                # 已在房间，可能是重连
-                # 这里简单处理：让 socket 重新加入房间频道
-                sio.enter_room(sid, room_name)
-                
-                # 尝试更新内存中的 sid
-                maj_room = room_manager.get_room(room_name)
+                # 已在房间，可能是重连 (进程重启后从快照恢复)
+                maj_room = await get_or_restore_room(room_manager, room_name, db, room_installed)
                 if maj_room:
-                    # 注意：这里需要复杂的重连逻辑来替换旧sid，这里简化处理
-                    pass 
-                    
-                await sio.emit('room_joined', {'room_name': room_name, 'msg': 'Welcome back'}, room=sid)
+                    await send_to_room(sid, room_name, rejoin_room, sid, user_id, maj_room, data.get('last_seq'))
+                else:
+                    await sio.enter_room(sid, room_name)
+                    await sio.emit('room_joined', {'room_name': room_name, 'msg': 'Welcome back'}, room=sid)
                 return
 
         # 3. 检查满员
@@ -189,41 +454,121 @@ async def join_room(sid, data):
             start_game = True
             
         await db.commit()
+        lobby_index.update(db_room.id, current_player_count=len(current_players) + 1, status=db_room.status)
 
         # 5. 内存：同步状态
-        maj_room = room_manager.get_room(room_name)
+        maj_room = await get_or_restore_room(room_manager, room_name, db, room_installed)
         if not maj_room:
             # 如果内存中没有（可能是重启后），重新创建
             maj_room = room_manager.create_room(db_room.id, room_name)
             # 恢复已有的其他玩家（此处简化，仅为防止报错）
             for existing_p in current_players:
-                 # 注意：这里没有真实sid，无法推送到旧玩家，实际生产需配合 Redis 存储 sid
-                 maj_room.add_player("offline", existing_p.user_id)
+                 # 没有真实 sid，先放离线占位；事件照常记入日志，玩家重连后补发
+                 maj_room.add_player(offline_sid(existing_p.user_id), existing_p.user_id)
+
+        await send_to_room(sid, room_name, seat_player, sid, user_id, maj_room, len(current_players) + 1, start_game)
 
-        maj_room.add_player(sid, user_id)
-        sio.enter_room(sid, room_name)
+async def seat_player(sid, user_id, maj_room, player_count, start_game):
+    """
+    在房间执行器里入座，满员时开局
+    """
+    maj_room.add_player(sid, user_id)
+    await sio.enter_room(sid, maj_room.room_name)
 
+    async with outbound.batch() as out:
         # 广播新玩家加入
-        await sio.emit('room_joined', {
-            'room_name': room_name, 
-            'player_count': len(current_players) + 1
-        }, room=room_name)
+        out.emit('room_joined', {
+            'room_name': maj_room.room_name, 
+            'player_count': player_count
+        }, room=maj_room.room_name)
 
         # 6. 游戏开始逻辑
         if start_game:
-            print(f"Room {room_name} is starting!")
-            maj_room.init_game()
-            
-            # 给房间里每个人发牌
-            # maj_room.players 存的是 sid
-            for i, p_sid in enumerate(maj_room.players):
-                if p_sid == "offline": continue
-                
-                await sio.emit('game_start', {
-                    'hand': maj_room.hands[p_sid],
-                    'seat': i,
-                    'dora': maj_room.settings['dora'][0] # 示例：显示第一张宝牌
-                }, room=p_sid)
+            print(f"Room {maj_room.room_name} is starting!")
+            deal_game(out, maj_room)
+
+def deal_game(out, maj_room):
+    """
+    开局：洗牌发牌，给每个座位单独发手牌
+    """
+    maj_room.init_game()
+    checkpointer.mark(maj_room, urgent=True)
+
+    # maj_room.players 存的是 sid
+    for i, p_sid in enumerate(maj_room.players):
+        emit_game(out, maj_room, 'game_start', {
+            'hand': list(maj_room.hands[p_sid]),
+            'seat': i,
+            'dora': maj_room.settings['dora'][0] # 示例：显示第一张宝牌
+        }, to_sid=p_sid)
+    # 庄家第一手同样计时
+    start_turn_timer(maj_room, maj_room.turn_index)
+
+@sio.event
+async def match_queue(sid, data=None):
+    """
+    加入自动配桌队列，凑满一桌后直接开局 (收到 room_joined 和 game_start)
+    """
+    session = await sio.get_session(sid)
+    if room_manager.draining:
+        await sio.emit('error', {'msg': 'Server is restarting'}, room=sid)
+        return
+    # 已在房间里 (包括掉线留座) 的不能再排队，否则配桌会让同一个人坐进两个房间
+    seated = room_manager.room_of_user(session['user_id'])
+    if seated is not None:
+        await sio.emit('error', {'msg': 'Already in a room', 'room_name': seated.room_name}, room=sid)
+        return
+    points = points_board.points_of(session['user_id'])
+    matchmaker.enqueue(sid, session['user_id'], session['username'], 1000 if points is None else points)
+    await sio.emit('match_queued', {'waiting': len(matchmaker.waiting)}, room=sid)
+
+@sio.event
+async def match_cancel(sid, data=None):
+    session = await sio.get_session(sid)
+    matchmaker.cancel(session['user_id'])
+    await sio.emit('match_cancelled', {}, room=sid)
+
+async def create_matched_tables(tables):
+    """
+    配桌结果批量落库：一个周期内的所有房间和座位在一次提交里写入，然后各自开局
+
+    提交之前失败才抛出异常 (配桌器把玩家放回队列)；提交后房间已经存在，
+    某一桌开局出错只记日志，不影响其他桌，玩家通过 join_room 按重连进入
+    """
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        db_rooms = []
+        for table in tables:
+            db_room = Room(name=f"match-{uuid.uuid4().hex[:12]}", capacity=len(table),
+                           created_by=table[0].user_id, status=RoomStatus.PLAYING, created_at=now)
+            db_room.members = [
+                PlayerInRoom(user_id=t.user_id, player_number=seat, is_ready=True)
+                for seat, t in enumerate(table)
+            ]
+            db_rooms.append(db_room)
+        db.add_all(db_rooms)
+        await db.commit()
+
+    async with outbound.batch() as out:
+        for table, db_room in zip(tables, db_rooms):
+            try:
+                await start_matched_table(out, table, db_room, now)
+            except Exception as e:
+                print(f"Matched table {db_room.name} start error: {e}")
+
+async def start_matched_table(out, table, db_room, now):
+    lobby_index.add(LobbyEntry(
+        db_room.id, db_room.name, db_room.capacity, db_room.status, table[0].user_id,
+        now, len(table), table[0].username
+    ))
+    maj_room = room_manager.create_room(db_room.id, db_room.name)
+    for t in table:
+        # 掉线的玩家在 disconnect 时已移出队列；建房期间才掉线的，之后 join_room 按重连处理
+        maj_room.add_player(t.sid, t.user_id)
+        await sio.enter_room(t.sid, db_room.name)
+        out.emit('room_joined', {'room_id': db_room.id, 'room_name': db_room.name,
+                                 'player_count': len(table), 'msg': 'Match found'}, room=t.sid)
+    deal_game(out, maj_room)
 
 @sio.event
 async def action_discard(sid, data):
@@ -231,43 +576,113 @@ async def action_discard(sid, data):
     出牌
     Data: {'room_name': 'xxx', 'tile': '1m'}
     """
-    session = await sio.get_session(sid)
-    user_id = session['user_id'] # 可用于验证是否轮到该用户
-    
     room_name = data.get('room_name')
-    tile = data.get('tile')
+    if not room_manager.get_room(room_name):
+        return
+    # 只投递，校验和出牌都在房间执行器里按顺序做
+    await send_to_room(sid, room_name, handle_discard, sid, room_name, data.get('tile'))
+
+async def handle_discard(sid, room_name, tile):
     room = room_manager.get_room(room_name)
     
-    if not room:
+    # drain 中房间已冻结移交，动作在新进程上重新发起
+    if not room or room_manager.draining:
+        return
+
+    # 简单的出牌逻辑：只有轮到的座位能出牌；局终 (荣和/流局) 之后的出牌直接忽略
+    if not room.can_discard(sid, tile):
+        return
+
+    await play_discard(room, sid, tile)
+
+async def auto_discard(room_name, seat):
+    """
+    出牌超时：摸切 (打出刚摸到的牌)
+    """
+    room = room_manager.get_room(room_name)
+    if not room or room_manager.draining or not room.is_playing:
+        return
+    # 定时器可能在这一手已经打出后才执行；开局庄家没有摸牌，手里是 13 张，同样按轮次判断
+    if seat != room.turn_index:
+        return
+    sid = room.players[seat]
+    hand = room.hands.get(sid)
+    if hand:
+        await play_discard(room, sid, hand[-1])
+
+def start_turn_timer(room, seat):
+    # 掉线超过宽限的座位立即托管，否则等满出牌时限
+    delay = 0 if seat in room.auto_seats else settings.TURN_TIMEOUT_SECONDS
+    room_manager.set_timer(room.room_name, TIMER_TURN, delay,
+                           room_manager.actors.send_internal, room.room_name, auto_discard, room.room_name, seat)
+
+def disconnect_grace_expired(room_name, seat):
+    room = room_manager.get_room(room_name)
+    if not room or is_online(room.players[seat]):
         return
+    room.auto_seats.add(seat)
+    # 正好轮到该座位：不再等剩余的出牌时限
+    if room.is_playing and room.turn_index == seat:
+        start_turn_timer(room, seat)
+
+def seat_disconnected(sid, user_id, room_name):
+    room = room_manager.get_room(room_name)
+    if not room or not room.is_playing or sid not in room.players:
+        return
+    seat = room.players.index(sid)
+    room.replace_sid(seat, offline_sid(user_id))
+    start_grace_timer(room, seat)
+
+def start_grace_timer(room, seat):
+    room_manager.set_timer(room.room_name, grace_timer(seat), settings.DISCONNECT_GRACE_SECONDS,
+                           room_manager.actors.send_internal, room.room_name, disconnect_grace_expired, room.room_name, seat)
 
-    # 简单的出牌逻辑
-    if tile in room.hands[sid]:
+async def play_discard(room, sid, tile):
+    """
+    出牌并推进：检查荣和，没人和就让下家摸牌
+    """
+    seat = room.players.index(sid)
+    user_id = room.player_ids[seat]
+    room_manager.cancel_timer(room.room_name, TIMER_TURN)
+
+    # 本次出牌产生的所有事件合并后，每个客户端只收到一帧
+    async with outbound.batch() as out:
         room.hands[sid].remove(tile)
         room.discards.append(tile)
+        room.log_action('discard', seat, tile=tile)
         
         # 广播出牌
-        await sio.emit('player_discard', {
+        emit_game(out, room, 'player_discard', {
             'sid': sid, 
+            'seat': seat,
             'user_id': user_id,
             'tile': tile
-        }, room=room_name)
+        })
         
         # 检查胡牌 (Ron)
         for other_sid in room.players:
-            if other_sid != sid and other_sid != "offline":
+            if other_sid != sid and is_online(other_sid):
                 # 这里的 check_win 调用了 yaku_han 算法
                 result = room.check_win(other_sid, tile)
                 if result:
                     # 获取胡牌者的信息
                     # 在实际项目中，应该去 DB 查 username，这里简化
-                    await sio.emit('win_declared', {
+                    emit_game(out, room, 'win_declared', {
                         'winner_sid': other_sid,
                         'from_sid': sid,
                         'result': result # 包含番数、役种
-                    }, room=room_name)
+                    })
                     
-                    # TODO: 游戏结束，写入 Record 到数据库
+                    # 本局结束：牌谱交给后台批量写入，这里不等数据库
+                    winner_seat = room.players.index(other_sid)
+                    from_seat = room.players.index(sid)
+                    room.log_action('ron', winner_seat, tile=tile, from_p=from_seat)
+                    turn_count = room.round_index
+                    round_result = {'type': 'ron', 'winner': winner_seat, 'from': from_seat, 'result': result}
+                    replay_writer.submit(room.room_id, turn_count, room.end_round(), round_result)
+                    # 玩家统计增量累加，同样由后台写库
+                    stats_writer.submit(room.player_ids, round_result)
+                    checkpointer.mark(room, urgent=True)
                     return
 
         # 如果没人胡牌，摸牌 (Draw)
@@ -279,15 +694,32 @@ async def action_discard(sid, data):
         
         new_tile = room.draw_tile(next_sid)
         if new_tile:
+            room.turn_index = next_idx
             # 私发给下家
-            await sio.emit('player_draw', {'tile': new_tile}, room=next_sid)
+            emit_game(out, room, 'player_draw', {'tile': new_tile}, to_sid=next_sid)
             # 广播给其他人（不含牌内容）
-            await sio.emit('player_draw_secret', {'user_idx': next_idx}, room=room_name, skip_sid=next_sid)
+            emit_game(out, room, 'player_draw_secret', {'user_idx': next_idx}, skip_sid=next_sid)
+            start_turn_timer(room, next_idx)
         else:
-            await sio.emit('game_draw', {'msg': 'Wall is empty (Ryuukyoku)'}, room=room_name)
+            emit_game(out, room, 'game_draw', {'msg': 'Wall is empty (Ryuukyoku)'})
+            turn_count = room.round_index
+            replay_writer.submit(room.room_id, turn_count, room.end_round(), {'type': 'ryuukyoku'})
+            stats_writer.submit(room.player_ids, {'type': 'ryuukyoku'})
+            checkpointer.mark(room, urgent=True)
+            return
+
+        # 只做标记，快照由后台任务按预算完成
+        checkpointer.mark(room)
 
 @sio.event
 async def disconnect(sid):
     print(f"Client disconnected: {sid}")
+    outbound.unregister(sid)
+    matchmaker.cancel_sid(sid)
+    # 对局中掉线：座位换成离线占位 (事件只记日志，重连补发)，宽限期过后托管出牌
+    session = await sio.get_session(sid)
+    for room_name in sio.rooms(sid):
+        if room_manager.get_room(room_name):
+            room_manager.actors.send_internal(room_name, seat_disconnected, sid, session['user_id'], room_name)
     # 这里可以添加逻辑：如果正在游戏中，不移除玩家，而是标记掉线
     # 如果在等待中，则从 Room 移除
\ No newline at end of file
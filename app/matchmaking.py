@@ -0,0 +1,146 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+
+class MatchTicket:
+    """
+    排队中的一个玩家
+    """
+    __slots__ = ("sid", "user_id", "username", "points", "enqueued_at")
+
+    def __init__(self, sid: str, user_id: int, username: str, points: int, enqueued_at: float):
+        self.sid = sid
+        self.user_id = user_id
+        self.username = username
+        self.points = points
+        self.enqueued_at = enqueued_at
+
+
+class Matchmaker:
+    """
+    按积分分段的自动配桌队列
+
+    每个周期把排队玩家按积分排序后顺序扫描，相邻 table_size 人的积分差不超过
+    其中等待最短者的允许范围时凑成一桌。允许范围从 base_band 起随等待时间按
+    widen_per_second 放宽，到 max_band 为止，等久了的玩家逐步能和分差更大的人同桌。
+    一个周期内凑出的所有桌子一起交给 on_match，由调用方在一个事务里建房。
+    on_match 抛出异常表示没有建成房，玩家放回队列；建房提交之后的错误由 on_match 自行处理，
+    不能再抛出，否则已经有房间的玩家会被重复配桌。
+    """
+
+    def __init__(self, table_size: int = 4, base_band: int = 100, widen_per_second: float = 50.0,
+                 max_band: int = 2000, interval: float = 0.1, history: int = 10000):
+        self.table_size = table_size
+        self.base_band = base_band
+        self.widen_per_second = widen_per_second
+        self.max_band = max_band
+        self.interval = interval
+        self.waiting: Dict[int, MatchTicket] = {}  # user_id -> ticket
+        self.matched = 0
+        # 最近成功配桌的排队时长 (秒)，用来算分位数
+        self.wait_times: "deque[float]" = deque(maxlen=history)
+        self._on_match: Optional[Callable[[List[List[MatchTicket]]], Awaitable[None]]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def enqueue(self, sid: str, user_id: int, username: str, points: int, now: Optional[float] = None) -> bool:
+        """
+        加入队列；同一用户重复排队只更新 sid，保留原来的排队时间
+        """
+        ticket = self.waiting.get(user_id)
+        if ticket is not None:
+            ticket.sid = sid
+            return False
+        self.waiting[user_id] = MatchTicket(sid, user_id, username, points or 0,
+                                            time.monotonic() if now is None else now)
+        return True
+
+    def cancel(self, user_id: int) -> bool:
+        return self.waiting.pop(user_id, None) is not None
+
+    def cancel_sid(self, sid: str):
+        """
+        断线时按 sid 取消排队
+        """
+        for user_id in [t.user_id for t in self.waiting.values() if t.sid == sid]:
+            del self.waiting[user_id]
+
+    def band(self, ticket: MatchTicket, now: float) -> float:
+        waited = max(0.0, now - ticket.enqueued_at)
+        return min(self.max_band, self.base_band + self.widen_per_second * waited)
+
+    def collect(self, now: Optional[float] = None) -> List[List[MatchTicket]]:
+        """
+        做一轮配桌，返回凑成的桌子 (每桌按积分从高到低)，已配上的玩家移出队列
+        """
+        now = time.monotonic() if now is None else now
+        size = self.table_size
+        if len(self.waiting) < size:
+            return []
+
+        queue = sorted(self.waiting.values(), key=lambda t: (-t.points, t.enqueued_at))
+        bands = [self.band(t, now) for t in queue]
+        tables: List[List[MatchTicket]] = []
+        i = 0
+        while i + size <= len(queue):
+            spread = queue[i].points - queue[i + size - 1].points
+            if spread <= min(bands[i:i + size]):
+                table = queue[i:i + size]
+                tables.append(table)
+                for ticket in table:
+                    del self.waiting[ticket.user_id]
+                    self.wait_times.append(now - ticket.enqueued_at)
+                i += size
+            else:
+                i += 1
+        self.matched += len(tables) * size
+        return tables
+
+    def requeue(self, tables: List[List[MatchTicket]]):
+        """
+        建房没有提交：玩家放回队列，保留原排队时间，撤掉 collect 记下的配桌数和排队时长
+        """
+        for table in tables:
+            for ticket in table:
+                self.waiting.setdefault(ticket.user_id, ticket)
+        count = sum(len(table) for table in tables)
+        self.matched -= count
+        # collect 之后到这里没有别的地方追加样本，最后 count 个就是这批的
+        for _ in range(min(count, len(self.wait_times))):
+            self.wait_times.pop()
+
+    def percentiles(self, points=(50, 90, 99)) -> Dict[str, float]:
+        if not self.wait_times:
+            return {f"p{p}": 0.0 for p in points}
+        ordered = sorted(self.wait_times)
+        last = len(ordered) - 1
+        return {f"p{p}": round(ordered[min(last, int(last * p / 100 + 0.5))], 3) for p in points}
+
+    def stats(self) -> dict:
+        return {"waiting": len(self.waiting), "matched": self.matched, "wait_seconds": self.percentiles()}
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            tables = self.collect()
+            if not tables:
+                continue
+            try:
+                await self._on_match(tables)
+            except Exception as e:
+                print(f"Matchmaking error: {e}")
+                self.requeue(tables)
+
+    def start(self, on_match: Callable[[List[List[MatchTicket]]], Awaitable[None]]):
+        self._on_match = on_match
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+matchmaker = Matchmaker()
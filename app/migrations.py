@@ -0,0 +1,26 @@
+from sqlalchemy import inspect, text
+
+from app.models import Record
+
+# 在已有表上新增的列。create_all 只建缺失的表，不会给老库里已存在的表加列，
+# 启动时在 create_all 之后逐个检查并 ALTER TABLE 补上。只能是可空列，老数据留空。
+ADDED_COLUMNS = [
+    Record.__table__.c.replay_blob,  # 二进制牌谱
+]
+
+
+def add_missing_columns(conn) -> list:
+    """
+    补齐 ADDED_COLUMNS 中数据库里还没有的列 (在 run_sync 里调用)，返回补上的 "表.列"
+    """
+    inspector = inspect(conn)
+    quote = conn.dialect.identifier_preparer.quote
+    added = []
+    for column in ADDED_COLUMNS:
+        table = column.table.name
+        if column.name in {c["name"] for c in inspector.get_columns(table)}:
+            continue
+        column_type = column.type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {quote(table)} ADD COLUMN {quote(column.name)} {column_type}"))
+        added.append(f"{table}.{column.name}")
+    return added
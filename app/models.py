@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Text, Enum
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Text, Enum, LargeBinary, BigInteger
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -28,6 +28,19 @@ class User(Base):
     created_rooms = relationship("Room", back_populates="creator", foreign_keys="[Room.created_by]")
     room_memberships = relationship("PlayerInRoom", back_populates="user", cascade="all, delete-orphan")
 
+# 登录会话 (刷新令牌)，只存令牌的哈希
+class UserSession(Base):
+    __tablename__ = "user_sessions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, index=True, nullable=False) # sha256 hex
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked = Column(Boolean, default=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    user = relationship("User")
+
 # 房间模型
 class Room(Base):
     __tablename__ = "rooms"
@@ -76,13 +89,34 @@ class Record(Base):
     
     turn_count = Column(Integer, nullable=False) # 第几局 (例如: 东1局=0, 东2局=1...)
     
-    # 牌谱数据：存储完整的动作序列 JSON
+    # 牌谱数据：存储完整的动作序列 JSON (旧格式，只读兼容)
     # 格式示例: [{"type": "discard", "p": 0, "tile": "1m"}, ...]
     replay_data = Column(Text, nullable=True) 
+    # 二进制牌谱 (见 app/utils/replay_codec.py)，新记录只写这一列
+    replay_blob = Column(LargeBinary, nullable=True)
     
     result_data = Column(Text, nullable=True) # 这一局的结果 JSON (谁胡了，多少番)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # 关系
-    room = relationship("Room", back_populates="records", foreign_keys=[room_id])
\ No newline at end of file
+    room = relationship("Room", back_populates="records", foreign_keys=[room_id])
+
+# 玩家统计 (按局增量累加，见 app/stats.py)，个人资料页按主键读一行
+class UserStats(Base):
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    games = Column(Integer, nullable=False, default=0)     # 参与的局数
+    wins = Column(Integer, nullable=False, default=0)      # 和了次数
+    deal_ins = Column(Integer, nullable=False, default=0)  # 放铳次数
+    han_total = Column(BigInteger, nullable=False, default=0) # 和了番数合计，平均番 = han_total / wins
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+# 玩家役种统计：(user_id, yaku) 联合主键，同一玩家的役种在索引上连续
+class UserYakuStat(Base):
+    __tablename__ = "user_yaku_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    yaku = Column(String(64), primary_key=True) # yaku_han 的役种名，如 yaku.tanyao
+    count = Column(Integer, nullable=False, default=0)
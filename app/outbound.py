@@ -0,0 +1,95 @@
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.utils.wire_codec import encode_frame
+
+# 客户端在 connect 的 auth 里声明的能力
+CAP_BATCH = "batch"    # 能处理合并后的 batch 帧
+CAP_BINARY = "binary"  # 能解析二进制游戏事件帧 (见 app/utils/wire_codec.py)
+
+BATCH_EVENT = "batch"
+BINARY_EVENT = "g"
+
+
+class Outbound:
+    """
+    出站事件层：记录每个连接的能力，并提供按处理函数合并发送的 EventBatch
+    """
+
+    def __init__(self, sio, namespace: str = "/"):
+        self.sio = sio
+        self.namespace = namespace
+        # sid -> 能力集合
+        self.capabilities: Dict[str, Set[str]] = {}
+
+    def register(self, sid: str, caps: Optional[Iterable[str]], proto: Optional[str] = None):
+        caps = set(caps or ())
+        # 握手时 {'proto': 'bin'} 协商二进制协议，其余情况保持 JSON
+        if proto == "bin":
+            caps.add(CAP_BINARY)
+        self.capabilities[sid] = caps
+
+    def unregister(self, sid: str):
+        self.capabilities.pop(sid, None)
+
+    def supports(self, sid: str, cap: str) -> bool:
+        return cap in self.capabilities.get(sid, ())
+
+    def resolve(self, room: str, skip_sid: Optional[str] = None) -> List[str]:
+        """
+        把 Socket.IO 房间展开成 sid 列表 (每个 sid 自身也是一个房间)
+        """
+        sids = []
+        for participant in self.sio.manager.get_participants(self.namespace, room):
+            sid = participant[0] if isinstance(participant, tuple) else participant
+            if sid != skip_sid:
+                sids.append(sid)
+        return sids
+
+    def batch(self) -> "EventBatch":
+        return EventBatch(self)
+
+
+class EventBatch:
+    """
+    收集一次处理过程中发往各客户端的事件，退出时每个客户端只发一帧
+
+    用法:
+        async with outbound.batch() as out:
+            out.emit('player_discard', {...}, room=room_name)
+            out.emit('player_draw', {...}, room=next_sid)
+    """
+
+    def __init__(self, outbound: Outbound):
+        self.outbound = outbound
+        # sid -> [(event, data, seq), ...]，保持事件原有顺序
+        self.queues: Dict[str, List[Tuple[str, Any, int]]] = {}
+
+    def emit(self, event: str, data: Any, room: str, skip_sid: Optional[str] = None, seq: int = 0):
+        # 目标在入队时展开，保证与直接 emit 时看到的房间成员一致
+        for sid in self.outbound.resolve(room, skip_sid):
+            self.queues.setdefault(sid, []).append((event, data, seq))
+
+    async def flush(self):
+        queues, self.queues = self.queues, {}
+        sio = self.outbound.sio
+        for sid, events in queues.items():
+            if self.outbound.supports(sid, CAP_BINARY):
+                frame = encode_frame(events)
+                if frame is not None:
+                    await sio.emit(BINARY_EVENT, frame, room=sid)
+                    continue
+                # 含有没有二进制格式的事件，整批退回 JSON
+            if len(events) > 1 and self.outbound.supports(sid, CAP_BATCH):
+                await sio.emit(BATCH_EVENT, [[event, data] for event, data, _ in events], room=sid)
+            else:
+                # 老客户端不认识 batch 帧，逐条发送
+                for event, data, _ in events:
+                    await sio.emit(event, data, room=sid)
+
+    async def __aenter__(self) -> "EventBatch":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # 出错时也把已入队的事件发出去，它们对应的状态修改已经生效
+        await self.flush()
+        return False
@@ -0,0 +1,199 @@
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Awaitable, Callable, List, Optional
+
+from sqlalchemy import delete, exists, func, update
+from sqlalchemy.future import select
+
+from app.lobby_index import LobbyIndex
+from app.models import PlayerInRoom, Record, Room, RoomStatus
+from app.seats import is_online, offline_sid
+
+if TYPE_CHECKING:
+    # 只用于类型标注：对局逻辑 (game_manager / checkpoint) 不在回收器的导入链上
+    from app.checkpoint import Checkpointer
+    from app.game_manager import MajRoom, RoomManager
+
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    """
+    粗略估算对象占用的内存 (递归容器和 __dict__/__slots__)，用于统计回收量
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)) or type(obj).__name__ == "deque":
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_sizeof(getattr(obj, name), seen) for name in obj.__slots__ if hasattr(obj, name))
+    return size
+
+
+class Reaper:
+    """
+    空闲房间与掉线玩家的回收
+
+    每轮 (1、2 在各房间的执行器里做)：
+    1. 座位上已经断开的 sid 换成离线占位 (之后的事件只记日志，重连补发)；
+    2. 所有座位都离线超过 abandoned_ttl，或任何房间超过 idle_ttl 没有事件，从内存移除；
+    3. 被回收房间以及各进程都不再持有的陈旧房间 (超过 stale_ttl 没更新)，
+       分批删除 player_in_rooms；没有牌谱的房间行直接删除，有牌谱的标记 FINISHED 保留回放。
+    """
+
+    def __init__(self, room_manager: "RoomManager", checkpointer: "Checkpointer", lobby_index: LobbyIndex,
+                 is_connected: Callable[[str], bool], idle_ttl: float = 1800.0, abandoned_ttl: float = 300.0,
+                 stale_ttl: float = 86400.0, interval: float = 30.0, batch_size: int = 500,
+                 on_reap: Optional[Callable[["MajRoom"], Awaitable[None]]] = None,
+                 on_seat_offline: Optional[Callable[["MajRoom", int], None]] = None):
+        self.room_manager = room_manager
+        self.checkpointer = checkpointer
+        self.lobby_index = lobby_index
+        self.is_connected = is_connected
+        self.idle_ttl = idle_ttl
+        self.abandoned_ttl = abandoned_ttl
+        self.stale_ttl = stale_ttl
+        self.interval = interval
+        self.batch_size = batch_size
+        self.on_reap = on_reap
+        self.on_seat_offline = on_seat_offline
+        self._session_factory: Optional[Callable] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"passes": 0, "rooms_reaped": 0, "sids_cleared": 0, "rows_deleted": 0,
+                      "rooms_finished": 0, "bytes_reclaimed": 0, "last_pass_ms": 0.0}
+
+    def clear_dead_sids(self, room: "MajRoom") -> int:
+        """
+        漏掉 disconnect 事件的座位换成离线占位，并和正常掉线一样交给 on_seat_offline (开始掉线宽限计时)
+        """
+        cleared = 0
+        for seat, sid in enumerate(room.players):
+            if is_online(sid) and not self.is_connected(sid):
+                room.replace_sid(seat, offline_sid(room.player_ids[seat]))
+                if self.on_seat_offline is not None:
+                    self.on_seat_offline(room, seat)
+                cleared += 1
+        return cleared
+
+    def expired(self, room: "MajRoom", now: float) -> bool:
+        idle = now - room.last_active
+        if idle >= self.idle_ttl:
+            return True
+        return idle >= self.abandoned_ttl and not any(is_online(sid) for sid in room.players)
+
+    async def collect(self, now: Optional[float] = None) -> List["MajRoom"]:
+        """
+        清理掉线 sid 并从内存摘下过期房间，返回被摘下的房间
+
+        房间状态只在房间执行器里修改：每个房间投递一个内部事件 (不受收件箱上限限制)，
+        等它们执行完再汇总结果。
+        """
+        now = time.monotonic() if now is None else now
+        loop = asyncio.get_running_loop()
+        visits = []
+        for room in list(self.room_manager.rooms.values()):
+            done = loop.create_future()
+            if self.room_manager.actors.send_internal(room.room_name, self._visit, room, now, done):
+                visits.append(done)
+        reaped = [room for room in await asyncio.gather(*visits) if room is not None]
+        self.stats["rooms_reaped"] += len(reaped)
+        return reaped
+
+    def _visit(self, room: "MajRoom", now: float, done: asyncio.Future):
+        """
+        在房间执行器里执行：清理掉线 sid，过期则移出内存；被摘下的房间通过 done 交回 collect
+        """
+        try:
+            reaped = None
+            # 投递之后房间可能已被别的事件移除或替换
+            if self.room_manager.get_room(room.room_name) is room:
+                self.stats["sids_cleared"] += self.clear_dead_sids(room)
+                if self.expired(room, now):
+                    self.stats["bytes_reclaimed"] += deep_sizeof(room)
+                    self.room_manager.remove_room(room.room_name)
+                    # 不再写快照，否则会把已清空的 on_time_data 写回去
+                    self.checkpointer.dirty.pop(room.room_name, None)
+                    reaped = room
+            done.set_result(reaped)
+        except Exception as e:
+            done.set_exception(e)
+
+    async def purge_rows(self, db, rooms: List["MajRoom"]):
+        """
+        分批清理数据库：被回收的房间 + 超过 stale_ttl 没更新且不在本进程内存里的房间
+        """
+        # 打完过至少一局的房间有牌谱 (可能还在写入队列里)，只标记结束
+        finished = [r.room_id for r in rooms if r.round_index > 0]
+        deletable = [r.room_id for r in rooms if r.round_index == 0]
+
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.stale_ttl)
+        result = await db.execute(
+            select(Room.id, Room.name, exists().where(Record.room_id == Room.id))
+            .where(Room.status != RoomStatus.FINISHED,
+                   func.coalesce(Room.updated_at, Room.created_at) < cutoff)
+            .limit(self.batch_size)
+        )
+        for room_id, room_name, has_records in result.all():
+            if room_name in self.room_manager.rooms:
+                continue  # 本进程还持有的房间由上面的空闲规则判断
+            (finished if has_records else deletable).append(room_id)
+
+        for ids in self._chunks(finished + deletable):
+            result = await db.execute(delete(PlayerInRoom).where(PlayerInRoom.room_id.in_(ids)))
+            self.stats["rows_deleted"] += result.rowcount or 0
+        for ids in self._chunks(finished):
+            await db.execute(
+                update(Room).where(Room.id.in_(ids))
+                .values(status=RoomStatus.FINISHED, on_time_data=None)
+            )
+        for ids in self._chunks(deletable):
+            result = await db.execute(delete(Room).where(Room.id.in_(ids)))
+            self.stats["rows_deleted"] += result.rowcount or 0
+        await db.commit()
+
+        for room_id in finished:
+            self.lobby_index.update(room_id, status=RoomStatus.FINISHED, current_player_count=0)
+        for room_id in deletable:
+            self.lobby_index.remove(room_id)
+        self.stats["rooms_finished"] += len(finished)
+
+    def _chunks(self, ids: List[int]):
+        for start in range(0, len(ids), self.batch_size):
+            yield ids[start:start + self.batch_size]
+
+    async def run_pass(self):
+        started = time.perf_counter()
+        reaped = await self.collect()
+        for room in reaped:
+            if self.on_reap is not None:
+                await self.on_reap(room)
+        if self._session_factory is not None:
+            async with self._session_factory() as db:
+                await self.purge_rows(db, reaped)
+        self.stats["passes"] += 1
+        self.stats["last_pass_ms"] = (time.perf_counter() - started) * 1000
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_pass()
+            except Exception as e:
+                print(f"Reaper error: {e}")
+
+    def start(self, session_factory: Callable):
+        self._session_factory = session_factory
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,65 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from app.models import Record
+from core.background import BackgroundWriter
+
+
+class ReplayWriter(BackgroundWriter):
+    """
+    牌谱批量写入：各房间在一局结束时提交整局动作序列，
+    积累到阈值或定时用一条 INSERT (executemany) 写入 records 表。
+    出牌等热路径只往内存列表里追加，不碰数据库。
+    """
+
+    label = "Replay flush"
+
+    def __init__(self, flush_interval: float = 2.0, max_pending_actions: int = 5000):
+        super().__init__(flush_interval)
+        self.max_pending_actions = max_pending_actions
+        # (Record 行, 动作数)
+        self.pending: List[Tuple[Dict[str, Any], int]] = []
+        self.pending_actions = 0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    def submit(self, room_id: int, turn_count: int, replay: Tuple[bytes, int], result: Optional[dict] = None):
+        """
+        提交一局的牌谱 (MajRoom.end_round 的返回值)，不等待写库
+        """
+        blob, action_count = replay
+        self.pending.append(({
+            "room_id": room_id,
+            "turn_count": turn_count,
+            "replay_blob": blob,
+            "result_data": json.dumps(result, separators=(",", ":")) if result is not None else None,
+        }, action_count))
+        self.pending_actions += action_count
+        # 超过阈值时提前写，不等下一个周期
+        if self.pending_actions >= self.max_pending_actions and self._session_factory is not None:
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.get_running_loop().create_task(self._safe_flush())
+
+    async def flush(self):
+        if self._session_factory is None:
+            return
+        async with self._flush_lock:
+            batch, self.pending = self.pending, []
+            self.pending_actions = 0
+            if not batch:
+                return
+            try:
+                async with self._session_factory() as db:
+                    await db.execute(insert(Record), [row for row, _ in batch])
+                    await db.commit()
+            except Exception:
+                # 写失败放回队首，下一轮重试
+                self.pending = batch + self.pending
+                self.pending_actions += sum(count for _, count in batch)
+                raise
+
+
+replay_writer = ReplayWriter()
@@ -0,0 +1,136 @@
+import asyncio
+import inspect
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class RoomActor:
+    """
+    单个房间的串行执行器：一个任务按顺序消费有界收件箱
+
+    Socket.IO 处理函数和定时器回调只往收件箱里投递，房间状态 (hands/discards/wall 等)
+    只在这个任务里修改。同一房间的事件严格按到达顺序执行，中间的 await 不会让别的
+    事件插进来，不需要加锁；不同房间之间互不影响。
+
+    只有客户端发起的事件受 maxsize 限制；出牌超时、掉线、回收等内部事件走 send_internal，
+    总是排进同一个收件箱，不会因为客户端刷屏被丢掉。
+    """
+
+    def __init__(self, name: str, maxsize: int = 256):
+        self.name = name
+        self.maxsize = maxsize
+        # 队列本身不限长，上限在 send 里检查，内部事件可以越过
+        self.inbox: "asyncio.Queue[Tuple[Optional[Callable], tuple]]" = asyncio.Queue()
+        self.processed = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self.closed = False
+        self._task: Optional[asyncio.Task] = None
+
+    def send(self, fn: Callable, *args: Any) -> bool:
+        """
+        投递一个客户端事件，不等待执行；收件箱满或已关闭时返回 False，由调用方回复客户端稍后重试
+        """
+        if self.closed or self.inbox.qsize() >= self.maxsize:
+            self.rejected += 1
+            return False
+        self._put(fn, args)
+        return True
+
+    def send_internal(self, fn: Callable, *args: Any) -> bool:
+        """
+        投递一个内部事件 (定时器、掉线、回收)，不受收件箱上限限制；只在已关闭时返回 False
+        """
+        if self.closed:
+            return False
+        self._put(fn, args)
+        return True
+
+    def _put(self, fn: Optional[Callable], args: tuple):
+        self.inbox.put_nowait((fn, args))
+        self.max_depth = max(self.max_depth, self.inbox.qsize())
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            fn, args = await self.inbox.get()
+            if fn is None:
+                # close 放入的结束标记：之前的事件都已执行完
+                self.inbox.task_done()
+                return
+            try:
+                result = fn(*args)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                print(f"Room actor {self.name} error: {e}")
+            finally:
+                self.processed += 1
+                self.inbox.task_done()
+
+    async def drain(self):
+        """
+        等收件箱里已有的事件全部执行完
+        """
+        if self._task is not None:
+            await self.inbox.join()
+
+    def close(self):
+        """
+        不再接受新事件；正在执行的和已经排队的事件照常执行完，然后任务退出。
+        可以在本执行器的事件里调用 (如回收房间时)，不会打断当前事件
+        """
+        if self.closed:
+            return
+        self.closed = True
+        if self._task is not None:
+            self.inbox.put_nowait((None, ()))
+
+    def stats(self) -> dict:
+        return {"depth": self.inbox.qsize(), "max_depth": self.max_depth,
+                "processed": self.processed, "rejected": self.rejected}
+
+
+class RoomActors:
+    """
+    room_name -> RoomActor，首次投递时创建，房间移除时关闭
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.actors: Dict[str, RoomActor] = {}
+
+    def send(self, room_name: str, fn: Callable, *args: Any) -> bool:
+        actor = self.actors.get(room_name)
+        if actor is None:
+            actor = self.actors[room_name] = RoomActor(room_name, self.maxsize)
+        return actor.send(fn, *args)
+
+    def send_internal(self, room_name: str, fn: Callable, *args: Any) -> bool:
+        actor = self.actors.get(room_name)
+        if actor is None:
+            actor = self.actors[room_name] = RoomActor(room_name, self.maxsize)
+        return actor.send_internal(fn, *args)
+
+    def close(self, room_name: str):
+        actor = self.actors.pop(room_name, None)
+        if actor is not None:
+            actor.close()
+
+    async def drain(self):
+        for actor in list(self.actors.values()):
+            await actor.drain()
+
+    def stats(self, top: int = 10) -> dict:
+        """
+        汇总指标，外加收件箱最深的几个房间
+        """
+        per_room = {name: actor.stats() for name, actor in self.actors.items()}
+        deepest = sorted(per_room.items(), key=lambda item: item[1]["depth"], reverse=True)[:top]
+        return {
+            "rooms": len(per_room),
+            "queued": sum(s["depth"] for s in per_room.values()),
+            "rejected": sum(s["rejected"] for s in per_room.values()),
+            "max_depth": max((s["max_depth"] for s in per_room.values()), default=0),
+            "deepest": dict(deepest),
+        }
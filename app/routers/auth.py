@@ -8,8 +8,13 @@ from app.models import User
 
 from app.database import get_db
 from app.models import User
-from app.schemas import UserCreate, UserResponse, Token
-from app.security import get_password_hash, verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.schemas import UserCreate, UserResponse, Token, RefreshRequest
+from app.sessions import session_store
+from app.security import get_password_hash_async, verify_password_async, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from core.hash_pool import HashPoolBusy
+from core.config import settings
+from core.security import hash_busy
+from core.user_cache import CachedUser, UserCache, watch_user_model
 from datetime import timedelta
 
 router = APIRouter()
@@ -22,7 +27,10 @@ async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Username or email already exists")
 
     # 2. 创建新用户
-    hashed_pw = get_password_hash(user.password)
+    try:
+        hashed_pw = await get_password_hash_async(user.password)
+    except HashPoolBusy:
+        raise hash_busy()
     new_user = User(
         username=user.username,
         email=user.email,
@@ -42,31 +50,85 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSessi
     result = await db.execute(select(User).where(User.username == form_data.username))
     user = result.scalars().first()
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    try:
+        password_ok = user is not None and await verify_password_async(form_data.password, user.hashed_password)
+    except HashPoolBusy:
+        raise hash_busy()
+
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # 生成 Token
+    # 建立登录会话，之后用 refresh_token 换新 Token，不用再验证密码
+    refresh_token, session = await session_store.create(db, user)
+    return _issue_token(user.id, user.username, session.id, refresh_token)
+
+def _issue_token(user_id: int, username: str, session_id: int, refresh_token: str):
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    # 我们在 Token 里存 user_id 和 sub (username)，方便解析
+    # 我们在 Token 里存 user_id、sub (username) 和会话 sid，方便解析
     access_token = create_access_token(
-        data={"sub": user.username, "user_id": user.id}, 
+        data={"sub": username, "user_id": user_id, "sid": session_id}, 
         expires_delta=access_token_expires
     )
     
     return {
         "access_token": access_token, 
         "token_type": "bearer",
-        "user_id": user.id,
-        "username": user.username
+        "user_id": user_id,
+        "username": username,
+        "refresh_token": refresh_token
     }
+
+@router.post("/refresh", response_model=Token)
+async def refresh(body: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """
+    用刷新令牌换新的 access_token，同时轮换刷新令牌 (旧令牌作废)；
+    会话和用户通常命中内存缓存，不跑 bcrypt
+    """
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    session = await session_store.get_by_token(db, body.refresh_token)
+    if session is None:
+        raise invalid
+
+    # 停用的账号不能再续期
+    user = await user_cache.get(session.user_id, _user_loader(db))
+    if user is None or not user.is_active:
+        raise invalid
+
+    refresh_token = await session_store.rotate(db, session)
+    if refresh_token is None:
+        raise invalid
+    return _issue_token(session.user_id, session.username, session.id, refresh_token)
+
+@router.post("/logout")
+async def logout(body: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """
+    吊销登录会话，绑定该会话的续连票据同时失效
+    """
+    await session_store.revoke(db, body.refresh_token)
+    return {"msg": "Logged out"}
     
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
+# 鉴权用的用户缓存，积分/停用状态通过 ORM 修改时自动失效
+user_cache = UserCache(ttl=settings.USER_CACHE_TTL_SECONDS)
+watch_user_model(user_cache, User)
+
+def _user_loader(db: AsyncSession):
+    # 用户缓存未命中时的读库函数
+    async def load(uid: int):
+        result = await db.execute(select(User).where(User.id == uid))
+        return result.scalars().first()
+    return load
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> CachedUser:
     """
     依赖注入函数：验证 Token 并获取当前 User 对象
     """
@@ -85,11 +147,10 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
     if user_id is None:
         raise credentials_exception
         
-    # 2. 从数据库获取用户
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalars().first()
+    # 2. 获取用户：通常命中缓存，不查 users 表
+    user = await user_cache.get(user_id, _user_loader(db))
     
-    if user is None:
+    if user is None or not user.is_active:
         raise credentials_exception
         
     return user
\ No newline at end of file
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.models import User
+from app.routers.auth import get_current_user
+from core.leaderboard import leaderboard, watch_points
+
+router = APIRouter()
+
+# 积分变更提交后同步到内存排行榜
+watch_points(leaderboard, User)
+
+@router.get("/")
+async def get_top(limit: int = Query(50, ge=1, le=200)):
+    """
+    积分排行榜前 N 名 (内存二分查找，不查 users 表)
+    """
+    return {"total": len(leaderboard), "items": leaderboard.top(limit)}
+
+@router.get("/me")
+async def get_my_rank(radius: int = Query(5, ge=0, le=50), current_user: User = Depends(get_current_user)):
+    """
+    当前用户的名次及前后的玩家
+    """
+    rank = leaderboard.rank(current_user.id)
+    if rank is None:
+        raise HTTPException(status_code=404, detail="User not ranked")
+    return {"rank": rank, "total": len(leaderboard), "items": leaderboard.around(current_user.id, radius)}
@@ -1,4 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
@@ -8,6 +11,8 @@ from app.database import get_db
 from app.models import Room, User, PlayerInRoom, RoomStatus
 from app.schemas import RoomCreate, RoomListItem, RoomDetail
 from app.routers.auth import get_current_user
+from app.lobby_index import LobbyEntry, lobby_index
+from app.game_manager import room_manager
 
 router = APIRouter()
 
@@ -20,6 +25,10 @@ async def create_room_api(
     """
     创建新房间 (HTTP 接口)
     """
+    # 滚动重启 drain 中不再接新房间，客户端稍后重试会落到新进程
+    if room_manager.draining:
+        raise HTTPException(status_code=503, detail="Server is restarting")
+
     # 1. 检查同名房间
     result = await db.execute(select(Room).where(Room.name == room_in.name))
     if result.scalars().first():
@@ -30,7 +39,8 @@ async def create_room_api(
         name=room_in.name,
         capacity=room_in.capacity,
         created_by=current_user.id,
-        status=RoomStatus.WAITING
+        status=RoomStatus.WAITING,
+        created_at=datetime.now(timezone.utc)  # 显式赋值，大厅索引和数据库的排序一致
     )
     db.add(new_room)
     await db.flush() # 拿到 ID
@@ -45,58 +55,36 @@ async def create_room_api(
     db.add(creator_player)
     await db.commit()
     
-    # 4. 构造返回数据 (手动填充 computed fields)
-    return RoomListItem(
-        id=new_room.id,
-        name=new_room.name,
-        capacity=new_room.capacity,
-        status=new_room.status,
-        created_by=new_room.created_by,
-        created_at=new_room.created_at,
-        current_player_count=1, # 刚创建只有1人
-        creator_username=current_user.username
+    # 4. 写入大厅索引并构造返回数据
+    entry = LobbyEntry(
+        new_room.id, new_room.name, new_room.capacity, new_room.status, new_room.created_by,
+        new_room.created_at, 1, current_user.username  # 刚创建只有1人
     )
+    lobby_index.add(entry)
+    return RoomListItem(**entry.to_dict())
 
 @router.get("/", response_model=List[RoomListItem])
 async def get_rooms(
-    skip: int = 0, 
-    limit: int = 20, 
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
     status: str = Query(RoomStatus.WAITING, description="Filter by status (WAITING/PLAYING)"),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    获取大厅房间列表
+    获取大厅房间列表 (按创建时间从新到旧)
+
+    列表来自内存中的大厅索引，只有进程启动后第一次访问时读库；
+    翻页用游标，下一页的游标放在响应头 X-Next-Cursor 里，没有下一页时不返回。
     """
-    # 这是一个复杂的查询：需要 Room 信息 + 关联的 User(房主) + 计算 PlayerInRoom 数量
-    # 为了性能，这里我们用 Python 层面的处理或者预加载 (Eager Loading)
-    
-    query = (
-        select(Room)
-        .options(selectinload(Room.members), selectinload(Room.creator)) # 预加载 members 和 creator
-        .where(Room.status == status)
-        .order_by(Room.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-    )
-    
-    result = await db.execute(query)
-    rooms = result.scalars().all()
-    
-    # 转换为 Schema 格式
-    response_data = []
-    for room in rooms:
-        response_data.append(RoomListItem(
-            id=room.id,
-            name=room.name,
-            capacity=room.capacity,
-            status=room.status,
-            created_by=room.created_by,
-            created_at=room.created_at,
-            current_player_count=len(room.members), # 统计人数
-            creator_username=room.creator.username if room.creator else "Unknown"
-        ))
-        
-    return response_data
+    await lobby_index.ensure_loaded(db)
+    try:
+        entries, next_cursor = lobby_index.page(status, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [RoomListItem(**entry.to_dict()) for entry in entries]
 
 @router.get("/{room_id}", response_model=RoomDetail)
 async def get_room_detail(
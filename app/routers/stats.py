@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.schemas import UserStatsResponse
+from app.stats import load_profile
+
+router = APIRouter()
+
+@router.get("/{user_id}", response_model=UserStatsResponse)
+async def get_user_stats(user_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    个人资料页的统计数据：读聚合表，不扫描牌谱
+    """
+    profile = await load_profile(db, user_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="No stats for this user")
+    return profile
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
 # 用户注册请求体
@@ -24,6 +24,11 @@ class Token(BaseModel):
     token_type: str
     user_id: int
     username: str
+    refresh_token: Optional[str] = None # 用于 /auth/refresh 换新的 access_token
+
+# 刷新 / 注销请求体
+class RefreshRequest(BaseModel):
+    refresh_token: str
     
 class RoomBase(BaseModel):
     name: str
@@ -55,4 +60,14 @@ class PlayerInfo(BaseModel):
         from_attributes = True
 
 class RoomDetail(RoomListItem):
-    players: List[PlayerInfo] = []
\ No newline at end of file
+    players: List[PlayerInfo] = []
+# 玩家统计 (个人资料页)
+class UserStatsResponse(BaseModel):
+    user_id: int
+    games: int
+    wins: int
+    deal_ins: int
+    win_rate: float
+    deal_in_rate: float
+    avg_han: float
+    yaku: Dict[str, int] = {} # 役种名 -> 次数
@@ -0,0 +1,10 @@
+# 座位上的 sid 约定，不依赖对局逻辑，回收、快照等模块可以单独导入
+
+# 掉线/未连接玩家的占位 sid 前缀，每个玩家一个独立占位，避免手牌互相覆盖
+OFFLINE_PREFIX = "offline"
+
+def offline_sid(user_id: int) -> str:
+    return f"{OFFLINE_PREFIX}:{user_id}"
+
+def is_online(sid: str) -> bool:
+    return not sid.startswith(OFFLINE_PREFIX)
@@ -1,23 +1,18 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+
+from core.token_cache import token_verifier
+# 密码哈希 (含哈希线程池版本) 和 core 共用一份实现
+from core.security import verify_password, get_password_hash, verify_password_async, get_password_hash_async  # noqa: F401
 
 # --- 配置 ---
 # 实际生产中请放入环境变量！
 SECRET_KEY = "change_this_to_a_very_secret_key_for_mahjong" 
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # Token 有效期 1 天
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def verify_password(plain_password, hashed_password):
-    """验证密码是否正确"""
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    """获取密码哈希值"""
-    return pwd_context.hash(password)
+RESUME_TOKEN_EXPIRE_SECONDS = 120 # 续连令牌有效期，只用于滚动重启后的重连
+RESUME_TICKET_EXPIRE_SECONDS = 12 * 3600 # Socket.IO 续连票据有效期，每次连接成功都会换新
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """生成 JWT Token"""
@@ -32,10 +27,43 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def decode_access_token(token: str):
-    """解析 Token (用于 SocketIO 验证)"""
+def create_resume_token(user_id: int, username: str, room_name: str, last_seq: int):
+    """
+    生成续连令牌：本身就是一个短期访问令牌，额外带上房间名和事件序号，
+    connect 时带上它可以直接回到原座位
+    """
+    return create_access_token(
+        data={"sub": username, "user_id": user_id, "room_name": room_name, "seq": last_seq},
+        expires_delta=timedelta(seconds=RESUME_TOKEN_EXPIRE_SECONDS)
+    )
+
+def create_resume_ticket(session_id: int, user_id: int, username: str):
+    """
+    生成 Socket.IO 续连票据：绑定登录会话 (sid)，会话吊销后票据随之失效；
+    connect 时只做签名校验和会话缓存查询，不碰 bcrypt 和 users 表
+    """
+    return create_access_token(
+        data={"sub": username, "user_id": user_id, "sid": session_id, "typ": "ticket"},
+        expires_delta=timedelta(seconds=RESUME_TICKET_EXPIRE_SECONDS)
+    )
+
+def _decode(token: str):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        # 走共享的校验缓存，同一会话重复解析不再做 HMAC
+        return token_verifier.decode(token, SECRET_KEY, ALGORITHM)
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+def decode_access_token(token: str):
+    """解析 Token (用于 SocketIO 验证和 HTTP 鉴权)；续连票据有效期长，不能当 access token 用"""
+    payload = _decode(token)
+    if payload is None or payload.get("typ") == "ticket":
+        return None
+    return payload
+
+def decode_resume_ticket(token: str):
+    """解析 Socket.IO 续连票据，只接受 create_resume_ticket 签发的票据"""
+    payload = _decode(token)
+    if payload is None or payload.get("typ") != "ticket" or payload.get("sid") is None:
+        return None
+    return payload
@@ -0,0 +1,158 @@
+import hashlib
+import secrets
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.future import select
+
+from app.models import User, UserSession
+from core.config import settings
+
+REFRESH_TOKEN_EXPIRE_DAYS = 30
+
+
+class SessionEntry:
+    __slots__ = ("id", "user_id", "username", "token_hash", "expires_at", "revoked", "cached_at")
+
+    def __init__(self, id: int, user_id: int, username: str, token_hash: str, expires_at: datetime, revoked: bool):
+        self.id = id
+        self.user_id = user_id
+        self.username = username
+        self.token_hash = token_hash
+        self.expires_at = expires_at
+        self.revoked = revoked
+        self.cached_at = time.monotonic()
+
+    def is_valid(self) -> bool:
+        return not self.revoked and datetime.now(timezone.utc) < self.expires_at
+
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite 读回来不带时区，按 UTC 处理
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class SessionStore:
+    """
+    刷新令牌会话：user_sessions 表为准，内存里缓存最近用过的会话
+
+    刷新 access token、校验续连票据都先查缓存，命中时既不碰 users 表也不跑 bcrypt；
+    缓存未命中 (例如进程重启后) 才查一次库 (会话 JOIN 用户名)。吊销同时更新库和本进程缓存；
+    其他进程的缓存条目最多 ttl 秒后过期重新查库，吊销 (注销) 最迟 ttl 秒在所有进程生效。
+    """
+
+    def __init__(self, ttl: float = 30.0, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._cache: "OrderedDict[int, SessionEntry]" = OrderedDict()
+        self._by_hash: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, entry: SessionEntry) -> SessionEntry:
+        self._cache[entry.id] = entry
+        self._cache.move_to_end(entry.id)
+        self._by_hash[entry.token_hash] = entry.id
+        while len(self._cache) > self.max_size:
+            _, old = self._cache.popitem(last=False)
+            self._by_hash.pop(old.token_hash, None)
+        return entry
+
+    def _forget(self, entry: SessionEntry):
+        self._cache.pop(entry.id, None)
+        if self._by_hash.get(entry.token_hash) == entry.id:
+            del self._by_hash[entry.token_hash]
+
+    def _cached(self, session_id: Optional[int]) -> Optional[SessionEntry]:
+        entry = self._cache.get(session_id) if session_id is not None else None
+        if entry is None:
+            return None
+        if time.monotonic() - entry.cached_at >= self.ttl:
+            # 过期后回库确认，其他进程的吊销/轮换在这里生效
+            self._forget(entry)
+            return None
+        self._cache.move_to_end(session_id)
+        self.hits += 1
+        return entry
+
+    async def _load(self, db, *conditions) -> Optional[SessionEntry]:
+        self.misses += 1
+        result = await db.execute(
+            select(UserSession, User.username)
+            .join(User, User.id == UserSession.user_id)
+            .where(*conditions)
+        )
+        row = result.first()
+        if row is None:
+            return None
+        session, username = row
+        return self._remember(SessionEntry(
+            session.id, session.user_id, username, session.token_hash,
+            _aware(session.expires_at), bool(session.revoked)
+        ))
+
+    async def create(self, db, user: User) -> Tuple[str, SessionEntry]:
+        """
+        登录成功后创建会话，返回 (刷新令牌明文, 会话)；明文只在这里出现一次
+        """
+        token = secrets.token_urlsafe(32)
+        expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        session = UserSession(user_id=user.id, token_hash=hash_refresh_token(token), expires_at=expires_at)
+        db.add(session)
+        await db.commit()
+        entry = SessionEntry(session.id, user.id, user.username, session.token_hash, expires_at, False)
+        return token, self._remember(entry)
+
+    async def get_by_token(self, db, token: str) -> Optional[SessionEntry]:
+        token_hash = hash_refresh_token(token)
+        entry = self._cached(self._by_hash.get(token_hash))
+        if entry is None:
+            entry = await self._load(db, UserSession.token_hash == token_hash)
+        return entry if entry is not None and entry.is_valid() else None
+
+    async def get_by_id(self, db, session_id: int) -> Optional[SessionEntry]:
+        entry = self._cached(session_id)
+        if entry is None:
+            entry = await self._load(db, UserSession.id == session_id)
+        return entry if entry is not None and entry.is_valid() else None
+
+    async def rotate(self, db, entry: SessionEntry) -> Optional[str]:
+        """
+        刷新时轮换刷新令牌：同一会话换一个新令牌，旧令牌立即作废，返回新令牌明文
+        旧令牌已被别处 (另一个进程或被盗用的副本) 抢先轮换时返回 None
+        """
+        token = secrets.token_urlsafe(32)
+        token_hash = hash_refresh_token(token)
+        result = await db.execute(
+            update(UserSession)
+            .where(UserSession.id == entry.id, UserSession.token_hash == entry.token_hash,
+                   UserSession.revoked.is_(False))
+            .values(token_hash=token_hash)
+        )
+        await db.commit()
+        self._forget(entry)
+        if result.rowcount == 0:
+            return None
+        self._remember(SessionEntry(entry.id, entry.user_id, entry.username, token_hash, entry.expires_at, False))
+        return token
+
+    async def revoke(self, db, token: str) -> bool:
+        token_hash = hash_refresh_token(token)
+        result = await db.execute(
+            update(UserSession).where(UserSession.token_hash == token_hash).values(revoked=True)
+        )
+        await db.commit()
+        session_id = self._by_hash.get(token_hash)
+        if session_id in self._cache:
+            self._cache[session_id].revoked = True
+        return result.rowcount > 0
+
+
+session_store = SessionStore(ttl=settings.SESSION_CACHE_TTL_SECONDS)
@@ -0,0 +1,163 @@
+import asyncio
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.future import select
+
+from app.models import UserStats, UserYakuStat
+from core.background import BackgroundWriter
+
+STAT_FIELDS = ("games", "wins", "deal_ins", "han_total")
+
+
+class StatsDelta:
+    """
+    一个玩家尚未写库的统计增量
+    """
+    __slots__ = ("games", "wins", "deal_ins", "han_total", "yaku")
+
+    def __init__(self):
+        self.games = 0
+        self.wins = 0
+        self.deal_ins = 0
+        self.han_total = 0
+        self.yaku: Dict[str, int] = {}
+
+
+def round_deltas(player_ids: List[int], result: Optional[dict]) -> Dict[int, StatsDelta]:
+    """
+    把一局的结果 (与 Record.result_data 同格式) 折算成每个玩家的统计增量。
+    ron 结果里的 result 是 yaku_han 的返回值：{"han", "yakus": [(役种, 番)], "yakuman_yakus": [...]}
+    """
+    deltas: Dict[int, StatsDelta] = {}
+    for user_id in player_ids:
+        deltas.setdefault(user_id, StatsDelta()).games += 1
+    if not result or result.get("type") != "ron":
+        return deltas
+
+    winner = player_ids[result["winner"]]
+    loser = player_ids[result["from"]]
+    deltas[winner].wins += 1
+    deltas[loser].deal_ins += 1
+
+    yaku_result = result.get("result") or {}
+    deltas[winner].han_total += yaku_result.get("han", 0)
+    names = [name for name, han in yaku_result.get("yakus", []) if han > 0]  # 立直没中里宝牌时有 0 番条目，不计入
+    names += [name for name, _ in yaku_result.get("yakuman_yakus", [])]     # 役满条目的番数固定记 0
+    for name in names:
+        deltas[winner].yaku[name] = deltas[winner].yaku.get(name, 0) + 1
+    return deltas
+
+
+class StatsWriter(BackgroundWriter):
+    """
+    玩家统计的增量写入：每局结束时把增量合并进内存，后台定时在一个事务里
+    用 UPDATE ... SET games = games + :n 原子地累加到 user_stats / user_yaku_stats。
+    不读取旧值，多个进程同时写同一玩家也不会互相覆盖；个人资料页只读聚合行，不扫牌谱。
+    """
+
+    label = "Stats flush"
+
+    def __init__(self, flush_interval: float = 2.0):
+        super().__init__(flush_interval)
+        self.pending: Dict[int, StatsDelta] = {}
+        self._flush_lock = asyncio.Lock()
+
+    def submit(self, player_ids: List[int], result: Optional[dict] = None):
+        """
+        提交一局的结果，不等待写库
+        """
+        self._merge(round_deltas(player_ids, result))
+
+    def _merge(self, deltas: Dict[int, StatsDelta]):
+        for user_id, delta in deltas.items():
+            acc = self.pending.get(user_id)
+            if acc is None:
+                self.pending[user_id] = delta
+                continue
+            for field in STAT_FIELDS:
+                setattr(acc, field, getattr(acc, field) + getattr(delta, field))
+            for name, n in delta.yaku.items():
+                acc.yaku[name] = acc.yaku.get(name, 0) + n
+
+    async def flush(self):
+        if self._session_factory is None:
+            return
+        async with self._flush_lock:
+            batch, self.pending = self.pending, {}
+            if not batch:
+                return
+            try:
+                async with self._session_factory() as db:
+                    for user_id in sorted(batch):  # 固定加锁顺序，避免并发事务死锁
+                        await self._apply(db, user_id, batch[user_id])
+                    await db.commit()
+            except Exception:
+                # 整个事务回滚，增量放回，下一轮重试 (并发插入同一新行时撞主键也走这里)
+                self._merge(batch)
+                raise
+
+    @staticmethod
+    async def _apply(db, user_id: int, delta: StatsDelta):
+        values = {field: getattr(delta, field) for field in STAT_FIELDS}
+        result = await db.execute(
+            update(UserStats)
+            .where(UserStats.user_id == user_id)
+            .values({field: getattr(UserStats, field) + n for field, n in values.items()})
+        )
+        if result.rowcount == 0:
+            await db.execute(insert(UserStats).values(user_id=user_id, **values))
+
+        for name, n in delta.yaku.items():
+            result = await db.execute(
+                update(UserYakuStat)
+                .where(UserYakuStat.user_id == user_id, UserYakuStat.yaku == name)
+                .values(count=UserYakuStat.count + n)
+            )
+            if result.rowcount == 0:
+                await db.execute(insert(UserYakuStat).values(user_id=user_id, yaku=name, count=n))
+
+    async def _safe_flush(self):
+        try:
+            await self.flush()
+        except IntegrityError:
+            # 另一个进程刚插入了同一玩家的首行，下一轮走 UPDATE 即可
+            pass
+        except Exception as e:
+            print(f"{self.label} error: {e}")
+
+    async def final_flush(self):
+        try:
+            await self.flush()
+        except IntegrityError:
+            # 停机时没有下一轮了：增量已放回，首行已由另一个进程插入，立即重试一次走 UPDATE
+            await self.flush()
+
+
+async def load_profile(db, user_id: int) -> Optional[dict]:
+    """
+    读取玩家统计：user_stats 按主键取一行，役种按 (user_id, yaku) 主键前缀连带取出，一条查询
+    """
+    result = await db.execute(
+        select(UserStats, UserYakuStat.yaku, UserYakuStat.count)
+        .outerjoin(UserYakuStat, UserYakuStat.user_id == UserStats.user_id)
+        .where(UserStats.user_id == user_id)
+    )
+    rows = result.all()
+    if not rows:
+        return None
+    stats = rows[0][0]
+    return {
+        "user_id": user_id,
+        "games": stats.games,
+        "wins": stats.wins,
+        "deal_ins": stats.deal_ins,
+        "win_rate": stats.wins / stats.games if stats.games else 0.0,
+        "deal_in_rate": stats.deal_ins / stats.games if stats.games else 0.0,
+        "avg_han": stats.han_total / stats.wins if stats.wins else 0.0,
+        "yaku": {yaku: count for _, yaku, count in rows if yaku is not None},
+    }
+
+
+stats_writer = StatsWriter()
@@ -0,0 +1,136 @@
+import asyncio
+import inspect
+from typing import Any, Callable, List, Optional, Set
+
+
+class Timer:
+    """
+    定时器句柄；cancel() 直接从所在槽位移除，O(1)
+    """
+    __slots__ = ("expires", "callback", "args", "slot", "cancelled")
+
+    def __init__(self, expires: int, callback: Callable, args: tuple):
+        self.expires = expires  # 到期的绝对 tick
+        self.callback = callback
+        self.args = args
+        self.slot: Optional[Set["Timer"]] = None
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+        if self.slot is not None:
+            self.slot.discard(self)
+            self.slot = None
+
+
+class TimingWheel:
+    """
+    分层时间轮：所有房间的出牌超时、鸣牌窗口、掉线宽限共用一个后台 tick 任务
+
+    第 0 层每格一个 tick，第 L 层每格 slots^L 个 tick。定时器按剩余时长放进能容纳它的
+    最低层；上层的格子转到时把其中的定时器按剩余时长重新分配到下层 (cascade)。
+    schedule / cancel 都是 O(1)，每个 tick 只处理到期的那一格，与房间数无关。
+    默认 0.1 秒 × 64 格 × 4 层，可覆盖约 19 天，更远的定时器停在最高层逐轮下放。
+    """
+
+    def __init__(self, tick: float = 0.1, slots: int = 64, levels: int = 4):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.wheels: List[List[Set[Timer]]] = [[set() for _ in range(slots)] for _ in range(levels)]
+        self.current = 0  # 已经处理完的 tick
+        self._origin: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        # 协程回调的任务：留住引用，免得执行中被回收，结束时打印异常
+        self._callback_tasks: Set[asyncio.Task] = set()
+
+    def _place(self, timer: Timer):
+        delta = timer.expires - self.current
+        level = 0
+        span = self.slots
+        while delta >= span and level < self.levels - 1:
+            level += 1
+            span *= self.slots
+        index = (timer.expires // (span // self.slots)) % self.slots
+        slot = self.wheels[level][index]
+        slot.add(timer)
+        timer.slot = slot
+
+    def schedule(self, delay: float, callback: Callable, *args: Any) -> Timer:
+        """
+        delay 秒后调用 callback(*args)；callback 可以是普通函数或协程函数，精度为一个 tick
+        """
+        ticks = max(1, int(delay / self.tick + 0.999999))
+        timer = Timer(self.current + ticks, callback, args)
+        self._place(timer)
+        return timer
+
+    def _cascade(self, level: int):
+        index = (self.current // self.slots ** level) % self.slots
+        slot = self.wheels[level][index]
+        self.wheels[level][index] = set()
+        for timer in slot:
+            self._place(timer)
+
+    def _step(self) -> List[Timer]:
+        self.current += 1
+        # 从高层往低层下放，保证本 tick 到期的定时器都落到第 0 层
+        for level in range(self.levels - 1, 0, -1):
+            if self.current % self.slots ** level == 0:
+                self._cascade(level)
+        index = self.current % self.slots
+        due = self.wheels[0][index]
+        self.wheels[0][index] = set()
+        fired = []
+        for timer in due:
+            timer.slot = None
+            if timer.expires <= self.current and not timer.cancelled:
+                fired.append(timer)
+            else:
+                self._place(timer)  # 还没到期 (最高层溢出的定时器)，重新放置
+        return fired
+
+    def advance(self, ticks: int = 1) -> int:
+        """
+        推进若干 tick 并执行到期回调，返回执行的回调数
+        """
+        fired = 0
+        for _ in range(ticks):
+            for timer in self._step():
+                fired += 1
+                try:
+                    result = timer.callback(*timer.args)
+                    if inspect.isawaitable(result):
+                        task = asyncio.ensure_future(result)
+                        self._callback_tasks.add(task)
+                        task.add_done_callback(self._callback_done)
+                except Exception as e:
+                    print(f"Timer callback error: {e}")
+        return fired
+
+    def _callback_done(self, task: asyncio.Task):
+        self._callback_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Timer callback error: {task.exception()}")
+
+    def pending(self) -> int:
+        return sum(len(slot) for wheel in self.wheels for slot in wheel)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        self._origin = loop.time() - self.current * self.tick
+        while True:
+            await asyncio.sleep(self.tick)
+            # 按墙钟补齐落后的 tick，事件循环卡顿时也不会整体延后
+            target = int((loop.time() - self._origin) / self.tick)
+            if target > self.current:
+                self.advance(target - self.current)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,344 @@
+import io
+import json
+import struct
+import zlib
+from bisect import bisect_right
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from app.utils.wire_codec import (
+    WireDecodeError, WireTruncatedError, read_fields, read_varint, write_fields, write_varint
+)
+
+# 二进制牌谱格式
+#
+# 文件头: MAGIC(4字节) + 版本号(1字节) + 标志位(1字节)
+#
+# v1 正文: 连续的动作，标志位 FLAG_ZLIB 置位时正文整体为 zlib 流 (只读兼容)
+#
+# v2 正文: 若干数据块 + 长度为 0 的结束标记 + 偏移索引 + 4 字节索引位置(小端，相对正文起点)
+#   数据块 = varint 块长度 + 块内容 (FLAG_ZLIB 置位时每块单独压缩)
+#   块内容 = 关键帧 + 最多 keyframe_interval 个动作
+#   关键帧 = 该块第一个动作之前的房间状态 (各家手牌、牌河、牌山余量、轮次)
+#   索引   = varint 块数 + 每块 (第一个动作序号, 块偏移) + varint 动作总数
+#   跳转到任意动作只需解压一块、最多重放 keyframe_interval 个动作
+#
+# 一个动作 = 动作编号(1字节) + 座位号(varint) + 按 ACTION_SCHEMAS 排列的字段
+# 动作编号 0 为兜底格式: 座位号之后是整条动作的 JSON (str 字段)
+#
+# 动作在内存中的形式与 Record.replay_data 的 JSON 一致:
+#   {"type": "discard", "p": 0, "tile": "1m"}
+
+MAGIC = b"QSRP"
+VERSION = 2
+FLAG_ZLIB = 0x01
+HEADER_SIZE = len(MAGIC) + 2
+FOOTER = struct.Struct("<I")
+
+RAW_ACTION = 0
+
+# 动作类型 -> (动作编号, [(字段名, 字段类型), ...])，字段类型同 wire_codec
+ACTION_SCHEMAS: Dict[str, Tuple[int, List[Tuple[str, str]]]] = {
+    "deal": (1, [("hand", "tiles")]),
+    "draw": (2, [("tile", "tile")]),
+    "discard": (3, [("tile", "tile")]),
+    "ron": (4, [("tile", "tile"), ("from_p", "uint")]),
+    "tsumo": (5, [("tile", "tile")]),
+}
+
+ACTION_TYPES = {code: name for name, (code, _) in ACTION_SCHEMAS.items()}
+ACTION_KEYS = {name: {"type", "p"} | {field for field, _ in fields} for name, (_, fields) in ACTION_SCHEMAS.items()}
+RAW_FIELDS = [("action", "json")]
+KEYFRAME_FIELDS = [("discards", "tiles"), ("wall_count", "uint"), ("turn_index", "uint")]
+
+READ_CHUNK = 4096
+
+
+def encode_action(buf: bytearray, action: Dict[str, Any]):
+    action_type = action["type"]
+    # 字段与格式完全一致才用紧凑编码，其余动作原样存 JSON，保证不丢信息
+    if ACTION_KEYS.get(action_type) == action.keys():
+        code, fields = ACTION_SCHEMAS[action_type]
+        buf.append(code)
+        write_varint(buf, action["p"])
+        write_fields(buf, fields, action)
+    else:
+        buf.append(RAW_ACTION)
+        write_varint(buf, action.get("p", 0))
+        write_fields(buf, RAW_FIELDS, {"action": action})
+
+
+def decode_action(data, pos: int) -> Tuple[Dict[str, Any], int]:
+    if pos >= len(data):
+        raise WireTruncatedError("Truncated action")
+    code = data[pos]
+    seat, pos = read_varint(data, pos + 1)
+    if code == RAW_ACTION:
+        fields, pos = read_fields(data, pos, RAW_FIELDS)
+        return fields["action"], pos
+    if code not in ACTION_TYPES:
+        raise WireDecodeError("Unknown action code: {}".format(code))
+    action_type = ACTION_TYPES[code]
+    fields, pos = read_fields(data, pos, ACTION_SCHEMAS[action_type][1])
+    action = {"type": action_type, "p": seat}
+    action.update(fields)
+    return action, pos
+
+
+def encode_keyframe(buf: bytearray, state: Optional[Dict[str, Any]]):
+    """
+    state: {"hands": [[...], ...], "discards": [...], "wall_count": int, "turn_index": int}
+    """
+    if state is None:
+        buf.append(0)
+        return
+    buf.append(1)
+    write_varint(buf, len(state["hands"]))
+    for hand in state["hands"]:
+        write_fields(buf, [("hand", "tiles")], {"hand": hand})
+    write_fields(buf, KEYFRAME_FIELDS, state)
+
+
+def decode_keyframe(data, pos: int) -> Tuple[Optional[Dict[str, Any]], int]:
+    if pos >= len(data):
+        raise WireTruncatedError("Truncated keyframe")
+    if data[pos] == 0:
+        return None, pos + 1
+    seats, pos = read_varint(data, pos + 1)
+    hands = []
+    for _ in range(seats):
+        fields, pos = read_fields(data, pos, [("hand", "tiles")])
+        hands.append(fields["hand"])
+    state, pos = read_fields(data, pos, KEYFRAME_FIELDS)
+    state["hands"] = hands
+    return state, pos
+
+
+class ReplayEncoder:
+    """
+    增量编码器：对局进行中逐条 append，局终调用 finish 取出完整牌谱
+
+    snapshot 为返回当前房间状态的回调，每 keyframe_interval 个动作记一个关键帧；
+    动作应在状态修改之后记录，这样关键帧正好是下一个动作之前的状态。
+    """
+
+    def __init__(self, compress: bool = True, keyframe_interval: int = 32,
+                 snapshot: Optional[Callable[[], Dict[str, Any]]] = None):
+        self.compress = compress
+        self.keyframe_interval = keyframe_interval
+        self.snapshot = snapshot
+        self.count = 0
+        self._body: List[bytes] = []
+        self._body_size = 0
+        self._index: List[Tuple[int, int]] = []  # (块内第一个动作序号, 块偏移)
+        self._chunk = bytearray()
+        self._chunk_actions = 0
+        self._start_chunk()
+
+    def _start_chunk(self):
+        self._chunk = bytearray()
+        self._chunk_actions = 0
+        self._chunk_first = self.count
+        encode_keyframe(self._chunk, self.snapshot() if self.snapshot else None)
+
+    def _close_chunk(self):
+        stored = zlib.compress(bytes(self._chunk), 6) if self.compress else bytes(self._chunk)
+        prefix = bytearray()
+        write_varint(prefix, len(stored))
+        self._index.append((self._chunk_first, self._body_size))
+        self._body.append(bytes(prefix))
+        self._body.append(stored)
+        self._body_size += len(prefix) + len(stored)
+
+    def append(self, action: Dict[str, Any]):
+        encode_action(self._chunk, action)
+        self.count += 1
+        self._chunk_actions += 1
+        # 块满了就封块，下一块以当前状态作为关键帧
+        if self._chunk_actions >= self.keyframe_interval:
+            self._close_chunk()
+            self._start_chunk()
+
+    def finish(self) -> bytes:
+        if self._chunk_actions or not self._index:
+            self._close_chunk()
+        body = b"".join(self._body) + b"\x00"
+        index = bytearray()
+        write_varint(index, len(self._index))
+        for first, offset in self._index:
+            write_varint(index, first)
+            write_varint(index, offset)
+        write_varint(index, self.count)
+        header = MAGIC + bytes([VERSION, FLAG_ZLIB if self.compress else 0])
+        return header + body + bytes(index) + FOOTER.pack(len(body))
+
+
+def _as_file(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return source
+
+
+def _read_header(read) -> Tuple[int, int]:
+    header = read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or header[:len(MAGIC)] != MAGIC:
+        raise WireDecodeError("Not a replay blob")
+    version = header[len(MAGIC)]
+    if version not in (1, VERSION):
+        raise WireDecodeError("Unsupported replay version: {}".format(version))
+    return version, header[len(MAGIC) + 1]
+
+
+def _read_stream_varint(read) -> int:
+    result = 0
+    shift = 0
+    while True:
+        byte = read(1)
+        if not byte:
+            raise WireTruncatedError("Truncated varint")
+        result |= (byte[0] & 0x7F) << shift
+        if not byte[0] & 0x80:
+            return result
+        shift += 7
+
+
+def _read_chunk(read, flags: int) -> Optional[bytes]:
+    """读一个数据块并解压，遇到结束标记返回 None"""
+    length = _read_stream_varint(read)
+    if length == 0:
+        return None
+    stored = read(length)
+    if len(stored) < length:
+        raise WireTruncatedError("Truncated chunk")
+    return zlib.decompress(stored) if flags & FLAG_ZLIB else stored
+
+
+def _iter_chunk(chunk: bytes, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    _, pos = decode_keyframe(chunk, 0)
+    count = 0
+    while pos < len(chunk) and (limit is None or count < limit):
+        action, pos = decode_action(chunk, pos)
+        count += 1
+        yield action
+
+
+def _iter_v1(read, flags: int) -> Iterator[Dict[str, Any]]:
+    decompressor = zlib.decompressobj() if flags & FLAG_ZLIB else None
+    buf = bytearray()
+    pos = 0
+    eof = False
+    while True:
+        if pos < len(buf):
+            try:
+                action, new_pos = decode_action(buf, pos)
+            except WireTruncatedError:
+                if eof:
+                    raise
+            else:
+                pos = new_pos
+                yield action
+                continue
+        elif eof:
+            return
+
+        # 需要更多数据：丢掉已解码部分，再读一块
+        del buf[:pos]
+        pos = 0
+        chunk = read(READ_CHUNK)
+        if not chunk:
+            eof = True
+            if decompressor is not None:
+                buf += decompressor.flush()
+        elif decompressor is not None:
+            buf += decompressor.decompress(chunk)
+        else:
+            buf += chunk
+
+
+def iter_replay(source: Union[bytes, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    流式解码：source 可以是 bytes 或带 read(n) 的文件对象，
+    按块读入、解压，逐条产出动作，不需要把整个牌谱载入内存
+    """
+    read = _as_file(source).read
+    version, flags = _read_header(read)
+    if version == 1:
+        yield from _iter_v1(read, flags)
+        return
+    while True:
+        chunk = _read_chunk(read, flags)
+        if chunk is None:
+            return
+        yield from _iter_chunk(chunk)
+
+
+class ReplayReader:
+    """
+    随机访问 v2 牌谱：source 为 bytes 或可 seek 的文件对象
+    """
+
+    def __init__(self, source: Union[bytes, Any]):
+        self.file = _as_file(source)
+        self.file.seek(0)
+        version, self.flags = _read_header(self.file.read)
+        if version != VERSION:
+            raise WireDecodeError("Replay version {} has no keyframe index".format(version))
+        self.body_start = self.file.tell()
+
+        self.file.seek(-FOOTER.size, io.SEEK_END)
+        (index_offset,) = FOOTER.unpack(self.file.read(FOOTER.size))
+        self.file.seek(self.body_start + index_offset)
+        index = self.file.read()[:-FOOTER.size]
+        chunk_count, pos = read_varint(index, 0)
+        self.chunk_firsts: List[int] = []
+        self.chunk_offsets: List[int] = []
+        for _ in range(chunk_count):
+            first, pos = read_varint(index, pos)
+            offset, pos = read_varint(index, pos)
+            self.chunk_firsts.append(first)
+            self.chunk_offsets.append(offset)
+        self.action_count, pos = read_varint(index, pos)
+
+    def _load_chunk(self, chunk_no: int) -> bytes:
+        self.file.seek(self.body_start + self.chunk_offsets[chunk_no])
+        return _read_chunk(self.file.read, self.flags)
+
+    def seek(self, action_index: int) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        返回 (关键帧状态, 关键帧之后到 action_index 之前的动作)
+        重放这些动作即得到第 action_index 个动作之前的状态
+        """
+        if not 0 <= action_index <= self.action_count:
+            raise IndexError("Action index out of range: {}".format(action_index))
+        chunk_no = max(bisect_right(self.chunk_firsts, action_index) - 1, 0)
+        chunk = self._load_chunk(chunk_no)
+        state, _ = decode_keyframe(chunk, 0)
+        actions = list(_iter_chunk(chunk, action_index - self.chunk_firsts[chunk_no]))
+        return state, actions
+
+    def iter_from(self, action_index: int) -> Iterator[Dict[str, Any]]:
+        """
+        从第 action_index 个动作开始顺序产出动作
+        """
+        chunk_no = max(bisect_right(self.chunk_firsts, action_index) - 1, 0)
+        skip = action_index - self.chunk_firsts[chunk_no]
+        for no in range(chunk_no, len(self.chunk_firsts)):
+            for action in _iter_chunk(self._load_chunk(no)):
+                if skip:
+                    skip -= 1
+                    continue
+                yield action
+
+
+def decode_replay(blob: bytes) -> List[Dict[str, Any]]:
+    return list(iter_replay(blob))
+
+
+def load_replay(replay_blob: Union[bytes, None], replay_data: Union[str, None]) -> List[Dict[str, Any]]:
+    """
+    读取一条 Record 的牌谱，兼容旧的 JSON 文本格式
+    """
+    if replay_blob:
+        return decode_replay(replay_blob)
+    if replay_data:
+        return json.loads(replay_data)
+    return []
@@ -0,0 +1,201 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.riichi.yaku_han import convert_tile_to_num
+
+# 二进制游戏事件协议
+#
+# 一帧 = 版本号(1字节) + 若干事件
+# 一个事件 = 事件类型(1字节) + 序号(varint) + 按 EVENT_SCHEMAS 顺序排列的字段
+#
+# 字段类型:
+#   uint  无符号 varint (座位、user_id 等)
+#   bool  1 字节
+#   tile  1 字节: 低 6 位为牌号 0-33，最高位为赤宝牌标记
+#   tiles varint 张数 + 每张 1 字节
+#   str   varint 长度 + utf-8
+#   json  与 str 相同，内容为 JSON (胡牌结果这类低频、结构复杂的数据)
+
+PROTOCOL_VERSION = 1
+
+RED_FLAG = 0x80
+RED_TILE_NUMS = {4: "0m", 13: "0p", 22: "0s"}
+
+# 事件名 -> (类型编号, [(字段名, 字段类型), ...])
+EVENT_SCHEMAS: Dict[str, Tuple[int, List[Tuple[str, str]]]] = {
+    "player_discard": (1, [("seat", "uint"), ("user_id", "uint"), ("tile", "tile")]),
+    "player_draw": (2, [("tile", "tile")]),
+    "player_draw_secret": (3, [("user_idx", "uint")]),
+    "game_start": (4, [("seat", "uint"), ("hand", "tiles"), ("dora", "tile")]),
+    "win_declared": (5, [("winner_sid", "str"), ("from_sid", "str"), ("result", "json")]),
+    "game_draw": (6, [("msg", "str")]),
+    "resync": (7, [("seat", "uint"), ("hand", "tiles"), ("discards", "tiles"), ("turn_index", "uint"),
+                   ("wall_count", "uint"), ("dora", "tile"), ("is_playing", "bool")]),
+    # WebSocket 房间事件
+    "player_joined": (16, [("user_id", "uint"), ("username", "str"), ("is_admin", "bool")]),
+    "player_ready": (17, [("user_id", "uint"), ("username", "str"), ("all_ready", "bool")]),
+    "player_unready": (18, [("user_id", "uint"), ("username", "str")]),
+    "game_action": (19, [("user_id", "uint"), ("username", "str"), ("action", "json"), ("details", "json")]),
+}
+
+EVENT_NAMES = {type_id: name for name, (type_id, _) in EVENT_SCHEMAS.items()}
+SCHEMA_KEYS = {name: {field for field, _ in fields} for name, (_, fields) in EVENT_SCHEMAS.items()}
+
+
+class WireDecodeError(ValueError):
+    pass
+
+
+class WireTruncatedError(WireDecodeError):
+    """数据不完整，流式解码时表示需要读入更多字节"""
+    pass
+
+
+def encode_tile(tile: str) -> int:
+    """牌 -> 字节，例如 "1m" -> 0，"0m"(赤五万) -> 4 | 0x80"""
+    num = convert_tile_to_num(tile)
+    if tile[0] == "0":
+        return num | RED_FLAG
+    return num
+
+
+def decode_tile(byte: int) -> str:
+    num = byte & ~RED_FLAG
+    if byte & RED_FLAG:
+        if num not in RED_TILE_NUMS:
+            raise WireDecodeError("Invalid red tile: {}".format(num))
+        return RED_TILE_NUMS[num]
+    if num < 27:
+        return "{}{}".format(num % 9 + 1, "mps"[num // 9])
+    if num < 31:
+        return "{}z".format(num - 26)
+    if num < 34:
+        return "{}z".format(38 - num)  # 31 32 33 是中发白，对应 7z 6z 5z
+    raise WireDecodeError("Invalid tile number: {}".format(num))
+
+
+def write_varint(buf: bytearray, value: int):
+    if value < 0:
+        raise ValueError("varint must be non-negative")
+    while value >= 0x80:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def read_varint(data, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise WireTruncatedError("Truncated varint")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _write_bytes(buf: bytearray, raw: bytes):
+    write_varint(buf, len(raw))
+    buf += raw
+
+
+def _read_bytes(data, pos: int) -> Tuple[bytes, int]:
+    length, pos = read_varint(data, pos)
+    if pos + length > len(data):
+        raise WireTruncatedError("Truncated field")
+    return bytes(data[pos:pos + length]), pos + length
+
+
+def can_encode(event: str, data: Any) -> bool:
+    """
+    事件有固定格式且包含全部字段时才走二进制，否则退回 JSON
+    格式之外的字段 (例如 sid，二进制客户端用座位号识别玩家) 不进入二进制帧
+    """
+    keys = SCHEMA_KEYS.get(event)
+    return keys is not None and isinstance(data, dict) and keys <= data.keys()
+
+
+def write_fields(buf: bytearray, fields: List[Tuple[str, str]], data: Dict[str, Any]):
+    """按字段表把 data 写入 buf (事件帧和牌谱共用)"""
+    for name, kind in fields:
+        value = data[name]
+        if kind == "uint":
+            write_varint(buf, value)
+        elif kind == "bool":
+            buf.append(1 if value else 0)
+        elif kind == "tile":
+            buf.append(encode_tile(value))
+        elif kind == "tiles":
+            write_varint(buf, len(value))
+            buf += bytes(encode_tile(tile) for tile in value)
+        elif kind == "str":
+            _write_bytes(buf, value.encode("utf-8"))
+        elif kind == "json":
+            _write_bytes(buf, json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+
+def read_fields(data, pos: int, fields: List[Tuple[str, str]]) -> Tuple[Dict[str, Any], int]:
+    """按字段表从 data[pos:] 读出字段，返回 (字段字典, 新位置)"""
+    result = {}
+    try:
+        for name, kind in fields:
+            if kind == "uint":
+                result[name], pos = read_varint(data, pos)
+            elif kind == "bool":
+                result[name] = bool(data[pos])
+                pos += 1
+            elif kind == "tile":
+                result[name] = decode_tile(data[pos])
+                pos += 1
+            elif kind == "tiles":
+                count, pos = read_varint(data, pos)
+                if pos + count > len(data):
+                    raise WireTruncatedError("Truncated field")
+                result[name] = [decode_tile(b) for b in data[pos:pos + count]]
+                pos += count
+            else:
+                raw, pos = _read_bytes(data, pos)
+                text = raw.decode("utf-8")
+                result[name] = json.loads(text) if kind == "json" else text
+    except IndexError:
+        raise WireTruncatedError("Truncated field")
+    return result, pos
+
+
+def encode_event(buf: bytearray, event: str, data: Dict[str, Any], seq: int = 0):
+    type_id, fields = EVENT_SCHEMAS[event]
+    buf.append(type_id)
+    write_varint(buf, seq)
+    write_fields(buf, fields, data)
+
+
+def encode_frame(events: List[Tuple[str, Any, int]]) -> Optional[bytes]:
+    """
+    把 [(event, data, seq), ...] 编码为一帧；有任何事件无法编码时返回 None
+    """
+    if not all(can_encode(event, data) for event, data, _ in events):
+        return None
+    buf = bytearray([PROTOCOL_VERSION])
+    for event, data, seq in events:
+        encode_event(buf, event, data, seq)
+    return bytes(buf)
+
+
+def decode_frame(frame: bytes) -> List[Tuple[str, Dict[str, Any], int]]:
+    if not frame or frame[0] != PROTOCOL_VERSION:
+        raise WireDecodeError("Unsupported protocol version")
+    events = []
+    pos = 1
+    while pos < len(frame):
+        type_id = frame[pos]
+        pos += 1
+        if type_id not in EVENT_NAMES:
+            raise WireDecodeError("Unknown event type: {}".format(type_id))
+        event = EVENT_NAMES[type_id]
+        seq, pos = read_varint(frame, pos)
+        data, pos = read_fields(frame, pos, EVENT_SCHEMAS[event][1])
+        events.append((event, data, seq))
+    return events
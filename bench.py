@@ -0,0 +1,103 @@
+"""
+REST 鉴权接口压测：进程内通过 ASGI 直接调用 main.app (不经过网络)，
+数据库用临时目录下的 SQLite 文件。
+
+    python bench.py [--concurrency 50] [--requests 2000] [--logins 40]
+
+/me 每次请求都解析令牌并加载用户，是最能反映会话/依赖开销的接口；
+/login 的耗时主要在 bcrypt 上，只跑少量请求。结果只打印，不写文件。
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp(prefix="queshin-bench-")
+# 必须在导入 core.config 之前设置
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmp}/bench.db"
+
+import httpx  # noqa: E402
+
+from main import app  # noqa: E402
+
+API = "/api/v1/auth"
+
+
+async def timed(client, method, url, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    elapsed = time.perf_counter() - start
+    if response.status_code >= 400:
+        raise RuntimeError(f"{method} {url} -> {response.status_code}: {response.text}")
+    return response, elapsed
+
+
+async def run_load(name, total, concurrency, make_request):
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker():
+        while not queue.empty():
+            i = queue.get_nowait()
+            latencies.append(await make_request(i))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return (
+        f"{name:<8} {total:>6} req  {total / wall:>9.1f} req/s  "
+        f"p50 {statistics.median(latencies) * 1000:>7.2f} ms  p99 {p99 * 1000:>7.2f} ms"
+    )
+
+
+async def main(args):
+    await app.router.startup()
+    lines = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        users = [f"bench{i}" for i in range(args.users)]
+
+        async def register(i):
+            _, elapsed = await timed(client, "POST", f"{API}/register", json={
+                "username": users[i], "email": f"{users[i]}@example.com", "password": "secret",
+            })
+            return elapsed
+        lines.append(await run_load("register", len(users), args.concurrency, register))
+
+        async def login(i):
+            _, elapsed = await timed(client, "POST", f"{API}/login", data={
+                "username": users[i % len(users)], "password": "secret",
+            })
+            return elapsed
+        lines.append(await run_load("login", args.logins, args.concurrency, login))
+
+        tokens = []
+        for name in users:
+            response, _ = await timed(client, "POST", f"{API}/login", data={"username": name, "password": "secret"})
+            tokens.append(response.json()["access_token"])
+
+        async def me(i):
+            _, elapsed = await timed(client, "GET", f"{API}/me", headers={
+                "Authorization": f"Bearer {tokens[i % len(tokens)]}",
+            })
+            return elapsed
+        lines.append(await run_load("me", args.requests, args.concurrency, me))
+    await app.router.shutdown()
+
+    print("\n".join(lines))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--users", type=int, default=20)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,50 @@
+import asyncio
+from typing import Callable, Optional
+
+
+class BackgroundWriter:
+    """
+    后台批量写库任务的公共骨架 (RoomStore / ReplayWriter / Checkpointer 共用)
+
+    start 记下 session 工厂并启动循环：每次 _wait 返回后调一次 flush，出错只打印，
+    留给下一轮重试；stop 取消循环后再做一轮 final_flush，把内存里剩下的数据写掉。
+    子类实现 flush；需要提前唤醒的覆盖 _wait，停机写回有特殊处理的覆盖 final_flush。
+    """
+
+    label = "Background flush"
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._session_factory: Optional[Callable] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def flush(self):
+        raise NotImplementedError
+
+    async def final_flush(self):
+        await self.flush()
+
+    async def _wait(self):
+        await asyncio.sleep(self.flush_interval)
+
+    async def _safe_flush(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"{self.label} error: {e}")
+
+    async def _run(self):
+        while True:
+            await self._wait()
+            await self._safe_flush()
+
+    def start(self, session_factory: Callable):
+        self._session_factory = session_factory
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.final_flush()
@@ -13,6 +13,15 @@ class Settings(BaseSettings):
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+    # 鉴权用户缓存的有效期(秒)，也是其他进程里停用用户生效的最长延迟 (失效事件只在本进程内触发)
+    USER_CACHE_TTL_SECONDS: float = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+    # 登录会话缓存的有效期(秒)，也是其他进程里吊销 (注销) 生效的最长延迟
+    SESSION_CACHE_TTL_SECONDS: float = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "30"))
+
+    # 密码哈希线程池 (core/hash_pool.py)
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
     # 数据库配置
     MYSQL_SERVER: str = os.getenv("MYSQL_SERVER", "localhost")
     MYSQL_USER: str = os.getenv("MYSQL_USER", "root")
@@ -24,11 +33,44 @@ class Settings(BaseSettings):
     def assemble_db_connection(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
         if isinstance(v, str):
             return v
-        return f"mysql+aiomysql://{values.get('MYSQL_USER')}:{values.get('MYSQL_PASSWORD')}@{values.get('MYSQL_SERVER')}/{values.get('MYSQL_DB')}"
+        return f"mysql+asyncmy://{values.get('MYSQL_USER')}:{values.get('MYSQL_PASSWORD')}@{values.get('MYSQL_SERVER')}/{values.get('MYSQL_DB')}"
+
+    # 连接池与引擎配置 (core/engine.py)，两套服务共用
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # 秒，要小于 MySQL wait_timeout
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_POOL_SLOW_CHECKOUT_MS: float = float(os.getenv("DB_POOL_SLOW_CHECKOUT_MS", "50"))  # 超过则记一条警告
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+    DB_ECHO: bool = os.getenv("DB_ECHO", "false").lower() == "true"
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    # Socket.IO 服务 (app/) 使用的数据库
+    APP_DATABASE_URL: str = os.getenv("APP_DATABASE_URL", "sqlite+aiosqlite:///./maj_game.db")
 
     # 游戏配置
     MAX_PLAYERS_PER_ROOM: int = int(os.getenv("MAX_PLAYERS_PER_ROOM", "4"))
     ROOM_CODE_LENGTH: int = int(os.getenv("ROOM_CODE_LENGTH", "6"))
+    # 房间状态写回数据库的间隔(毫秒)
+    ROOM_STATE_FLUSH_INTERVAL_MS: int = int(os.getenv("ROOM_STATE_FLUSH_INTERVAL_MS", "500"))
+    # 对局计时 (秒)：出牌超时自动摸切；掉线超过宽限后该座位改为立即托管出牌
+    TURN_TIMEOUT_SECONDS: float = float(os.getenv("TURN_TIMEOUT_SECONDS", "20"))
+    DISCONNECT_GRACE_SECONDS: float = float(os.getenv("DISCONNECT_GRACE_SECONDS", "60"))
+    # 空闲房间回收 (app/reaper.py)：没有事件超过 ROOM_IDLE_TTL、或全员离线超过 ROOM_ABANDONED_TTL 的房间移出内存；
+    # 超过 ROOM_STALE_TTL 没更新且无人持有的房间清理数据库行
+    ROOM_IDLE_TTL_SECONDS: float = float(os.getenv("ROOM_IDLE_TTL_SECONDS", "1800"))
+    ROOM_ABANDONED_TTL_SECONDS: float = float(os.getenv("ROOM_ABANDONED_TTL_SECONDS", "300"))
+    ROOM_STALE_TTL_SECONDS: float = float(os.getenv("ROOM_STALE_TTL_SECONDS", "86400"))
+    REAPER_INTERVAL_SECONDS: float = float(os.getenv("REAPER_INTERVAL_SECONDS", "30"))
+    REAPER_BATCH_SIZE: int = int(os.getenv("REAPER_BATCH_SIZE", "500"))
+    # 积分排行榜从数据库全量重建的间隔(秒)，也是其他进程的积分变更上榜的最长延迟
+    LEADERBOARD_REBUILD_INTERVAL_SECONDS: float = float(os.getenv("LEADERBOARD_REBUILD_INTERVAL_SECONDS", "300"))
+    # 滚动重启移交房间的 unix socket 目录 (app/handoff.py)，每个进程一个 socket；
+    # 多 worker 部署时每个 worker 设不同的编号，新旧进程按编号配对
+    HANDOFF_SOCKET_DIR: str = os.getenv("HANDOFF_SOCKET_DIR", "/tmp")
+    HANDOFF_WORKER_ID: str = os.getenv("HANDOFF_WORKER_ID", "0")
 
     # 网站信息
     APP_NAME: str = os.getenv("APP_NAME", "Online Multiplayer Game")
@@ -0,0 +1,17 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from core.config import settings
+from core.engine import make_async_engine
+
+engine = make_async_engine(settings.DATABASE_URL, name="core")
+AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+Base = declarative_base()
+
+
+async def get_async_db():
+    """
+    请求级会话依赖：请求结束时关闭会话，连接归还连接池
+    """
+    async with AsyncSessionLocal() as session:
+        yield session
@@ -0,0 +1,122 @@
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class PoolStats:
+    """
+    连接池 checkout 等待时间统计：等待高说明池太小或有慢查询占着连接
+    """
+
+    def __init__(self, name: str, slow_ms: float):
+        self.name = name
+        self.slow_ms = slow_ms
+        self.checkouts = 0
+        self.slow_checkouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def record(self, wait_ms: float, pool_status: str):
+        self.checkouts += 1
+        self.wait_ms_total += wait_ms
+        if wait_ms > self.wait_ms_max:
+            self.wait_ms_max = wait_ms
+        if wait_ms >= self.slow_ms:
+            self.slow_checkouts += 1
+            logger.warning("DB pool %s: checkout waited %.1fms (%s)", self.name, wait_ms, pool_status)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "checkouts": self.checkouts,
+            "slow_checkouts": self.slow_checkouts,
+            "wait_ms_avg": self.wait_ms_total / self.checkouts if self.checkouts else 0.0,
+            "wait_ms_max": self.wait_ms_max,
+        }
+
+
+class _TimedPoolMixin:
+    # 由 _timed_pool 生成子类时设置；pool.recreate() 沿用 self.__class__，统计不会丢
+    stats: PoolStats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        record = super()._do_get()
+        # 池里没有空闲连接时会当场新建，建连耗时不算排队等待
+        connect_ms = record.__dict__.pop("_connect_ms", 0.0)
+        self.stats.record((time.perf_counter() - started) * 1000 - connect_ms, self.status())
+        return record
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        record = super()._create_connection()
+        record._connect_ms = (time.perf_counter() - started) * 1000
+        return record
+
+
+def _timed_pool(base: type, stats: PoolStats) -> type:
+    return type(f"Timed{base.__name__}", (_TimedPoolMixin, base), {"stats": stats})
+
+
+def _sqlite_pragmas(dbapi_conn, connection_record):
+    # WAL 让读写不互相阻塞；NORMAL 在 WAL 下只在 checkpoint 时 fsync
+    cursor = dbapi_conn.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+def _engine_kwargs(url: str, pool_base: type, name: str) -> Dict[str, Any]:
+    kwargs: Dict[str, Any] = {
+        "echo": settings.DB_ECHO,
+        "query_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # 内存库只能有一个连接，否则每个连接看到的是不同的库
+        kwargs["poolclass"] = StaticPool
+        kwargs["connect_args"] = {"check_same_thread": False}
+        return kwargs
+    kwargs.update(
+        poolclass=_timed_pool(pool_base, PoolStats(name, settings.DB_POOL_SLOW_CHECKOUT_MS)),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    return kwargs
+
+
+def _install_pragmas(url: str, sync_engine: Engine):
+    if make_url(url).get_backend_name() == "sqlite":
+        event.listen(sync_engine, "connect", _sqlite_pragmas)
+
+
+def make_async_engine(url: str, name: str = "default") -> AsyncEngine:
+    """
+    按 settings 中的连接池、SQLite pragma、语句缓存配置创建异步引擎
+    """
+    engine = create_async_engine(url, **_engine_kwargs(url, AsyncAdaptedQueuePool, name))
+    _install_pragmas(url, engine.sync_engine)
+    return engine
+
+
+def pool_stats(engine: Any) -> Optional[Dict[str, Any]]:
+    """
+    引擎连接池的 checkout 统计与当前状态，StaticPool 等未计时的池返回 None
+    """
+    pool = engine.pool
+    if not isinstance(pool, _TimedPoolMixin):
+        return None
+    data = pool.stats.snapshot()
+    data["status"] = pool.status()
+    return data
@@ -0,0 +1,83 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from core.config import settings
+
+
+class HashPoolBusy(Exception):
+    """
+    排队的哈希请求超过上限，调用方应返回 503 让客户端稍后重试
+    """
+
+
+class HashPool:
+    """
+    密码哈希专用的有界线程池
+
+    bcrypt 一次约 200ms，直接在协程里算会卡住整个事件循环 (包括所有对局)。
+    这里把它放到独立线程池里算 (bcrypt 计算时释放 GIL)，信号量限制同时计算的数量，
+    超出的请求在信号量上排队，排队数超过 max_queue 直接拒绝。
+    登录高峰只会让登录变慢，不影响出牌。
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 64):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pwhash")
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self.waiting = 0
+        self.running = 0
+        # 统计
+        self.completed = 0
+        self.rejected = 0
+        self.waiting_max = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.run_ms_total = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HashPoolBusy()
+
+        queued = time.perf_counter()
+        self.waiting += 1
+        self.waiting_max = max(self.waiting_max, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        started = time.perf_counter()
+        wait_ms = (started - queued) * 1000
+        self.wait_ms_total += wait_ms
+        self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+            self.completed += 1
+            self.run_ms_total += (time.perf_counter() - started) * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "running": self.running,
+            "waiting": self.waiting,
+            "waiting_max": self.waiting_max,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_ms_avg": self.wait_ms_total / self.completed if self.completed else 0.0,
+            "wait_ms_max": self.wait_ms_max,
+            "run_ms_avg": self.run_ms_total / self.completed if self.completed else 0.0,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+hash_pool = HashPool(max_workers=settings.PASSWORD_HASH_WORKERS, max_queue=settings.PASSWORD_HASH_MAX_QUEUE)
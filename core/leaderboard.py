@@ -0,0 +1,207 @@
+import time
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session, object_session
+
+from core.background import BackgroundWriter
+
+
+class Leaderboard:
+    """
+    进程内积分排行榜：启动时从 users 表读一次，之后随积分变更增量维护
+
+    按 (-points, user_id) 排成有序数组，查排名/前 N 名/某名次附近都是二分，
+    不再对整张 users 表 ORDER BY points 或 COUNT(*) WHERE points > x。
+    同分玩家名次相同 (1, 2, 2, 4)，同分内按 user_id 排序保证翻页稳定。
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[int, int]] = []  # (-points, user_id)，升序即积分降序
+        self._points: Dict[int, int] = {}
+        self._names: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def load(self, rows: Iterable[Tuple[int, str, int]]):
+        """
+        整体重建：rows 为 (user_id, username, points)
+        """
+        self._points = {}
+        self._names = {}
+        for user_id, username, points in rows:
+            self._points[user_id] = points or 0
+            self._names[user_id] = username
+        self._keys = sorted((-points, user_id) for user_id, points in self._points.items())
+
+    async def rebuild(self, db, model: type) -> List[int]:
+        """
+        从数据库全量重建，返回和内存不一致的 user_id (用于校验增量维护是否漏了更新)
+        """
+        result = await db.execute(select(model.id, model.username, model.points).where(model.is_active.is_(True)))
+        rows = [(user_id, username, points or 0) for user_id, username, points in result.all()]
+        fresh = {user_id: points for user_id, _, points in rows}
+        drifted = sorted(
+            user_id for user_id in fresh.keys() | self._points.keys()
+            if fresh.get(user_id) != self._points.get(user_id)
+        )
+        self.load(rows)
+        return drifted
+
+    def update(self, user_id: int, points: int, username: Optional[str] = None):
+        points = points or 0
+        old = self._points.get(user_id)
+        if old is not None:
+            if old == points:
+                if username is not None:
+                    self._names[user_id] = username
+                return
+            self._remove_key(old, user_id)
+        self._points[user_id] = points
+        if username is not None:
+            self._names[user_id] = username
+        insort(self._keys, (-points, user_id))
+
+    def remove(self, user_id: int):
+        old = self._points.pop(user_id, None)
+        self._names.pop(user_id, None)
+        if old is not None:
+            self._remove_key(old, user_id)
+
+    def _remove_key(self, points: int, user_id: int):
+        i = bisect_left(self._keys, (-points, user_id))
+        if i < len(self._keys) and self._keys[i] == (-points, user_id):
+            del self._keys[i]
+
+    def _entry(self, index: int) -> dict:
+        neg_points, user_id = self._keys[index]
+        return {
+            "rank": bisect_left(self._keys, (neg_points,)) + 1,
+            "user_id": user_id,
+            "username": self._names.get(user_id),
+            "points": -neg_points,
+        }
+
+    def points_of(self, user_id: int) -> Optional[int]:
+        return self._points.get(user_id)
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """
+        名次 (从 1 开始) = 积分严格更高的人数 + 1；不在榜上返回 None
+        """
+        points = self._points.get(user_id)
+        if points is None:
+            return None
+        return bisect_left(self._keys, (-points,)) + 1
+
+    def top(self, n: int) -> List[dict]:
+        return [self._entry(i) for i in range(min(n, len(self._keys)))]
+
+    def around(self, user_id: int, radius: int = 5) -> List[dict]:
+        """
+        某玩家上下各 radius 个位置的榜单
+        """
+        points = self._points.get(user_id)
+        if points is None:
+            return []
+        index = bisect_left(self._keys, (-points, user_id))
+        start = max(0, index - radius)
+        end = min(len(self._keys), index + radius + 1)
+        return [self._entry(i) for i in range(start, end)]
+
+    def stats(self) -> dict:
+        return {"size": len(self._keys)}
+
+
+def watch_points(board: Leaderboard, model: type):
+    """
+    User 通过 ORM 新增/改积分/停用/删除时，事务提交后同步到排行榜，回滚则丢弃
+
+    返回注销这些监听的函数。
+    """
+    pending_key = f"leaderboard_pending:{id(board)}"
+
+    def remember(target, deleted: bool = False):
+        session = object_session(target)
+        if session is None:
+            return
+        active = target.is_active is not False
+        session.info.setdefault(pending_key, {})[target.id] = (
+            None if deleted or not active else (target.username, target.points)
+        )
+
+    def after_update(mapper, connection, target):
+        state = inspect(target)
+        if any(state.attrs[name].history.has_changes() for name in ("points", "is_active", "username")):
+            remember(target)
+
+    def after_commit(session):
+        for user_id, value in session.info.pop(pending_key, {}).items():
+            if value is None:
+                board.remove(user_id)
+            else:
+                board.update(user_id, value[1], value[0])
+
+    def after_insert(mapper, connection, target):
+        remember(target)
+
+    def after_delete(mapper, connection, target):
+        remember(target, deleted=True)
+
+    def after_rollback(session):
+        session.info.pop(pending_key, None)
+
+    listeners = [
+        (model, "after_insert", after_insert),
+        (model, "after_update", after_update),
+        (model, "after_delete", after_delete),
+        (Session, "after_commit", after_commit),
+        (Session, "after_rollback", after_rollback),
+    ]
+    for target, name, fn in listeners:
+        event.listen(target, name, fn)
+
+    def unwatch():
+        for target, name, fn in listeners:
+            event.remove(target, name, fn)
+    return unwatch
+
+
+class LeaderboardRefresher(BackgroundWriter):
+    """
+    定时从 users 表全量重建排行榜
+
+    watch_points 只看得到本进程的 ORM 提交，其他进程 (另一个 worker、另一套服务)
+    改的积分要靠这里追上，间隔就是跨进程积分变更上榜的最长延迟。
+    记下最近一次重建的时间和不一致的用户数，供 /health/leaderboard 只读返回。
+    """
+
+    label = "Leaderboard rebuild"
+
+    def __init__(self, board: Leaderboard, model: type, interval: float):
+        super().__init__(interval)
+        self.board = board
+        self.model = model
+        self.rebuilt_at: Optional[float] = None
+        self.drifted = 0
+
+    async def flush(self):
+        if self._session_factory is None:
+            return
+        async with self._session_factory() as db:
+            drifted = await self.board.rebuild(db, self.model)
+        self.rebuilt_at = time.time()
+        self.drifted = len(drifted)
+
+    async def final_flush(self):
+        # 停机时不需要再读一遍
+        pass
+
+    def stats(self) -> dict:
+        return {**self.board.stats(), "rebuilt_at": self.rebuilt_at, "drifted": self.drifted}
+
+
+leaderboard = Leaderboard()
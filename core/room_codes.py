@@ -0,0 +1,79 @@
+import random
+import string
+from collections import deque
+from math import gcd
+from typing import Deque, Iterable, Set
+
+from core.config import settings
+
+ROOM_CODE_ALPHABET = string.ascii_uppercase + string.digits
+# 序号 -> 房间号的置换乘数，必须和号码空间 (36^n) 互质
+PERMUTE_MULTIPLIER = 2147483647
+
+
+class RoomCodeAllocator:
+    """
+    房间号分配器：不查库判重
+
+    号码来自一个置换过的序列：i -> (i * 乘数 + 偏移) mod 36^n，对 i 是一一映射，
+    所以序列本身不会重复，看起来也不连续。上次运行留下的号码在启动时 load 进 reserved，
+    撞上时在内存里跳过；房间删除后号码 release 回池，优先复用。
+    多进程部署时 rooms.room_code 的唯一约束兜底，冲突后换一个号码重试即可。
+    """
+
+    def __init__(self, length: int = settings.ROOM_CODE_LENGTH, alphabet: str = ROOM_CODE_ALPHABET):
+        self.length = length
+        self.alphabet = alphabet
+        self.space = len(alphabet) ** length
+        self.multiplier = PERMUTE_MULTIPLIER % self.space
+        if gcd(self.multiplier, self.space) != 1:
+            raise ValueError("Permutation multiplier must be coprime with the code space")
+        self.offset = random.randrange(self.space)
+        self.next_index = random.randrange(self.space)
+        self.issued = 0
+        self.reserved: Set[str] = set()
+        self.free: Deque[str] = deque()
+
+    def load(self, codes: Iterable[str]):
+        """
+        启动时登记数据库中已有的房间号
+        """
+        self.reserved.update(codes)
+
+    def encode(self, n: int) -> str:
+        chars = []
+        base = len(self.alphabet)
+        for _ in range(self.length):
+            n, r = divmod(n, base)
+            chars.append(self.alphabet[r])
+        return "".join(reversed(chars))
+
+    def allocate(self) -> str:
+        while self.free:
+            code = self.free.popleft()
+            if code not in self.reserved:
+                self.reserved.add(code)
+                return code
+        while self.issued < self.space:
+            n = (self.next_index * self.multiplier + self.offset) % self.space
+            self.next_index = (self.next_index + 1) % self.space
+            self.issued += 1
+            code = self.encode(n)
+            if code not in self.reserved:
+                self.reserved.add(code)
+                return code
+        raise RuntimeError("Room code space exhausted")
+
+    def reserve(self, code: str):
+        self.reserved.add(code)
+
+    def release(self, code: str):
+        """
+        房间删除后归还号码
+        """
+        if code in self.reserved:
+            self.reserved.discard(code)
+            self.free.append(code)
+
+
+room_code_allocator = RoomCodeAllocator()
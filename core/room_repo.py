@@ -0,0 +1,105 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import exists, func
+from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload, selectinload
+
+from models.room import Room, PlayerInRoom
+
+# 房间相关的读查询集中在这里，每个函数的查询次数固定，不随房间数/人数增长
+# (tests/room_repo_test.py 检查查询预算)
+
+
+def _member_count():
+    # 关联子查询：房间当前人数
+    return (
+        select(func.count(PlayerInRoom.id))
+        .where(PlayerInRoom.room_id == Room.id)
+        .correlate(Room)
+        .scalar_subquery()
+    )
+
+
+async def list_rooms(db) -> List[Dict[str, Any]]:
+    """
+    大厅房间列表：1 次查询 (LEFT JOIN + GROUP BY 计数)
+    """
+    result = await db.execute(
+        select(Room, func.count(PlayerInRoom.id))
+        .outerjoin(PlayerInRoom, PlayerInRoom.room_id == Room.id)
+        .group_by(Room.id)
+        .order_by(Room.created_at.desc())
+    )
+    return [
+        {
+            "room_code": room.room_code,
+            "max_players": room.max_players,
+            "current_players": count,
+            "is_game_started": room.is_game_started,
+            "created_at": room.created_at,
+        }
+        for room, count in result.all()
+    ]
+
+
+async def get_room_with_members(db, room_code: str) -> Optional[Room]:
+    """
+    房间及其成员和成员的用户信息：2 次查询 (房间 + selectinload 成员 JOIN 用户)
+    """
+    result = await db.execute(
+        select(Room)
+        .options(selectinload(Room.members).joinedload(PlayerInRoom.user))
+        .where(Room.room_code == room_code)
+    )
+    return result.scalars().first()
+
+
+async def get_room_for_join(db, room_code: str, user_id: int) -> Tuple[Optional[Room], int, bool]:
+    """
+    加入房间前的检查：1 次查询得到 (房间, 当前人数, 该用户是否已在房间)
+    """
+    already_in = (
+        exists()
+        .where(PlayerInRoom.room_id == Room.id, PlayerInRoom.user_id == user_id)
+        .correlate(Room)
+    )
+    result = await db.execute(
+        select(Room, _member_count(), already_in).where(Room.room_code == room_code)
+    )
+    row = result.first()
+    if row is None:
+        return None, 0, False
+    room, count, is_member = row
+    return room, count, bool(is_member)
+
+
+async def all_room_codes(db) -> List[str]:
+    """
+    启动时给房间号分配器登记已占用的号码
+    """
+    result = await db.execute(select(Room.room_code))
+    return list(result.scalars().all())
+
+
+def room_detail(room: Room) -> Dict[str, Any]:
+    """
+    get_room_with_members 结果的响应体，不会再触发懒加载
+    """
+    players = [
+        {
+            "user_id": player.user.id,
+            "username": player.user.username,
+            "is_ready": player.is_ready,
+            "is_admin": player.is_admin,
+            "joined_at": player.joined_at,
+        }
+        for player in room.members
+    ]
+    return {
+        "room_code": room.room_code,
+        "max_players": room.max_players,
+        "current_players": len(players),
+        "is_game_started": room.is_game_started,
+        "created_at": room.created_at,
+        "players": players,
+    }
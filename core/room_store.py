@@ -0,0 +1,188 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import delete, update
+
+from core.background import BackgroundWriter
+from core.config import settings
+from core.room_codes import room_code_allocator
+from core.room_repo import get_room_with_members
+from models.room import Room, PlayerInRoom
+
+
+class MemberState:
+    __slots__ = ("row_id", "user_id", "username", "is_ready", "is_admin", "joined_at")
+
+    def __init__(self, row_id: int, user_id: int, username: str, is_ready: bool, is_admin: bool, joined_at: Optional[datetime]):
+        self.row_id = row_id  # player_in_rooms.id
+        self.user_id = user_id
+        self.username = username
+        self.is_ready = is_ready
+        self.is_admin = is_admin
+        self.joined_at = joined_at
+
+
+class RoomState:
+    """
+    房间在内存中的权威状态 (准备状态、座位、管理员、是否开局)
+    """
+
+    def __init__(self, room_id: int, room_code: str, max_players: int, is_game_started: bool):
+        self.id = room_id
+        self.room_code = room_code
+        self.max_players = max_players
+        self.is_game_started = is_game_started
+        # user_id -> MemberState
+        self.members: Dict[int, MemberState] = {}
+        # 已离开、待从数据库删除的 player_in_rooms.id
+        self.removed_rows: Set[int] = set()
+        self.deleted = False
+
+    def all_ready(self) -> bool:
+        return all(member.is_ready for member in self.members.values())
+
+    def remove_member(self, user_id: int) -> Optional[MemberState]:
+        """
+        移除玩家；如果移除的是管理员，把管理员转给最早加入的玩家并返回新管理员
+        """
+        member = self.members.pop(user_id, None)
+        if member is None:
+            return None
+        self.removed_rows.add(member.row_id)
+        if not self.members:
+            self.deleted = True
+            return None
+        if member.is_admin:
+            new_admin = min(self.members.values(), key=lambda m: m.joined_at or datetime.min)
+            new_admin.is_admin = True
+            return new_admin
+        return None
+
+
+class RoomStore(BackgroundWriter):
+    """
+    房间状态存储：处理函数只改内存并标脏，后台任务按固定间隔批量写回数据库
+
+    开局、房间删除这类生命周期节点调用 flush_room 立即落库。
+    """
+
+    label = "Room state flush"
+
+    def __init__(self, flush_interval: float = 0.5):
+        super().__init__(flush_interval)
+        self.rooms: Dict[str, RoomState] = {}
+        self.dirty: Set[str] = set()
+        self._flush_lock = asyncio.Lock()
+
+    async def get(self, room_code: str, db) -> Optional[RoomState]:
+        """
+        取房间状态，不在内存时从数据库加载一次
+        """
+        state = self.rooms.get(room_code)
+        if state is not None:
+            return None if state.deleted else state
+
+        room = await get_room_with_members(db, room_code)
+        if not room:
+            return None
+
+        state = RoomState(room.id, room.room_code, room.max_players, bool(room.is_game_started))
+        for player in room.members:
+            state.members[player.user_id] = MemberState(
+                player.id, player.user_id, player.user.username,
+                bool(player.is_ready), bool(player.is_admin), player.joined_at
+            )
+        # 加载期间可能已被别的协程放进来，以先到的为准
+        return self.rooms.setdefault(room_code, state)
+
+    def mark_dirty(self, state: RoomState):
+        self.dirty.add(state.room_code)
+
+    async def evict(self, room_code: str):
+        """
+        丢弃内存中的房间状态，下次访问重新加载
+
+        丢弃前在写回锁内把这个房间写到不再脏为止：写库期间到达的修改会重新标脏并再写一轮，
+        最后一次写完到移除之间没有 await，不会丢掉 WebSocket 事件的修改。
+        """
+        async with self._flush_lock:
+            while room_code in self.dirty and self._session_factory is not None:
+                await self._flush_codes([room_code])
+            self.rooms.pop(room_code, None)
+            self.dirty.discard(room_code)
+
+    def _collect(self, room_codes: List[str]):
+        """
+        在任何 await 之前把待写数据拷出来，之后的修改会重新标脏
+        """
+        room_rows, member_rows, removed_rows, deleted_rooms = [], [], {}, []
+        for code in room_codes:
+            self.dirty.discard(code)
+            state = self.rooms.get(code)
+            if state is None:
+                continue
+            if state.removed_rows:
+                removed_rows[code] = state.removed_rows
+                state.removed_rows = set()
+            if state.deleted:
+                deleted_rooms.append(state.id)
+                continue
+            room_rows.append({"id": state.id, "is_game_started": state.is_game_started})
+            member_rows.extend(
+                {"id": m.row_id, "is_ready": m.is_ready, "is_admin": m.is_admin}
+                for m in state.members.values()
+            )
+        return room_rows, member_rows, removed_rows, deleted_rooms
+
+    async def _write(self, room_rows, member_rows, removed_rows, deleted_rooms):
+        if not (room_rows or member_rows or removed_rows or deleted_rooms):
+            return
+        async with self._session_factory() as db:
+            # 按主键批量 UPDATE / DELETE，一个事务提交
+            if room_rows:
+                await db.execute(update(Room), room_rows)
+            if member_rows:
+                await db.execute(update(PlayerInRoom), member_rows)
+            if removed_rows:
+                row_ids = [row_id for rows in removed_rows.values() for row_id in rows]
+                await db.execute(delete(PlayerInRoom).where(PlayerInRoom.id.in_(row_ids)))
+            if deleted_rooms:
+                await db.execute(delete(PlayerInRoom).where(PlayerInRoom.room_id.in_(deleted_rooms)))
+                await db.execute(delete(Room).where(Room.id.in_(deleted_rooms)))
+            await db.commit()
+
+    async def flush(self, room_codes: Optional[List[str]] = None):
+        if self._session_factory is None:
+            return
+        async with self._flush_lock:
+            codes = list(self.dirty) if room_codes is None else [c for c in room_codes if c in self.dirty]
+            await self._flush_codes(codes)
+
+    async def _flush_codes(self, codes: List[str]):
+        """
+        写回指定房间，调用方需持有 _flush_lock
+        """
+        rows = self._collect(codes)
+        try:
+            await self._write(*rows)
+        except Exception:
+            # 写失败时恢复脏标记和待删行，下一轮重试
+            self.dirty.update(codes)
+            for code, removed in rows[2].items():
+                state = self.rooms.get(code)
+                if state is not None:
+                    state.removed_rows.update(removed)
+            raise
+        for code in codes:
+            state = self.rooms.get(code)
+            if state is not None and state.deleted:
+                del self.rooms[code]
+                # 房间已从数据库删除，号码可以复用
+                room_code_allocator.release(code)
+
+    async def flush_room(self, room_code: str):
+        await self.flush([room_code])
+
+
+room_store = RoomStore(flush_interval=settings.ROOM_STATE_FLUSH_INTERVAL_MS / 1000)
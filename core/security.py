@@ -1,10 +1,13 @@
 from datetime import datetime, timedelta
 from typing import Any, Union, Optional
 
+from fastapi import HTTPException, status
 from jose import jwt
 from passlib.context import CryptContext
 
 from core.config import settings
+from core.token_cache import token_verifier
+from core.hash_pool import hash_pool
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -23,6 +26,13 @@ def create_access_token(subject: Union[str, Any], expires_delta: Optional[timede
     return encoded_jwt
 
 
+def decode_token(token: str) -> dict:
+    """
+    校验并解析JWT令牌，失败时抛出 JWTError
+    """
+    return token_verifier.decode(token, settings.SECRET_KEY, settings.ALGORITHM)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     验证密码
@@ -35,3 +45,28 @@ def get_password_hash(password: str) -> str:
     生成密码哈希
     """
     return pwd_context.hash(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    在密码哈希线程池里验证密码，供 async 接口使用；排队过长时抛出 HashPoolBusy
+    """
+    return await hash_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    在密码哈希线程池里生成密码哈希
+    """
+    return await hash_pool.run(get_password_hash, password)
+
+
+def hash_busy() -> HTTPException:
+    """
+    密码哈希线程池排队已满时返回给客户端的 503：登录/注册稍后重试，不拖慢对局
+    """
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many login attempts, please retry",
+        headers={"Retry-After": "1"},
+    )
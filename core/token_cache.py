@@ -0,0 +1,77 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from jose import jwt
+
+
+class TokenVerifier:
+    """
+    JWT 校验服务：带容量上限的 LRU 缓存，token 哈希 -> payload
+
+    同一个 token 第一次校验走完整的签名验证，之后直到 exp 之前都直接命中缓存，
+    省掉 HMAC 和 JSON 解析。core 和 app 两套 token 格式共用这一个实例，
+    密钥和算法也参与缓存键，所以不同密钥签发的 token 不会串。
+    """
+
+    def __init__(self, max_size: int = 4096, default_ttl: int = 300):
+        self.max_size = max_size
+        self.default_ttl = default_ttl  # token 没有 exp 时的缓存时间(秒)
+        # 缓存键 -> (过期时间戳, payload)
+        self._cache: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()  # core 的同步依赖跑在线程池里
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _cache_key(token: str, secret_key: str, algorithm: str) -> bytes:
+        return hashlib.sha256(f"{algorithm}\0{secret_key}\0{token}".encode()).digest()
+
+    def decode(self, token: str, secret_key: str, algorithm: str) -> Dict[str, Any]:
+        """
+        校验并解析 token，失败时抛出 JWTError (与 jwt.decode 行为一致)
+        """
+        key = self._cache_key(token, secret_key, algorithm)
+        now = time.time()
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                expire_at, payload = entry
+                if now < expire_at:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return dict(payload)
+                # 已过期，交给 jwt.decode 抛出 ExpiredSignatureError
+                del self._cache[key]
+
+        payload = jwt.decode(token, secret_key, algorithms=[algorithm])
+        exp = payload.get("exp")
+        expire_at = float(exp) if exp is not None else now + self.default_ttl
+
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = (expire_at, payload)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return dict(payload)
+
+    def invalidate(self, token: str, secret_key: str, algorithm: str):
+        """
+        主动移除某个 token (例如注销时)
+        """
+        with self._lock:
+            self._cache.pop(self._cache_key(token, secret_key, algorithm), None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+token_verifier = TokenVerifier()
@@ -0,0 +1,104 @@
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+
+class CachedUser:
+    """
+    鉴权用的用户快照，不绑定任何数据库会话，可以在请求之间共享
+    """
+    __slots__ = ("id", "username", "email", "is_active", "points", "created_at")
+
+    def __init__(self, user: Any):
+        for name in self.__slots__:
+            setattr(self, name, getattr(user, name))
+
+
+class UserCache:
+    """
+    进程内用户缓存 (id -> CachedUser)，读穿 + 短 TTL
+
+    鉴权依赖每个请求都要确认用户存在且未停用，命中缓存时不查 users 表。
+    积分、is_active 通过 ORM 修改时由 watch_user_model 注册的事件主动失效，
+    但事件只在本进程内触发：其他 worker、另一套服务或手工改库的修改要等 TTL 过期，
+    所以 TTL 也是跨进程停用用户生效的最长延迟。
+    """
+
+    def __init__(self, ttl: float = 30.0, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._cache: "OrderedDict[int, Tuple[float, CachedUser]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, user_id: int, load: Callable[[int], Awaitable[Optional[Any]]]) -> Optional[CachedUser]:
+        now = time.monotonic()
+        entry = self._cache.get(user_id)
+        if entry is not None and entry[0] > now:
+            self._cache.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        user = await load(user_id)
+        if user is None:
+            self._cache.pop(user_id, None)
+            return None
+        cached = CachedUser(user)
+        self._cache[user_id] = (now + self.ttl, cached)
+        self._cache.move_to_end(user_id)
+        if len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        return cached
+
+    def invalidate(self, user_id: int):
+        self._cache.pop(user_id, None)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+def watch_user_model(cache: UserCache, model: type, fields: Iterable[str] = ("points", "is_active")):
+    """
+    User 的这些字段通过 ORM 更新时让缓存失效
+
+    flush 时先失效一次；事务提交后再失效一次，防止提交前有请求把旧值读回缓存。
+    返回注销这些监听的函数。
+    """
+    fields = tuple(fields)
+    pending_key = f"user_cache_pending:{id(cache)}"
+
+    def after_update(mapper, connection, target):
+        state = inspect(target)
+        if not any(state.attrs[name].history.has_changes() for name in fields):
+            return
+        cache.invalidate(target.id)
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault(pending_key, set()).add(target.id)
+
+    def after_commit(session):
+        for user_id in session.info.pop(pending_key, ()):
+            cache.invalidate(user_id)
+
+    def after_delete(mapper, connection, target):
+        cache.invalidate(target.id)
+
+    listeners = [
+        (model, "after_update", after_update),
+        (model, "after_delete", after_delete),
+        (Session, "after_commit", after_commit),
+    ]
+    for target, name, fn in listeners:
+        event.listen(target, name, fn)
+
+    def unwatch():
+        for target, name, fn in listeners:
+            event.remove(target, name, fn)
+    return unwatch
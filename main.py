@@ -3,10 +3,13 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from core.config import settings
 from api.api_v1.api import api_router
-from core.db import Base, engine
-
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
+from core.db import AsyncSessionLocal, Base, engine
+from core.engine import pool_stats
+from core.room_store import room_store
+from core.room_codes import room_code_allocator
+from core.room_repo import all_room_codes
+from core.leaderboard import LeaderboardRefresher, leaderboard
+from models.user import User
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -26,6 +29,31 @@ app.add_middleware(
 # 注册API路由
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+# 积分排行榜定时全量重建，追上其他进程的积分变更
+leaderboard_refresher = LeaderboardRefresher(leaderboard, User, settings.LEADERBOARD_REBUILD_INTERVAL_SECONDS)
+
+
+@app.on_event("startup")
+async def startup():
+    # 创建数据库表
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    # 房间号分配器登记已占用的号码，之后建房不再查库判重
+    async with AsyncSessionLocal() as db:
+        room_code_allocator.load(await all_room_codes(db))
+    # 积分排行榜启动时全量读一次，之后随本进程的积分变更增量维护，定时重建
+    leaderboard_refresher.start(AsyncSessionLocal)
+    await leaderboard_refresher.flush()
+    # 房间状态后台写回
+    room_store.start(AsyncSessionLocal)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await leaderboard_refresher.stop()
+    # 停机前把内存中的房间状态全部落库
+    await room_store.stop()
+
 
 @app.get("/")
 async def root():
@@ -37,6 +65,18 @@ async def root():
     }
 
 
+@app.get("/health/db")
+async def db_health():
+    # 连接池 checkout 等待统计，用来调 DB_POOL_SIZE / DB_MAX_OVERFLOW
+    return pool_stats(engine)
+
+
+@app.get("/health/leaderboard")
+async def leaderboard_health():
+    # 只读：榜单大小和最近一次定时重建发现的不一致用户数，用于校验增量维护
+    return leaderboard_refresher.stats()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,52 @@
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from core.db import Base
+
+# 房间模型
+class Room(Base):
+    __tablename__ = "rooms"
+
+    id = Column(Integer, primary_key=True, index=True)
+    room_code = Column(String(16), unique=True, index=True, nullable=False)
+    max_players = Column(Integer, default=4)
+    is_game_started = Column(Boolean, default=False)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    on_time_data = Column(Text, nullable=True)  # 实时数据存储
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # 关系
+    creator = relationship("User", back_populates="created_rooms", foreign_keys=[created_by])
+    members = relationship("PlayerInRoom", back_populates="room", cascade="all, delete-orphan",
+                           order_by="PlayerInRoom.joined_at")
+    records = relationship("Record", back_populates="room", cascade="all, delete-orphan")
+
+# 玩家-房间关联模型
+class PlayerInRoom(Base):
+    __tablename__ = "player_in_rooms"
+
+    id = Column(Integer, primary_key=True, index=True)
+    room_id = Column(Integer, ForeignKey("rooms.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    is_ready = Column(Boolean, default=False)
+    is_admin = Column(Boolean, default=False)
+    points = Column(Integer, default=0)  # 玩家在该房间中的积分
+    joined_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # 关系
+    room = relationship("Room", back_populates="members", foreign_keys=[room_id])
+    user = relationship("User", back_populates="room_memberships", foreign_keys=[user_id])
+
+# 游戏记录模型
+class Record(Base):
+    __tablename__ = "records"
+
+    id = Column(Integer, primary_key=True, index=True)
+    room_id = Column(Integer, ForeignKey("rooms.id"), nullable=False, index=True)
+    turn = Column(Integer, nullable=False)
+    replay = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # 关系
+    room = relationship("Room", back_populates="records", foreign_keys=[room_id])
@@ -0,0 +1,158 @@
+import unittest
+
+from db_case import HAS_DB_DEPS as HAS_DEPS, AsyncDBTestCase
+
+if HAS_DEPS:
+    from app.checkpoint import (HEADER_FIELDS, SEQ_LEASE, Checkpointer, decode_checkpoint, encode_checkpoint,
+                                get_or_restore_room, restore_room, serialize_room)
+    from app.database import Base
+    from app.game_manager import MajRoom, RoomManager, is_online, offline_sid
+    from app.models import Room, User
+    from app.utils.wire_codec import WireDecodeError, read_fields, write_fields
+
+
+def playing_room():
+    room = MajRoom(7, "room-7")
+    for user_id in (11, 12, 13, 14):
+        room.add_player(f"sid-{user_id}", user_id)
+    room.init_game()
+    room.round_index = 2
+    for seat in range(3):
+        sid = room.players[seat]
+        room.draw_tile(sid)
+        tile = room.hands[sid].pop(0)
+        room.discards.append(tile)
+        room.record_event("discard", {"seat": seat, "tile": tile})
+    room.turn_index = 3
+    room.settings["riichi"] = 1
+    return room
+
+
+@unittest.skipUnless(HAS_DEPS, "sqlalchemy / aiosqlite not installed")
+class TestCheckpoint(unittest.TestCase):
+    def test_round_trip(self):
+        room = playing_room()
+        restored = restore_room(serialize_room(room))
+
+        self.assertEqual((restored.room_id, restored.room_name), (7, "room-7"))
+        self.assertEqual((restored.round_index, restored.turn_index, restored.is_playing), (2, 3, True))
+        self.assertEqual(restored.player_ids, room.player_ids)
+        # 座位先放离线占位，手牌按座位对应
+        self.assertEqual(restored.players, [offline_sid(u) for u in room.player_ids])
+        self.assertFalse(any(is_online(sid) for sid in restored.players))
+        for seat, sid in enumerate(room.players):
+            self.assertEqual(restored.hands[restored.players[seat]], room.hands[sid])
+        self.assertEqual(restored.discards, room.discards)
+        self.assertEqual(restored.wall, room.wall)
+        self.assertEqual(restored.settings, room.settings)
+
+    def test_handoff_keeps_numbering(self):
+        room = playing_room()
+        restored = restore_room(serialize_room(room))
+        last_seq = room.event_log.last_seq
+        # 移交的是冻结后的房间：已追上的客户端无需补发，落后的改发快照 (事件本身不进快照)
+        self.assertEqual(restored.event_log.last_seq, last_seq)
+        self.assertEqual(restored.event_log.since(last_seq, 0), [])
+        self.assertIsNone(restored.event_log.since(last_seq - 1, 0))
+        self.assertEqual(restored.record_event("discard", {"seat": 3}), last_seq + 1)
+
+    def test_checkpoint_restore_skips_to_reserved_seq(self):
+        room = playing_room()
+        restored = decode_checkpoint(encode_checkpoint(room))
+        reserved = room.event_log.last_seq + SEQ_LEASE
+        self.assertEqual(restored.event_log.last_seq, reserved)
+        # 快照之后发出的序号都在上限以内，续号不会复用；客户端一律改发快照
+        self.assertIsNone(restored.event_log.since(room.event_log.last_seq + 5, 0))
+        self.assertEqual(restored.record_event("discard", {"seat": 3}), reserved + 1)
+
+    def test_reads_version_1(self):
+        room = playing_room()
+        data = serialize_room(room)
+        header, pos = read_fields(data, 1, HEADER_FIELDS)
+        # 版本 1 的头部没有 seq_reserved，按写入时的 last_seq 加余量估算
+        old = bytearray([1])
+        write_fields(old, HEADER_FIELDS[:-1], header)
+        restored = restore_room(bytes(old) + data[pos:])
+        self.assertEqual(restored.player_ids, room.player_ids)
+        self.assertEqual(restored.event_log.reserved_seq, room.event_log.last_seq + SEQ_LEASE)
+
+    def test_reconnect_moves_hand_to_new_sid(self):
+        room = playing_room()
+        restored = restore_room(serialize_room(room))
+        hand = list(room.hands[room.players[1]])
+        old = restored.replace_sid(1, "sid-new")
+        self.assertEqual(old, offline_sid(12))
+        self.assertEqual(restored.hands["sid-new"], hand)
+        self.assertNotIn(old, restored.hands)
+        self.assertEqual(restored.seat_of("sid-new"), 1)
+
+    def test_rejects_unknown_version(self):
+        data = bytearray(serialize_room(playing_room()))
+        data[0] = 99
+        with self.assertRaises(WireDecodeError):
+            restore_room(bytes(data))
+
+
+@unittest.skipUnless(HAS_DEPS, "sqlalchemy / aiosqlite not installed")
+class TestCheckpointer(AsyncDBTestCase):
+    def setUp(self):
+        self.Base = Base
+        super().setUp()
+        self.manager = RoomManager()
+        self.room = playing_room()
+        self.manager.install_room(self.room)
+        self.checkpointer = Checkpointer(self.manager)
+        self.checkpointer._session_factory = self.Session
+
+    async def seed(self, db):
+        db.add(User(id=1, username="owner", email="owner@example.com", hashed_password="x"))
+        db.add(Room(id=7, name="room-7", created_by=1))
+        await db.commit()
+
+    def test_crash_restore_never_reuses_sent_seqs(self):
+        room, checkpointer = self.room, self.checkpointer
+        checkpointer.mark(room)
+        self.run_async(checkpointer.flush())
+        self.assertEqual(room.event_log.reserved_seq, room.event_log.last_seq + SEQ_LEASE)
+
+        # 快照之后继续出牌，客户端已收到这些序号，进程随后崩溃
+        sent = [room.record_event("discard", {"seat": 0}) for _ in range(10)]
+        for _ in sent:
+            checkpointer.reserve_seq(room)
+        self.assertEqual(checkpointer.dirty, {})
+
+        restored = self.run_db(lambda db: get_or_restore_room(RoomManager(), "room-7", db))
+        self.assertIsNone(restored.event_log.since(sent[-1], 0))
+        self.assertGreater(restored.record_event("discard", {"seat": 1}), sent[-1])
+
+    def test_lazy_restore_calls_hook_once(self):
+        self.checkpointer.mark(self.room)
+        self.run_async(self.checkpointer.flush())
+        manager, installed = RoomManager(), []
+
+        restored = self.run_db(lambda db: get_or_restore_room(manager, "room-7", db, installed.append))
+        again = self.run_db(lambda db: get_or_restore_room(manager, "room-7", db, installed.append))
+        # 只有真正放进 RoomManager 的那次恢复调用钩子 (由它补上计时器)
+        self.assertIs(again, restored)
+        self.assertEqual(installed, [restored])
+        self.assertTrue(restored.is_playing)
+        self.assertFalse(any(is_online(sid) for sid in restored.players))
+
+    def test_half_used_lease_checkpoints_urgently(self):
+        room, checkpointer = self.room, self.checkpointer
+        checkpointer.mark(room)
+        self.run_async(checkpointer.flush())
+        reserved = room.event_log.reserved_seq
+
+        while room.event_log.last_seq <= reserved - SEQ_LEASE // 2:
+            room.record_event("discard", {"seat": 0})
+            checkpointer.reserve_seq(room)
+        self.assertIn("room-7", checkpointer.dirty)
+        self.assertTrue(checkpointer._wakeup.is_set())
+
+        self.run_async(checkpointer.flush())
+        self.assertEqual(room.event_log.reserved_seq, room.event_log.last_seq + SEQ_LEASE)
+
+
+if __name__ == '__main__':
+    unittest.main()
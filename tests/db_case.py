@@ -0,0 +1,75 @@
+import asyncio
+import importlib.util
+import unittest
+
+# 需要 sqlalchemy + aiosqlite + 配置依赖，缺少时相关用例跳过
+HAS_DB_DEPS = all(importlib.util.find_spec(m) for m in ("sqlalchemy", "aiosqlite", "pydantic", "dotenv"))
+
+if HAS_DB_DEPS:
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+
+def memory_core_db():
+    """
+    把 core.db 换成内存库后导入并返回，必须在任何模块导入 core.db 之前调用
+    """
+    from core.config import settings
+    settings.DATABASE_URL = "sqlite+aiosqlite://"
+    from core import db
+    return db
+
+
+class AsyncDBTestCase(unittest.TestCase):
+    """
+    每个用例一个新的事件循环和一个空的内存库
+
+    子类在 super().setUp() 之前设好 self.Base，会建好它的表再调用 seed 插初始数据。
+    默认每个用例新建引擎、用完 dispose；被测代码用的是 core.db 模块级引擎时，
+    同时把 self.engine / self.Session 设成 core.db 的，用完删表。
+    """
+
+    Base = None
+    engine = None
+    Session = None
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.owns_engine = self.engine is None
+        if self.owns_engine:
+            self.engine = create_async_engine("sqlite+aiosqlite://")
+            self.Session = sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        if self.Base is not None:
+            self.run_async(self._create())
+
+    def tearDown(self):
+        if self.owns_engine:
+            self.run_async(self.engine.dispose())
+        elif self.Base is not None:
+            self.run_async(self._drop())
+        self.loop.close()
+
+    async def _create(self):
+        async with self.engine.begin() as conn:
+            await conn.run_sync(self.Base.metadata.create_all)
+        async with self.Session() as db:
+            await self.seed(db)
+
+    async def _drop(self):
+        async with self.engine.begin() as conn:
+            await conn.run_sync(self.Base.metadata.drop_all)
+
+    async def seed(self, db):
+        pass
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def run_db(self, fn):
+        """
+        在新会话里执行 fn(db) 并返回结果
+        """
+        async def run():
+            async with self.Session() as db:
+                return await fn(db)
+        return self.run_async(run())
@@ -0,0 +1,91 @@
+import asyncio
+import importlib.util
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+HAS_DEPS = all(importlib.util.find_spec(m) for m in ("sqlalchemy", "aiosqlite", "pydantic", "dotenv"))
+
+if HAS_DEPS:
+    from sqlalchemy import text
+    from sqlalchemy.pool import QueuePool
+    from core.engine import PoolStats, _timed_pool, make_async_engine, pool_stats
+
+
+@unittest.skipUnless(HAS_DEPS, "sqlalchemy / aiosqlite not installed")
+class TestPoolStats(unittest.TestCase):
+    def test_snapshot_and_slow_warning(self):
+        stats = PoolStats("test", slow_ms=50)
+        self.assertEqual(stats.snapshot()["wait_ms_avg"], 0.0)
+        stats.record(10, "idle")
+        with self.assertLogs("core.engine", level="WARNING") as logs:
+            stats.record(70, "busy")
+        self.assertIn("checkout waited 70.0ms", logs.output[0])
+        self.assertEqual(stats.snapshot(), {
+            "checkouts": 2, "slow_checkouts": 1, "wait_ms_avg": 40.0, "wait_ms_max": 70,
+        })
+
+    def test_times_queue_wait_not_connect(self):
+        def slow_connect():
+            time.sleep(0.1)
+            return sqlite3.connect(":memory:", check_same_thread=False)
+
+        stats = PoolStats("test", slow_ms=1000)
+        pool = _timed_pool(QueuePool, stats)(slow_connect, pool_size=1, max_overflow=0, timeout=5)
+        first = pool.connect()
+        # 新建连接花了 100ms，但没有排队
+        self.assertLess(stats.wait_ms_max, 50)
+
+        # 池满时第二个 checkout 要等第一个归还
+        threading.Timer(0.1, first.close).start()
+        second = pool.connect()
+        self.assertEqual(stats.checkouts, 2)
+        self.assertGreaterEqual(stats.wait_ms_max, 80)
+        second.close()
+        pool.dispose()
+
+
+@unittest.skipUnless(HAS_DEPS, "sqlalchemy / aiosqlite not installed")
+class TestSqliteEngine(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.loop.close()
+        self.tmp.cleanup()
+
+    def test_file_database_gets_pragmas_and_timed_pool(self):
+        engine = make_async_engine(f"sqlite+aiosqlite:///{os.path.join(self.tmp.name, 'test.db')}", name="test")
+
+        async def run():
+            async with engine.connect() as conn:
+                values = [
+                    (await conn.execute(text(f"PRAGMA {name}"))).scalar()
+                    for name in ("journal_mode", "synchronous", "busy_timeout")
+                ]
+            await engine.dispose()
+            return values
+        self.assertEqual(self.loop.run_until_complete(run()), ["wal", 1, 5000])
+        self.assertEqual(pool_stats(engine)["checkouts"], 1)
+
+    def test_memory_database_is_static_pool(self):
+        engine = make_async_engine("sqlite+aiosqlite://")
+
+        async def run():
+            async with engine.begin() as conn:
+                await conn.execute(text("CREATE TABLE t (x INTEGER)"))
+            # 另一个连接看到的是同一个内存库
+            async with engine.connect() as conn:
+                count = (await conn.execute(text("SELECT COUNT(*) FROM t"))).scalar()
+            await engine.dispose()
+            return count
+        self.assertEqual(self.loop.run_until_complete(run()), 0)
+        self.assertIsNone(pool_stats(engine))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+from app.event_log import RoomEventLog
+
+class TestRoomEventLog(unittest.TestCase):
+    def test_since_filters_by_seat(self):
+        log = RoomEventLog()
+        log.append('player_discard', {'tile': '1m'})
+        log.append('player_draw', {'tile': '2m'}, to_seat=1)
+        log.append('player_draw_secret', {'user_idx': 1}, skip_seat=1)
+
+        self.assertEqual([e for e, _, _ in log.since(0, 1)], ['player_discard', 'player_draw'])
+        self.assertEqual([e for e, _, _ in log.since(0, 2)], ['player_discard', 'player_draw_secret'])
+        self.assertEqual([seq for _, _, seq in log.since(1, 2)], [3])
+        self.assertEqual(log.since(3, 0), [])
+
+    def test_gap_beyond_buffer(self):
+        log = RoomEventLog(capacity=4)
+        for i in range(10):
+            log.append('player_draw_secret', {'user_idx': i % 4})
+
+        self.assertIsNone(log.since(5, 0))
+        self.assertEqual([seq for _, _, seq in log.since(6, 0)], [7, 8, 9, 10])
+
+    def test_client_ahead_of_log(self):
+        log = RoomEventLog()
+        log.append('player_discard', {'tile': '1m'})
+        # 客户端的序号比日志新，说明服务端丢过事件，改发快照
+        self.assertIsNone(log.since(2, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import asyncio
+import importlib.util
+import os
+import socket
+import tempfile
+import unittest
+
+HAS_DEPS = all(importlib.util.find_spec(m) for m in ("sqlalchemy", "aiosqlite", "pydantic", "dotenv"))
+
+if HAS_DEPS:
+    from core.config import settings
+    from app.checkpoint import Checkpointer
+    from app.game_manager import RoomManager, offline_sid
+    from app.handoff import HandoffReceiver, drain_rooms, handoff_socket_path, send_rooms
+
+
+def make_rooms(manager, count):
+    rooms = []
+    for i in range(count):
+        room = manager.create_room(i + 1, f"room-{i}")
+        for user_id in range(4):
+            room.add_player(f"sid-{i}-{user_id}", 100 * i + user_id)
+        room.init_game()
+        room.record_event("deal", {})
+        rooms.append(room)
+    return rooms
+
+
+class RecordingSession:
+    """
+    假的 AsyncSession：只记录 Checkpointer 写入的行
+    """
+    written = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, rows=None):
+        RecordingSession.written.extend(rows or [])
+
+    async def commit(self):
+        pass
+
+
+@unittest.skipUnless(HAS_DEPS, "sqlalchemy / aiosqlite not installed")
+class TestHandoff(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved_dir = settings.HANDOFF_SOCKET_DIR
+        settings.HANDOFF_SOCKET_DIR = self.tmp.name
+
+    def tearDown(self):
+        settings.HANDOFF_SOCKET_DIR = self.saved_dir
+        self.tmp.cleanup()
+        self.loop.close()
+
+    def test_rooms_arrive_in_receiver(self):
+        sender, target = RoomManager(), RoomManager()
+        rooms = make_rooms(sender, 3)
+        received = []
+        receiver = HandoffReceiver(target, on_room=received.append)
+        # 新进程的 socket：同一 worker 编号，不同 pid
+        path = handoff_socket_path(pid=os.getpid() + 1)
+
+        async def run():
+            await receiver.start(path)
+            count = await send_rooms(rooms)
+            await receiver.stop()
+            return count
+        self.assertEqual(self.loop.run_until_complete(run()), 3)
+        self.assertEqual(receiver.received, 3)
+        self.assertEqual([room.room_name for room in received], ["room-0", "room-1", "room-2"])
+        moved = target.rooms["room-1"]
+        self.assertEqual(moved.wall, rooms[1].wall)
+        self.assertEqual(moved.event_log.last_seq, rooms[1].event_log.last_seq)
+        self.assertEqual(moved.players, [offline_sid(u) for u in rooms[1].player_ids])
+        self.assertFalse(os.path.exists(path))
+
+    def test_sender_skips_own_socket(self):
+        receiver = HandoffReceiver(RoomManager())
+
+        async def run():
+            await receiver.start()  # 本进程自己的 socket
+            try:
+                with self.assertRaises(FileNotFoundError):
+                    await send_rooms([], timeout=0.1)
+            finally:
+                await receiver.stop()
+        self.loop.run_until_complete(run())
+
+    def test_start_keeps_live_socket_and_replaces_stale_one(self):
+        path = handoff_socket_path()
+        first, second = HandoffReceiver(RoomManager()), HandoffReceiver(RoomManager())
+
+        async def run():
+            await first.start(path)
+            with self.assertRaises(RuntimeError):
+                await second.start(path)
+            await first.stop()
+        self.loop.run_until_complete(run())
+
+        # 崩溃进程留下的死 socket 文件可以直接接管
+        dead = socket.socket(socket.AF_UNIX)
+        dead.bind(path)
+        dead.close()
+        self.assertTrue(os.path.exists(path))
+
+        async def restart():
+            await second.start(path)
+            await second.stop()
+        self.loop.run_until_complete(restart())
+
+    def test_drain_falls_back_to_checkpoints(self):
+        manager = RoomManager()
+        rooms = make_rooms(manager, 2)
+        checkpointer = Checkpointer(manager)
+        RecordingSession.written = []
+
+        async def run():
+            checkpointer.start(RecordingSession)
+            receiver = HandoffReceiver(manager)
+            await receiver.start()
+            # 没有新进程在监听
+            drained = await drain_rooms(manager, checkpointer, receiver, timeout=0.1)
+            self.assertIsNone(receiver.server)
+            return drained
+        drained = self.loop.run_until_complete(run())
+        self.assertEqual(drained, rooms)
+        self.assertIsNone(checkpointer._task)
+        self.assertEqual(sorted(row["id"] for row in RecordingSession.written), [1, 2])
+        self.assertEqual(checkpointer.dirty, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import asyncio
+import threading
+import time
+import unittest
+from core.hash_pool import HashPool, HashPoolBusy
+
+class TestHashPool(unittest.TestCase):
+    def test_limits_concurrency_and_keeps_loop_free(self):
+        pool = HashPool(max_workers=2, max_queue=10)
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def slow_hash(x):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return x * 2
+
+        async def main():
+            ticks = 0
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.005)
+                    ticks += 1
+            tick_task = asyncio.create_task(ticker())
+            results = await asyncio.gather(*(pool.run(slow_hash, i) for i in range(6)))
+            tick_task.cancel()
+            return results, ticks
+
+        results, ticks = asyncio.run(main())
+        self.assertEqual(results, [0, 2, 4, 6, 8, 10])
+        self.assertEqual(peak[0], 2)
+        # 三轮 x 50ms，事件循环期间一直在跑
+        self.assertGreater(ticks, 10)
+        stats = pool.stats()
+        self.assertEqual(stats["completed"], 6)
+        # 前两个直接拿到信号量，其余四个排队
+        self.assertEqual(stats["waiting_max"], 4)
+        self.assertEqual(stats["waiting"], 0)
+        pool.shutdown()
+
+    def test_rejects_when_queue_full(self):
+        pool = HashPool(max_workers=1, max_queue=2)
+
+        async def main():
+            return await asyncio.gather(*(pool.run(time.sleep, 0.02) for _ in range(5)), return_exceptions=True)
+
+        # 1 个在算，2 个排队，其余拒绝
+        results = asyncio.run(main())
+        self.assertEqual(sum(isinstance(r, HashPoolBusy) for r in results), 2)
+        self.assertEqual(pool.stats()["rejected"], 2)
+        pool.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
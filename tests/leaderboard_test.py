@@ -0,0 +1,94 @@
+import unittest
+
+from db_case import HAS_DB_DEPS as HAS_DEPS, AsyncDBTestCase
+
+if HAS_DEPS:
+    from app.database import Base
+    from app.models import User
+    from sqlalchemy import update
+    from core.leaderboard import Leaderboard, LeaderboardRefresher, watch_points
+
+
+@unittest.skipUnless(HAS_DEPS, "sqlalchemy not installed")
+class TestLeaderboard(unittest.TestCase):
+    def setUp(self):
+        self.board = Leaderboard()
+        self.board.load([(1, "a", 500), (2, "b", 900), (3, "c", 700), (4, "d", 700), (5, "e", 100)])
+
+    def test_rank_and_ties(self):
+        self.assertEqual([e["user_id"] for e in self.board.top(3)], [2, 3, 4])
+        # 同分同名次
+        self.assertEqual([self.board.rank(u) for u in (2, 3, 4, 1, 5)], [1, 2, 2, 4, 5])
+        self.assertIsNone(self.board.rank(42))
+
+    def test_update_and_around(self):
+        self.board.update(5, 1000)
+        self.board.update(6, 600, "f")
+        self.assertEqual(self.board.rank(5), 1)
+        self.assertEqual([e["user_id"] for e in self.board.around(6, radius=1)], [4, 6, 1])
+        self.assertEqual(self.board.around(5, radius=1)[0]["rank"], 1)
+
+        self.board.remove(2)
+        self.assertEqual(len(self.board), 5)
+        self.assertEqual([e["points"] for e in self.board.top(10)], [1000, 700, 700, 600, 500])
+
+
+@unittest.skipUnless(HAS_DEPS, "sqlalchemy / aiosqlite not installed")
+class TestWatchPoints(AsyncDBTestCase):
+    def setUp(self):
+        self.Base = Base
+        self.board = Leaderboard()
+        self.unwatch = watch_points(self.board, User)
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        self.unwatch()
+
+    def test_commit_updates_board_and_rebuild_matches(self):
+        async def run(db):
+            users = [User(username=f"u{i}", email=f"u{i}@example.com", hashed_password="x", points=100 * i)
+                     for i in range(1, 4)]
+            db.add_all(users)
+            await db.commit()
+            ids = [u.id for u in users]
+            self.assertEqual(self.board.rank(ids[2]), 1)
+
+            users[0].points = 1000
+            await db.commit()
+            self.assertEqual(self.board.rank(ids[0]), 1)
+
+            # 回滚的修改不进榜
+            users[1].points = 5000
+            await db.flush()
+            await db.rollback()
+            self.assertEqual(self.board.rank(ids[1]), 3)
+
+            return await self.board.rebuild(db, User)
+        self.assertEqual(self.run_db(run), [])
+
+    def test_refresher_catches_changes_from_other_processes(self):
+        refresher = LeaderboardRefresher(self.board, User, interval=3600)
+        refresher._session_factory = self.Session
+
+        async def run(db):
+            users = [User(username=f"u{i}", email=f"u{i}@example.com", hashed_password="x", points=100 * i)
+                     for i in range(1, 4)]
+            db.add_all(users)
+            await db.commit()
+            # 另一个进程改的积分：本进程没有 ORM 事件
+            await db.execute(update(User).where(User.id == users[0].id).values(points=1000))
+            await db.commit()
+            return users[0].id
+        user_id = self.run_db(run)
+        self.assertEqual(self.board.rank(user_id), 3)
+
+        self.run_async(refresher.flush())
+        self.assertEqual(self.board.rank(user_id), 1)
+        stats = refresher.stats()
+        self.assertEqual((stats["size"], stats["drifted"]), (3, 1))
+        self.assertIsNotNone(stats["rebuilt_at"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+from app.lobby_index import LobbyEntry, LobbyIndex
+from app.lobby_feed import LobbyFeed, LOBBY_ROOM, SNAPSHOT_EVENT, DIFF_EVENT
+
+BASE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+def entry(room_id, minutes=0, status="WAITING"):
+    return LobbyEntry(room_id, f"room{room_id}", 4, status, 1, BASE + timedelta(minutes=minutes), 1, "owner")
+
+class FakeSio:
+    def __init__(self):
+        self.sent = []
+        self.rooms = {}
+
+    async def enter_room(self, sid, room):
+        self.rooms.setdefault(room, set()).add(sid)
+
+    async def leave_room(self, sid, room):
+        self.rooms.get(room, set()).discard(sid)
+
+    async def emit(self, event, data, room=None):
+        self.sent.append((room, event, data))
+
+class TestLobbyFeed(unittest.TestCase):
+    def setUp(self):
+        self.sio = FakeSio()
+        self.index = LobbyIndex()
+        self.feed = LobbyFeed(self.sio, self.index)
+
+    def test_snapshot_then_diff(self):
+        self.index.add(entry(1))
+        asyncio.run(self.feed.flush())
+        asyncio.run(self.feed.subscribe('a', 'WAITING'))
+        room, event, snapshot = self.sio.sent[-1]
+        self.assertEqual((room, event), ('a', SNAPSHOT_EVENT))
+        self.assertEqual([r['id'] for r in snapshot['rooms']], [1])
+        self.assertEqual(snapshot['rooms'][0]['created_at'], BASE.isoformat())
+        self.assertIn('a', self.sio.rooms[LOBBY_ROOM])
+
+        self.index.add(entry(2, 1))
+        self.index.update(1, current_player_count=2)
+        asyncio.run(self.feed.flush())
+        room, event, diff = self.sio.sent[-1]
+        self.assertEqual((room, event), (LOBBY_ROOM, DIFF_EVENT))
+        self.assertEqual(diff['seq'], snapshot['seq'] + 1)
+        self.assertEqual([r['id'] for r in diff['created']], [2])
+        self.assertEqual([(r['id'], r['current_player_count']) for r in diff['updated']], [(1, 2)])
+        self.assertEqual(diff['removed'], [])
+
+    def test_changes_coalesce_within_interval(self):
+        self.index.add(entry(1))
+        self.index.add(entry(2))
+        asyncio.run(self.feed.flush())
+        self.sio.sent.clear()
+
+        # 新建后立即满员开局：只发一次 created，带最终状态
+        self.index.add(entry(3))
+        self.index.update(3, current_player_count=4, status="PLAYING")
+        # 新建又删除：什么都不发
+        self.index.add(entry(4))
+        self.index.remove(4)
+        # 多次更新后删除：只发 removed
+        self.index.update(1, current_player_count=2)
+        self.index.update(1, status="FINISHED")
+        asyncio.run(self.feed.flush())
+
+        (_, _, diff), = self.sio.sent
+        self.assertEqual([(r['id'], r['status']) for r in diff['created']], [(3, 'PLAYING')])
+        self.assertEqual(diff['updated'], [])
+        self.assertEqual(diff['removed'], [1])
+
+    def test_snapshot_limit_is_validated(self):
+        for room_id in range(1, 61):
+            self.index.add(entry(room_id, room_id))
+        sizes = {}
+        for limit in (None, 5, "7", 500, 0, -3, "abc", 2.5, [1], {"n": 1}, True):
+            asyncio.run(self.feed.subscribe('a', 'WAITING', limit))
+            sizes[repr(limit)] = len(self.sio.sent[-1][2]['rooms'])
+        self.assertEqual(sizes, {
+            "None": 50, "5": 5, "'7'": 7, "500": 50, "0": 50, "-3": 50,
+            "'abc'": 50, "2.5": 50, "[1]": 50, "{'n': 1}": 50, "True": 50,
+        })
+
+    def test_unsubscribe_leaves_room(self):
+        asyncio.run(self.feed.subscribe('a', 'WAITING'))
+        asyncio.run(self.feed.unsubscribe('a'))
+        self.assertNotIn('a', self.sio.rooms[LOBBY_ROOM])
+
+    def test_no_diff_without_changes(self):
+        asyncio.run(self.feed.flush())
+        self.assertEqual(self.sio.sent, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from app.lobby_index import LobbyEntry, LobbyIndex
+
+BASE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+def entry(room_id, minutes, status="WAITING", players=1):
+    return LobbyEntry(room_id, f"room{room_id}", 4, status, 1, BASE + timedelta(minutes=minutes), players, "owner")
+
+class TestLobbyIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = LobbyIndex()
+        for i in range(1, 11):
+            self.index.add(entry(i, i))
+
+    def test_keyset_pages_newest_first(self):
+        seen, cursor = [], None
+        while True:
+            items, cursor = self.index.page("WAITING", 3, cursor)
+            seen.extend(e.id for e in items)
+            if cursor is None:
+                break
+        self.assertEqual(seen, list(range(10, 0, -1)))
+
+    def test_cursor_stable_under_inserts(self):
+        items, cursor = self.index.page("WAITING", 3)
+        self.assertEqual([e.id for e in items], [10, 9, 8])
+        # 新房间插到最前面，不影响已经翻过的位置
+        self.index.add(entry(11, 20))
+        items, _ = self.index.page("WAITING", 3, cursor)
+        self.assertEqual([e.id for e in items], [7, 6, 5])
+
+    def test_status_change_moves_between_lists(self):
+        self.index.update(5, status="PLAYING", current_player_count=4)
+        self.assertNotIn(5, [e.id for e in self.index.page("WAITING", 20)[0]])
+        self.assertEqual([e.id for e in self.index.page("PLAYING", 20)[0]], [5])
+        self.index.update(5, status="FINISHED")
+        self.assertEqual(self.index.page("PLAYING", 20)[0], [])
+        self.assertNotIn(5, self.index.entries)
+
+    def test_same_created_at_ordered_by_id(self):
+        index = LobbyIndex()
+        for i in (3, 1, 2):
+            index.add(entry(i, 0))
+        first, cursor = index.page("WAITING", 2)
+        rest, _ = index.page("WAITING", 2, cursor)
+        self.assertEqual([e.id for e in first + rest], [3, 2, 1])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            self.index.page("WAITING", 3, "not-a-cursor")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import time
+import unittest
+
+from app.matchmaking import Matchmaker
+
+
+class TestMatchmaker(unittest.TestCase):
+    def queue(self, mm, points, now=0.0):
+        for i, p in enumerate(points):
+            mm.enqueue(f"sid{i}", i, f"u{i}", p, now=now)
+
+    def test_fills_tables_within_band(self):
+        mm = Matchmaker(base_band=100, widen_per_second=0)
+        self.queue(mm, [1000, 1050, 1020, 1080, 1500, 1510, 1520, 1530, 3000])
+        tables = mm.collect(now=1.0)
+        self.assertEqual([[t.points for t in table] for table in tables],
+                         [[1530, 1520, 1510, 1500], [1080, 1050, 1020, 1000]])
+        # 凑不满一桌的留在队列里
+        self.assertEqual(list(mm.waiting), [8])
+        self.assertEqual(mm.matched, 8)
+
+    def test_band_widens_with_wait(self):
+        mm = Matchmaker(base_band=100, widen_per_second=100, max_band=1000)
+        self.queue(mm, [1000, 1100, 1200, 1300])
+        self.assertEqual(mm.collect(now=1.0), [])
+        tables = mm.collect(now=2.5)
+        self.assertEqual(len(tables), 1)
+        self.assertEqual(mm.percentiles()["p50"], 2.5)
+
+    def test_failed_match_is_requeued_without_wait_samples(self):
+        mm = Matchmaker(base_band=100, widen_per_second=0)
+        self.queue(mm, [1000, 1010, 1020, 1030])
+        tables = mm.collect(now=1.0)
+        mm.requeue(tables)
+        self.assertEqual(sorted(mm.waiting), [0, 1, 2, 3])
+        self.assertEqual((mm.matched, len(mm.wait_times)), (0, 0))
+
+        # 下一轮建成后每人只记一次，排队时长从最初入队算起
+        mm.collect(now=3.0)
+        self.assertEqual(list(mm.wait_times), [3.0] * 4)
+        self.assertEqual(mm.matched, 4)
+
+    def test_requeue_and_cancel(self):
+        mm = Matchmaker()
+        self.assertTrue(mm.enqueue("a", 1, "u1", 1000, now=0.0))
+        self.assertFalse(mm.enqueue("b", 1, "u1", 1000, now=5.0))
+        self.assertEqual((mm.waiting[1].sid, mm.waiting[1].enqueued_at), ("b", 0.0))
+        mm.cancel_sid("b")
+        self.assertEqual(mm.waiting, {})
+
+    def test_throughput(self):
+        # 一轮配桌处理几千人应在几十毫秒量级
+        mm = Matchmaker(base_band=200)
+        for i in range(8000):
+            mm.enqueue(f"s{i}", i, f"u{i}", 1000 + (i * 37) % 1000, now=0.0)
+        start = time.perf_counter()
+        tables = mm.collect(now=1.0)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(len(tables) * 4 + len(mm.waiting), 8000)
+        self.assertGreater(len(tables), 1900)
+
+
+if __name__ == "__main__":
+    unittest.main()
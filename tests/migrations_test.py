@@ -0,0 +1,47 @@
+import unittest
+
+from db_case import HAS_DB_DEPS as HAS_DEPS, AsyncDBTestCase
+
+if HAS_DEPS:
+    from sqlalchemy import inspect, insert, text
+    from app.database import Base
+    from app.migrations import add_missing_columns
+    from app.models import Record
+
+
+@unittest.skipUnless(HAS_DEPS, "sqlalchemy / aiosqlite not installed")
+class TestAddMissingColumns(AsyncDBTestCase):
+    # 不设 Base，不预先建表：用例自己造出老版本的表结构
+
+    def test_old_records_table_gets_replay_blob(self):
+        async def run():
+            async with self.engine.begin() as conn:
+                # 加 replay_blob 之前的 records 表
+                await conn.execute(text(
+                    "CREATE TABLE records (id INTEGER PRIMARY KEY, room_id INTEGER NOT NULL, "
+                    "turn_count INTEGER NOT NULL, replay_data TEXT, result_data TEXT, created_at DATETIME)"
+                ))
+                await conn.execute(text("INSERT INTO records (room_id, turn_count, replay_data) VALUES (1, 0, '[]')"))
+                await conn.run_sync(Base.metadata.create_all)
+                added = await conn.run_sync(add_missing_columns)
+                again = await conn.run_sync(add_missing_columns)
+                columns = await conn.run_sync(lambda c: {col["name"] for col in inspect(c).get_columns("records")})
+                await conn.execute(insert(Record).values(room_id=1, turn_count=1, replay_blob=b"\x00\x01"))
+                rows = (await conn.execute(text("SELECT replay_data, replay_blob FROM records ORDER BY id"))).all()
+            return added, again, columns, rows
+        added, again, columns, rows = self.run_async(run())
+        self.assertEqual(added, ["records.replay_blob"])
+        self.assertEqual(again, [])
+        self.assertIn("replay_blob", columns)
+        self.assertEqual([tuple(r) for r in rows], [("[]", None), (None, b"\x00\x01")])
+
+    def test_fresh_database_needs_nothing(self):
+        async def run():
+            async with self.engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                return await conn.run_sync(add_missing_columns)
+        self.assertEqual(self.run_async(run()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import asyncio
+import unittest
+from app.outbound import Outbound, CAP_BATCH, BATCH_EVENT, BINARY_EVENT
+from app.utils.wire_codec import decode_frame
+
+class FakeManager:
+    def __init__(self, rooms):
+        self.rooms = rooms
+
+    def get_participants(self, namespace, room):
+        for sid in self.rooms.get(room, [room]):
+            yield sid, "eio-" + sid
+
+class FakeSio:
+    def __init__(self, rooms):
+        self.manager = FakeManager(rooms)
+        self.sent = []
+
+    async def emit(self, event, data, room=None):
+        self.sent.append((room, event, data))
+
+class TestOutbound(unittest.TestCase):
+    def run_batch(self, sio, outbound):
+        async def handler():
+            async with outbound.batch() as out:
+                out.emit('player_discard', {'seat': 0, 'user_id': 1, 'tile': '1m'}, room='r1')
+                out.emit('player_draw', {'tile': '2m'}, room='b')
+                out.emit('player_draw_secret', {'user_idx': 1}, room='r1', skip_sid='b')
+        asyncio.run(handler())
+
+    def test_batched_client_gets_single_frame(self):
+        sio = FakeSio({'r1': ['a', 'b']})
+        outbound = Outbound(sio)
+        outbound.register('a', [CAP_BATCH])
+        outbound.register('b', [CAP_BATCH])
+        self.run_batch(sio, outbound)
+
+        self.assertEqual(sio.sent, [
+            ('a', BATCH_EVENT, [['player_discard', {'seat': 0, 'user_id': 1, 'tile': '1m'}], ['player_draw_secret', {'user_idx': 1}]]),
+            ('b', BATCH_EVENT, [['player_discard', {'seat': 0, 'user_id': 1, 'tile': '1m'}], ['player_draw', {'tile': '2m'}]]),
+        ])
+
+    def test_legacy_client_gets_individual_events(self):
+        sio = FakeSio({'r1': ['a', 'b']})
+        outbound = Outbound(sio)
+        outbound.register('a', None)
+        self.run_batch(sio, outbound)
+
+        self.assertEqual([(room, event) for room, event, _ in sio.sent], [
+            ('a', 'player_discard'),
+            ('a', 'player_draw_secret'),
+            ('b', 'player_discard'),
+            ('b', 'player_draw'),
+        ])
+
+    def test_binary_client_gets_binary_frame(self):
+        sio = FakeSio({'r1': ['a', 'b']})
+        outbound = Outbound(sio)
+        outbound.register('b', None, 'bin')
+        self.run_batch(sio, outbound)
+
+        room, event, frame = [sent for sent in sio.sent if sent[0] == 'b'][0]
+        self.assertEqual(event, BINARY_EVENT)
+        self.assertEqual([e for e, _, _ in decode_frame(frame)], ['player_discard', 'player_draw'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from db_case import HAS_DB_DEPS as HAS_DEPS, AsyncDBTestCase
+
+if HAS_DEPS:
+    from sqlalchemy.future import select
+    from app.checkpoint import Checkpointer
+    from app.database import Base
+    from app.game_manager import RoomManager, is_online, offline_sid
+    from app.lobby_index import LobbyEntry, LobbyIndex
+    from app.models import PlayerInRoom, Record, Room, RoomStatus, User
+    from app.reaper import Reaper
+
+
+def make_reaper(manager, connected=(), **kwargs):
+    return Reaper(manager, Checkpointer(manager), LobbyIndex(), is_connected=lambda sid: sid in connected,
+                  idle_ttl=100, abandoned_ttl=10, stale_ttl=3600, **kwargs)
+
+
+def seated_room(manager, room_id, sids, last_active=0.0):
+    room = manager.create_room(room_id, f"room-{room_id}")
+    for user_id, sid in enumerate(sids, start=room_id * 10):
+        room.add_player(sid or offline_sid(user_id), user_id)
+    room.last_active = last_active
+    return room
+
+
+@unittest.skipUnless(HAS_DEPS, "sqlalchemy / aiosqlite not installed")
+class TestReaperCollect(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def collect(self, reaper, now):
+        reaped = self.loop.run_until_complete(reaper.collect(now=now))
+        self.close_actors(reaper.room_manager)
+        return reaped
+
+    def close_actors(self, manager):
+        # 没被回收的房间执行器还在等事件，关闭后等任务退出
+        async def close():
+            tasks = [actor._task for actor in manager.actors.actors.values() if actor._task is not None]
+            for name in list(manager.actors.actors):
+                manager.actors.close(name)
+            await asyncio.gather(*tasks)
+        self.loop.run_until_complete(close())
+
+    def test_dead_sids_go_offline_and_start_grace(self):
+        manager = RoomManager()
+        room = seated_room(manager, 1, ["a", "b", None, "d"], last_active=95)
+        offline = []
+        reaper = make_reaper(manager, connected={"a", "d"},
+                             on_seat_offline=lambda r, seat: offline.append((r.room_name, seat)))
+
+        self.assertEqual(self.collect(reaper, 100), [])
+        self.assertEqual(room.players, ["a", offline_sid(11), offline_sid(12), "d"])
+        # 原本就离线的座位不重复处理
+        self.assertEqual(offline, [("room-1", 1)])
+        self.assertEqual(reaper.stats["sids_cleared"], 1)
+
+    def test_idle_and_abandoned_rooms_are_removed(self):
+        manager = RoomManager()
+        idle = seated_room(manager, 1, ["a"], last_active=0)
+        abandoned = seated_room(manager, 2, [None, None], last_active=80)
+        waiting = seated_room(manager, 3, [None, "c"], last_active=80)
+        reaper = make_reaper(manager, connected={"a", "c"})
+        reaper.checkpointer.dirty[idle.room_name] = None
+
+        reaped = self.collect(reaper, 100)
+        self.assertEqual(sorted(r.room_name for r in reaped), ["room-1", "room-2"])
+        self.assertEqual(list(manager.rooms), ["room-3"])
+        self.assertTrue(any(is_online(sid) for sid in waiting.players))
+        # 摘下的房间不再写快照
+        self.assertEqual(reaper.checkpointer.dirty, {})
+        self.assertEqual(reaper.stats["rooms_reaped"], 2)
+        self.assertGreater(reaper.stats["bytes_reclaimed"], 0)
+
+    def test_runs_inside_room_actor_behind_client_events(self):
+        manager = RoomManager()
+        room = seated_room(manager, 1, ["a", "b"], last_active=0)
+        reaper = make_reaper(manager, connected={"a", "b"})
+        log = []
+
+        async def client_event():
+            log.append("client:start")
+            await asyncio.sleep(0)
+            # 回收不会在事件中途把房间摘掉
+            log.append(("client:end", manager.get_room("room-1") is room))
+
+        async def run():
+            manager.actors = type(manager.actors)(maxsize=1)
+            manager.actors.send("room-1", client_event)
+            # 收件箱已满，回收仍然排得进去
+            self.assertFalse(manager.actors.send("room-1", log.append, "rejected"))
+            actor = manager.actors.actors["room-1"]
+            reaped = await reaper.collect(now=200)
+            # 房间移除时关闭执行器，任务在当前事件结束后自行退出
+            await actor._task
+            return reaped
+
+        self.assertEqual(self.loop.run_until_complete(run()), [room])
+        self.assertEqual(log, ["client:start", ("client:end", True)])
+        self.assertNotIn("room-1", manager.actors.actors)
+
+
+@unittest.skipUnless(HAS_DEPS, "sqlalchemy / aiosqlite not installed")
+class TestReaperPurge(AsyncDBTestCase):
+    def setUp(self):
+        self.Base = Base
+        super().setUp()
+
+    async def seed(self, db):
+        old = datetime.now(timezone.utc) - timedelta(days=2)
+        db.add(User(id=1, username="owner", email="owner@example.com", hashed_password="x"))
+        rooms = {
+            1: ("reaped-empty", None), 2: ("reaped-played", None),
+            3: ("stale-played", old), 4: ("stale-empty", old), 5: ("stale-held", old), 6: ("fresh", None),
+        }
+        for room_id, (name, created_at) in rooms.items():
+            db.add(Room(id=room_id, name=name, created_by=1, status=RoomStatus.PLAYING,
+                        created_at=created_at or datetime.now(timezone.utc)))
+            db.add(PlayerInRoom(room_id=room_id, user_id=1, player_number=0))
+        db.add(Record(room_id=3, turn_count=0))
+        await db.commit()
+
+    def test_purge_deletes_or_finishes_rows(self):
+        manager = RoomManager()
+        manager.create_room(5, "stale-held")
+        reaper = make_reaper(manager)
+        for room_id in range(1, 7):
+            reaper.lobby_index.add(LobbyEntry(room_id, f"r{room_id}", 4, RoomStatus.PLAYING, 1,
+                                              datetime.now(timezone.utc), 1, "owner"))
+        reaped_empty = seated_room(RoomManager(), 1, ["a"])
+        reaped_played = seated_room(RoomManager(), 2, ["b"])
+        reaped_played.round_index = 1
+
+        self.run_db(lambda db: reaper.purge_rows(db, [reaped_empty, reaped_played]))
+
+        async def state(db):
+            rooms = dict((await db.execute(select(Room.id, Room.status))).all())
+            members = (await db.execute(select(PlayerInRoom.room_id).order_by(PlayerInRoom.room_id))).scalars().all()
+            return rooms, members
+        rooms, members = self.run_db(state)
+        # 有牌谱的标记结束保留回放，没有的直接删除；本进程还持有的和新房间不动
+        self.assertEqual(rooms, {2: RoomStatus.FINISHED, 3: RoomStatus.FINISHED,
+                                 5: RoomStatus.PLAYING, 6: RoomStatus.PLAYING})
+        self.assertEqual(members, [5, 6])
+        self.assertEqual(sorted(reaper.lobby_index.entries), [5, 6])
+        self.assertEqual(reaper.stats["rooms_finished"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
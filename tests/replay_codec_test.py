@@ -0,0 +1,97 @@
+import io
+import json
+import random
+import unittest
+from app.utils.replay_codec import ReplayEncoder, ReplayReader, MAGIC, encode_action, decode_replay, iter_replay, load_replay
+from app.utils.wire_codec import WireDecodeError
+
+def sample_actions(count):
+    rng = random.Random(7)
+    tiles = ["{}{}".format(n, s) for s in "mps" for n in range(10)] + ["{}z".format(n) for n in range(1, 8)]
+    actions = [{"type": "deal", "p": p, "hand": rng.sample(tiles, 13)} for p in range(4)]
+    for i in range(count):
+        kind = "draw" if i % 2 == 0 else "discard"
+        actions.append({"type": kind, "p": i % 4, "tile": rng.choice(tiles)})
+    actions.append({"type": "ron", "p": 2, "tile": "0s", "from_p": 1})
+    actions.append({"type": "riichi", "p": 3, "step": 1})  # 没有紧凑格式的动作
+    return actions
+
+class TestReplayCodec(unittest.TestCase):
+    def encode(self, actions, compress):
+        encoder = ReplayEncoder(compress=compress)
+        for action in actions:
+            encoder.append(action)
+        return encoder.finish()
+
+    def test_round_trip(self):
+        actions = sample_actions(120)
+        for compress in (True, False):
+            with self.subTest(compress=compress):
+                self.assertEqual(decode_replay(self.encode(actions, compress)), actions)
+
+    def test_streaming_from_file(self):
+        actions = sample_actions(5000)
+        blob = self.encode(actions, True)
+        stream = iter_replay(io.BytesIO(blob))
+        self.assertEqual(next(stream), actions[0])
+        self.assertEqual(list(stream), actions[1:])
+
+    def test_smaller_than_json(self):
+        actions = sample_actions(120)
+        self.assertLess(len(self.encode(actions, False)) * 4, len(json.dumps(actions)))
+
+    def test_legacy_json(self):
+        actions = sample_actions(3)
+        self.assertEqual(load_replay(None, json.dumps(actions)), actions)
+
+    def test_bad_blob(self):
+        with self.assertRaises(WireDecodeError):
+            decode_replay(b"nope")
+        blob = self.encode(sample_actions(10), False)
+        with self.assertRaises(WireDecodeError):
+            decode_replay(blob[:len(blob) // 2])
+
+    def test_v1_blob(self):
+        actions = sample_actions(5)
+        body = bytearray()
+        for action in actions:
+            encode_action(body, action)
+        self.assertEqual(decode_replay(MAGIC + bytes([1, 0]) + bytes(body)), actions)
+
+    def test_keyframe_seek(self):
+        # 简单的状态机：手牌 + 牌河，用来验证关键帧 + 重放 == 从头重放
+        state = {"hands": [[], [], [], []], "discards": [], "wall_count": 70, "turn_index": 0}
+
+        def apply(st, action):
+            if action["type"] == "deal":
+                st["hands"][action["p"]] = list(action["hand"])
+            elif action["type"] == "draw":
+                st["hands"][action["p"]].append(action["tile"])
+                st["wall_count"] -= 1
+            elif action["type"] == "discard":
+                st["discards"].append(action["tile"])
+
+        def copy(st):
+            return {"hands": [list(h) for h in st["hands"]], "discards": list(st["discards"]),
+                    "wall_count": st["wall_count"], "turn_index": st["turn_index"]}
+
+        actions = sample_actions(60)[:-2]
+        encoder = ReplayEncoder(keyframe_interval=8, snapshot=lambda: copy(state))
+        history = [copy(state)]
+        for action in actions:
+            apply(state, action)
+            encoder.append(action)
+            history.append(copy(state))
+
+        reader = ReplayReader(encoder.finish())
+        self.assertEqual(reader.action_count, len(actions))
+        for target in range(len(actions) + 1):
+            keyframe, tail = reader.seek(target)
+            self.assertLessEqual(len(tail), 8)
+            for action in tail:
+                apply(keyframe, action)
+            self.assertEqual(keyframe, history[target], target)
+        self.assertEqual(list(reader.iter_from(30)), actions[30:])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import asyncio
+import unittest
+
+from db_case import HAS_DB_DEPS as HAS_DEPS, AsyncDBTestCase
+
+if HAS_DEPS:
+    from sqlalchemy import event, func
+    from sqlalchemy.future import select
+    from app.database import Base
+    from app.models import Record
+    from app.replay_writer import ReplayWriter
+
+
+@unittest.skipUnless(HAS_DEPS, "sqlalchemy / aiosqlite not installed")
+class TestReplayWriter(AsyncDBTestCase):
+    def setUp(self):
+        self.Base = Base
+        super().setUp()
+
+    def record_count(self):
+        async def count(db):
+            return (await db.execute(select(func.count(Record.id)))).scalar()
+        return self.run_db(count)
+
+    def test_flush_is_one_executemany(self):
+        writer = ReplayWriter()
+        writer._session_factory = self.Session
+        for turn in range(5):
+            writer.submit(1, turn, (b"\x01" * 8, 10), {"type": "ryuukyoku"})
+
+        statements = []
+        listener = lambda conn, cursor, statement, params, context, executemany: statements.append(executemany)
+        event.listen(self.engine.sync_engine, "before_cursor_execute", listener)
+        try:
+            self.run_async(writer.flush())
+        finally:
+            event.remove(self.engine.sync_engine, "before_cursor_execute", listener)
+
+        self.assertEqual(statements, [True])
+        self.assertEqual(self.record_count(), 5)
+        self.assertEqual((writer.pending, writer.pending_actions), ([], 0))
+
+    def test_threshold_triggers_flush(self):
+        writer = ReplayWriter(flush_interval=3600, max_pending_actions=20)
+
+        async def run():
+            writer.start(self.Session)
+            writer.submit(1, 0, (b"\x01", 15))
+            self.assertIsNone(writer._flush_task)
+            writer.submit(1, 1, (b"\x02", 15))
+            self.assertIsNotNone(writer._flush_task)
+            await writer._flush_task
+            await writer.stop()
+        self.run_async(run())
+        self.assertEqual(self.record_count(), 2)
+
+    def test_interval_flush(self):
+        writer = ReplayWriter(flush_interval=0.01)
+
+        async def run():
+            writer.start(self.Session)
+            writer.submit(1, 0, (b"\x01", 3))
+            for _ in range(300):
+                await asyncio.sleep(0.01)
+                if not writer.pending:
+                    break
+            self.assertEqual(writer.pending, [])
+            await writer.stop()
+        self.run_async(run())
+        self.assertEqual(self.record_count(), 1)
+
+    def test_failed_flush_requeues_batch(self):
+        writer = ReplayWriter()
+
+        class BrokenSession:
+            async def __aenter__(self):
+                raise RuntimeError("db down")
+
+            async def __aexit__(self, *exc):
+                return False
+
+        writer._session_factory = BrokenSession
+        writer.submit(1, 0, (b"\x01", 3))
+        writer.submit(1, 1, (b"\x02", 4))
+        with self.assertRaises(RuntimeError):
+            self.run_async(writer.flush())
+        self.assertEqual([row["turn_count"] for row, _ in writer.pending], [0, 1])
+        self.assertEqual(writer.pending_actions, 7)
+
+        # 恢复后下一轮写入，顺序不变
+        writer._session_factory = self.Session
+        self.run_async(writer.flush())
+
+        async def turns(db):
+            return (await db.execute(select(Record.turn_count).order_by(Record.id))).scalars().all()
+        self.assertEqual(self.run_db(turns), [0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import importlib.util
+import unittest
+
+HAS_DEPS = all(importlib.util.find_spec(m) for m in ("jose", "passlib", "fastapi", "pydantic", "dotenv"))
+
+if HAS_DEPS:
+    from app.security import create_access_token, create_resume_ticket, decode_access_token, decode_resume_ticket
+
+
+@unittest.skipUnless(HAS_DEPS, "jose / passlib / fastapi not installed")
+class TestResumeTicket(unittest.TestCase):
+    def test_ticket_only_accepted_as_ticket(self):
+        ticket = create_resume_ticket(5, 1, "alice")
+        self.assertIsNone(decode_access_token(ticket))
+        payload = decode_resume_ticket(ticket)
+        self.assertEqual((payload["sid"], payload["user_id"], payload["sub"]), (5, 1, "alice"))
+
+    def test_access_token_not_accepted_as_ticket(self):
+        token = create_access_token({"sub": "alice", "user_id": 1, "sid": 5})
+        self.assertEqual(decode_access_token(token)["user_id"], 1)
+        self.assertIsNone(decode_resume_ticket(token))
+        self.assertIsNone(decode_resume_ticket("not-a-token"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import asyncio
+import unittest
+
+from app.room_actor import RoomActor, RoomActors
+
+
+class TestRoomActor(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_events_run_in_order_without_interleaving(self):
+        log = []
+
+        async def step(name):
+            log.append(f"{name}:start")
+            await asyncio.sleep(0)  # 中间的 await 不会让同一房间的下一个事件插进来
+            log.append(f"{name}:end")
+
+        async def run():
+            actors = RoomActors()
+            for name in ("a", "b", "c"):
+                self.assertTrue(actors.send("room", step, name))
+            actors.send("room", log.append, "sync")
+            await actors.drain()
+            stats = actors.stats()
+            actors.close("room")
+            return stats
+
+        stats = self.loop.run_until_complete(run())
+        self.assertEqual(log, ["a:start", "a:end", "b:start", "b:end", "c:start", "c:end", "sync"])
+        self.assertEqual((stats["rooms"], stats["queued"], stats["max_depth"]), (1, 0, 4))
+
+    def test_bounded_inbox_and_errors(self):
+        async def run():
+            actor = RoomActor("room", maxsize=2)
+            accepted = [actor.send(lambda: 1 / 0) for _ in range(3)]
+            await actor.drain()
+            actor.close()
+            return accepted, actor.stats()
+
+        accepted, stats = self.loop.run_until_complete(run())
+        self.assertEqual(accepted, [True, True, False])
+        # 出错的事件不影响后续事件
+        self.assertEqual((stats["processed"], stats["rejected"]), (2, 1))
+
+    def test_internal_events_bypass_the_limit(self):
+        async def run():
+            actor = RoomActor("room", maxsize=1)
+            log = []
+            self.assertTrue(actor.send(log.append, "client"))
+            self.assertFalse(actor.send(log.append, "flood"))
+            # 超时、掉线等内部事件不会被客户端事件挤掉，顺序不变
+            self.assertTrue(actor.send_internal(log.append, "timeout"))
+            await actor.drain()
+            actor.close()
+            await actor._task
+            return log, actor.stats()
+
+        log, stats = self.loop.run_until_complete(run())
+        self.assertEqual(log, ["client", "timeout"])
+        self.assertEqual((stats["processed"], stats["rejected"], stats["max_depth"]), (2, 1, 2))
+
+    def test_close_finishes_current_and_queued_events(self):
+        log = []
+
+        async def run():
+            actors = RoomActors()
+
+            async def remove_room():
+                log.append("remove:start")
+                actors.close("room")  # 在自己的事件里关闭，不打断当前事件
+                await asyncio.sleep(0)
+                log.append("remove:end")
+
+            actors.send("room", remove_room)
+            actors.send("room", log.append, "queued")
+            actor = actors.actors["room"]
+            await asyncio.sleep(0)
+            self.assertFalse(actor.send(log.append, "late"))
+            self.assertFalse(actor.send_internal(log.append, "late"))
+            await actor._task
+            self.assertNotIn("room", actors.actors)
+
+        self.loop.run_until_complete(run())
+        self.assertEqual(log, ["remove:start", "remove:end", "queued"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from core.room_codes import RoomCodeAllocator, ROOM_CODE_ALPHABET
+
+class TestRoomCodeAllocator(unittest.TestCase):
+    def test_codes_unique_and_well_formed(self):
+        allocator = RoomCodeAllocator(length=6)
+        codes = [allocator.allocate() for _ in range(20000)]
+        self.assertEqual(len(set(codes)), len(codes))
+        for code in codes[:100]:
+            self.assertEqual(len(code), 6)
+            self.assertTrue(set(code) <= set(ROOM_CODE_ALPHABET))
+
+    def test_small_space_is_a_permutation(self):
+        allocator = RoomCodeAllocator(length=2)
+        codes = {allocator.allocate() for _ in range(allocator.space)}
+        self.assertEqual(len(codes), 36 * 36)
+        with self.assertRaises(RuntimeError):
+            allocator.allocate()
+
+    def test_skips_loaded_codes(self):
+        allocator = RoomCodeAllocator(length=2)
+        preview = RoomCodeAllocator(length=2)
+        preview.offset, preview.next_index = allocator.offset, allocator.next_index
+        taken = [preview.allocate() for _ in range(5)]
+        allocator.load(taken[:3])
+        self.assertEqual(allocator.allocate(), taken[3])
+
+    def test_release_returns_code_to_pool(self):
+        allocator = RoomCodeAllocator(length=4)
+        first = allocator.allocate()
+        allocator.allocate()
+        allocator.release(first)
+        self.assertEqual(allocator.allocate(), first)
+        # 未占用的号码不会进池
+        allocator.release("ZZZZ")
+        self.assertNotEqual(allocator.allocate(), "ZZZZ")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import importlib.util
+import types
+import unittest
+from unittest import mock
+
+from db_case import HAS_DB_DEPS, AsyncDBTestCase, memory_core_db
+
+HAS_DEPS = HAS_DB_DEPS and all(importlib.util.find_spec(m) for m in ("fastapi", "jose"))
+
+if HAS_DEPS:
+    core_db = memory_core_db()
+    from sqlalchemy.exc import IntegrityError
+    from core.room_codes import RoomCodeAllocator
+    from api.api_v1.endpoints import rooms
+    from models.user import User
+    from models.room import Room
+
+
+@unittest.skipUnless(HAS_DEPS, "sqlalchemy / aiosqlite / fastapi not installed")
+class TestCreateRoomCodes(AsyncDBTestCase):
+    def setUp(self):
+        self.Base, self.engine, self.Session = core_db.Base, core_db.engine, core_db.AsyncSessionLocal
+        self.allocator = RoomCodeAllocator(length=2)
+        # 预先算出分配器接下来会给出的号码
+        preview = RoomCodeAllocator(length=2)
+        preview.offset, preview.next_index = self.allocator.offset, self.allocator.next_index
+        self.upcoming = [preview.allocate() for _ in range(3)]
+        super().setUp()
+
+    async def seed(self, db):
+        user = User(username="owner", email="owner@example.com", hashed_password="x")
+        db.add(user)
+        await db.commit()
+        self.user_id = user.id
+
+    def create(self, user_id):
+        async def run(db):
+            return await rooms.create_room(max_players=4, current_user=types.SimpleNamespace(id=user_id), db=db)
+        with mock.patch.object(rooms, "room_code_allocator", self.allocator):
+            return self.run_db(run)
+
+    def test_code_taken_by_another_process_is_skipped(self):
+        async def taken(db):
+            db.add(Room(room_code=self.upcoming[0], max_players=4, created_by=self.user_id))
+            await db.commit()
+        self.run_db(taken)
+
+        result = self.create(self.user_id)
+        self.assertEqual(result["room_code"], self.upcoming[1])
+        # 被占用的号码保持占用，不会再发出去
+        self.assertIn(self.upcoming[0], self.allocator.reserved)
+        self.assertEqual(list(self.allocator.free), [])
+
+    def test_other_integrity_error_releases_code(self):
+        with self.assertRaises(IntegrityError):
+            self.create(None)  # created_by 非空约束失败
+        self.assertNotIn(self.upcoming[0], self.allocator.reserved)
+        # 没用上的号码回池，下次优先复用
+        self.assertEqual(self.create(self.user_id)["room_code"], self.upcoming[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
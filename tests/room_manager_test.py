@@ -0,0 +1,62 @@
+import unittest
+
+from app.game_manager import MajRoom, RoomManager, offline_sid
+
+
+class TestRoomManager(unittest.TestCase):
+    def test_room_of_user(self):
+        manager = RoomManager()
+        room = manager.create_room(1, "room-1")
+        room.add_player("sid-a", 11)
+        room.add_player(offline_sid(12), 12)
+        manager.create_room(2, "room-2").add_player("sid-c", 13)
+
+        self.assertIs(manager.room_of_user(11), room)
+        # 掉线留座的玩家同样算在房间里
+        self.assertIs(manager.room_of_user(12), room)
+        self.assertEqual(manager.room_of_user(13).room_name, "room-2")
+        self.assertIsNone(manager.room_of_user(14))
+
+    def test_user_index_follows_rooms(self):
+        manager = RoomManager()
+        room = manager.create_room(1, "room-1")
+        room.add_player("sid-a", 11)
+        # 重连换 sid 不影响索引
+        room.replace_sid(0, "sid-b")
+        self.assertIs(manager.room_of_user(11), room)
+
+        # 移交/恢复的房间整体登记，替换同名房间时旧房间的座位一起注销
+        moved = MajRoom(1, "room-1")
+        moved.add_player(offline_sid(12), 12)
+        manager.install_room(moved)
+        self.assertIsNone(manager.room_of_user(11))
+        self.assertIs(manager.room_of_user(12), moved)
+        moved.add_player("sid-c", 13)
+        self.assertIs(manager.room_of_user(13), moved)
+
+        manager.remove_room("room-1")
+        self.assertEqual(manager.user_rooms, {})
+        self.assertIsNone(manager.room_of_user(12))
+
+
+class TestMajRoom(unittest.TestCase):
+    def test_no_discard_after_round_ends(self):
+        room = MajRoom(1, "room-1")
+        for user_id in range(4):
+            room.add_player(f"sid-{user_id}", user_id)
+        room.init_game()
+        tile = room.hands["sid-0"][0]
+        # 只有轮到的座位能出手里的牌
+        self.assertTrue(room.can_discard("sid-0", tile))
+        self.assertFalse(room.can_discard("sid-1", room.hands["sid-1"][0]))
+        self.assertFalse(room.can_discard("sid-0", "9z"))
+
+        # 荣和/流局之后同一家再出牌不会再次结算
+        room.end_round()
+        self.assertFalse(room.is_playing)
+        self.assertFalse(room.can_discard("sid-0", tile))
+        self.assertEqual(room.round_index, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
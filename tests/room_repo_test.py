@@ -0,0 +1,88 @@
+import unittest
+
+from db_case import HAS_DB_DEPS as HAS_DEPS, AsyncDBTestCase, memory_core_db
+
+if HAS_DEPS:
+    core_db = memory_core_db()
+    from sqlalchemy import event
+    from core import room_repo
+    from core.room_store import RoomStore
+    from models.user import User
+    from models.room import Room, PlayerInRoom
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+@unittest.skipUnless(HAS_DEPS, "sqlalchemy / aiosqlite not installed")
+class TestRoomQueryBudget(AsyncDBTestCase):
+    ROOMS = 30
+
+    def setUp(self):
+        self.Base, self.engine, self.Session = core_db.Base, core_db.engine, core_db.AsyncSessionLocal
+        super().setUp()
+
+    async def seed(self, db):
+        users = [User(username=f"u{i}", email=f"u{i}@example.com", hashed_password="x") for i in range(4)]
+        db.add_all(users)
+        await db.flush()
+        for r in range(self.ROOMS):
+            room = Room(room_code=f"R{r:04d}", max_players=4, created_by=users[0].id)
+            db.add(room)
+            await db.flush()
+            for u in users[: r % 4 + 1]:
+                db.add(PlayerInRoom(room_id=room.id, user_id=u.id, is_admin=u is users[0]))
+        await db.commit()
+
+    def _count(self, fn):
+        async def run(db):
+            with QueryCounter(self.engine.sync_engine) as counter:
+                result = await fn(db)
+            return result, counter.count
+        return self.run_db(run)
+
+    def test_lobby_is_one_query(self):
+        rooms, queries = self._count(room_repo.list_rooms)
+        self.assertEqual(len(rooms), self.ROOMS)
+        self.assertEqual(queries, 1)
+        counts = {r["room_code"]: r["current_players"] for r in rooms}
+        self.assertEqual(counts["R0003"], 4)
+        self.assertEqual(counts["R0004"], 1)
+
+    def test_room_detail_is_two_queries(self):
+        async def detail(db):
+            return room_repo.room_detail(await room_repo.get_room_with_members(db, "R0003"))
+        room, queries = self._count(detail)
+        self.assertEqual(queries, 2)
+        self.assertEqual([p["username"] for p in room["players"]], ["u0", "u1", "u2", "u3"])
+
+    def test_join_check_is_one_query(self):
+        async def check(db):
+            return await room_repo.get_room_for_join(db, "R0001", 1)
+        (room, count, already_in), queries = self._count(check)
+        self.assertEqual(queries, 1)
+        self.assertEqual((room.room_code, count, already_in), ("R0001", 2, True))
+
+    def test_room_store_load_is_two_queries(self):
+        async def load(db):
+            return await RoomStore().get("R0002", db)
+        state, queries = self._count(load)
+        self.assertEqual(queries, 2)
+        self.assertEqual(len(state.members), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import unittest
+
+from db_case import HAS_DB_DEPS as HAS_DEPS, AsyncDBTestCase, memory_core_db
+
+if HAS_DEPS:
+    core_db = memory_core_db()
+    from sqlalchemy.future import select
+    from core.room_store import RoomStore
+    from models.user import User
+    from models.room import Room, PlayerInRoom
+    from core.room_store import room_store
+    from api.api_v1.endpoints.ws import handle_player_disconnect
+
+
+@unittest.skipUnless(HAS_DEPS, "sqlalchemy / aiosqlite not installed")
+class TestRoomStore(AsyncDBTestCase):
+    def setUp(self):
+        self.Base, self.engine, self.Session = core_db.Base, core_db.engine, core_db.AsyncSessionLocal
+        super().setUp()
+        self.store = RoomStore()
+        self.store._session_factory = self.Session
+
+    async def seed(self, db):
+        users = [User(username=f"u{i}", email=f"u{i}@example.com", hashed_password="x") for i in range(3)]
+        db.add_all(users)
+        await db.flush()
+        room = Room(room_code="ROOM01", max_players=4, created_by=users[0].id)
+        db.add(room)
+        await db.flush()
+        for u in users:
+            db.add(PlayerInRoom(room_id=room.id, user_id=u.id, is_admin=u is users[0]))
+        await db.commit()
+
+    def _load(self):
+        return self.run_db(lambda db: self.store.get("ROOM01", db))
+
+    def _db_ready(self):
+        async def read(db):
+            result = await db.execute(select(PlayerInRoom.user_id, PlayerInRoom.is_ready))
+            return dict(result.all())
+        return self.run_db(read)
+
+    def test_changes_stay_in_memory_until_flush(self):
+        state = self._load()
+        state.members[2].is_ready = True
+        self.store.mark_dirty(state)
+        self.assertEqual(self.store.dirty, {"ROOM01"})
+        self.assertFalse(self._db_ready()[2])
+
+        self.run_async(self.store.flush())
+        self.assertEqual(self.store.dirty, set())
+        self.assertTrue(self._db_ready()[2])
+        # 写回后仍留在内存
+        self.assertIs(self._load(), state)
+
+    def test_flush_failure_keeps_room_dirty(self):
+        state = self._load()
+        state.remove_member(3)
+        self.store.mark_dirty(state)
+
+        async def broken(*rows):
+            raise RuntimeError("db down")
+        original, self.store._write = self.store._write, broken
+        with self.assertRaises(RuntimeError):
+            self.run_async(self.store.flush())
+        self.assertEqual(self.store.dirty, {"ROOM01"})
+
+        self.store._write = original
+        self.run_async(self.store.flush())
+        self.assertEqual(set(self._db_ready()), {1, 2})
+
+    def test_last_member_leaving_deletes_room(self):
+        state = self._load()
+        for user_id in (1, 2, 3):
+            state.remove_member(user_id)
+        self.assertTrue(state.deleted)
+        self.store.mark_dirty(state)
+        self.run_async(self.store.flush_room("ROOM01"))
+        self.assertNotIn("ROOM01", self.store.rooms)
+        self.assertIsNone(self._load())
+
+    def test_evict_writes_changes_made_during_flush(self):
+        state = self._load()
+        state.members[2].is_ready = True
+        self.store.mark_dirty(state)
+        original = self.store._write
+        calls = []
+
+        async def write_with_concurrent_event(*rows):
+            calls.append(rows)
+            if len(calls) == 1:
+                # 写库期间到达的 WebSocket 事件
+                state.members[3].is_ready = True
+                self.store.mark_dirty(state)
+            await original(*rows)
+        self.store._write = write_with_concurrent_event
+
+        self.run_async(self.store.evict("ROOM01"))
+        self.assertEqual(len(calls), 2)
+        self.assertNotIn("ROOM01", self.store.rooms)
+        self.assertEqual(self.store.dirty, set())
+        self.assertEqual(self._db_ready(), {1: False, 2: True, 3: True})
+
+
+class FakeConnections:
+    def __init__(self):
+        self.sent = []
+
+    async def broadcast(self, room_code, message):
+        self.sent.append((room_code, message))
+
+
+@unittest.skipUnless(HAS_DEPS, "sqlalchemy / aiosqlite not installed")
+class TestSocketDisconnect(AsyncDBTestCase):
+    def setUp(self):
+        self.Base, self.engine, self.Session = core_db.Base, core_db.engine, core_db.AsyncSessionLocal
+        super().setUp()
+        room_store._session_factory = self.Session
+
+    def tearDown(self):
+        room_store._session_factory = None
+        room_store.rooms.clear()
+        room_store.dirty.clear()
+        super().tearDown()
+
+    seed = TestRoomStore.seed
+
+    def test_disconnect_after_evict_writes_to_live_state(self):
+        held = self.run_db(lambda db: room_store.get("ROOM01", db))
+        # 最后一个事件之后，REST 加入/离开丢弃了连接手里的状态
+        self.run_async(room_store.evict("ROOM01"))
+        connections = FakeConnections()
+        user = User(id=1, username="u0")
+
+        self.run_async(handle_player_disconnect("ROOM01", user, connections))
+        self.run_async(room_store.flush())
+
+        async def members(db):
+            result = await db.execute(select(PlayerInRoom.user_id, PlayerInRoom.is_admin))
+            return dict(result.all())
+        # 成员行已删除，管理员转给了下一个玩家
+        self.assertEqual(self.run_db(members), {2: True, 3: False})
+        self.assertIn(1, held.members)
+        self.assertEqual(connections.sent[0][1]["data"]["new_admin"]["user_id"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from unittest import mock
+
+from db_case import HAS_DB_DEPS as HAS_DEPS, AsyncDBTestCase
+
+if HAS_DEPS:
+    from app.database import Base
+    from app.models import User
+    from app.sessions import SessionStore
+
+
+@unittest.skipUnless(HAS_DEPS, "sqlalchemy / aiosqlite not installed")
+class TestSessionStore(AsyncDBTestCase):
+    def setUp(self):
+        self.Base = Base
+        super().setUp()
+
+    async def seed(self, db):
+        self.user = User(username="alice", email="a@example.com", hashed_password="x")
+        db.add(self.user)
+        await db.commit()
+
+    def test_refresh_hits_cache_then_survives_restart(self):
+        store = SessionStore()
+        token, entry = self.run_db(lambda db: store.create(db, self.user))
+
+        found = self.run_db(lambda db: store.get_by_token(db, token))
+        self.assertEqual((found.user_id, found.username), (self.user.id, "alice"))
+        self.assertEqual((store.hits, store.misses), (1, 0))
+
+        # 新进程：缓存为空，查一次库后再命中缓存
+        restarted = SessionStore()
+        self.assertEqual(self.run_db(lambda db: restarted.get_by_id(db, entry.id)).username, "alice")
+        self.assertIsNotNone(self.run_db(lambda db: restarted.get_by_token(db, token)))
+        self.assertEqual((restarted.hits, restarted.misses), (1, 1))
+
+        self.assertIsNone(self.run_db(lambda db: store.get_by_token(db, "wrong-token")))
+
+    def test_revoke(self):
+        store = SessionStore()
+        token, entry = self.run_db(lambda db: store.create(db, self.user))
+        self.assertTrue(self.run_db(lambda db: store.revoke(db, token)))
+        self.assertIsNone(self.run_db(lambda db: store.get_by_id(db, entry.id)))
+        self.assertIsNone(self.run_db(lambda db: SessionStore().get_by_token(db, token)))
+
+    def test_rotate_replaces_token(self):
+        store = SessionStore()
+        token, entry = self.run_db(lambda db: store.create(db, self.user))
+        session = self.run_db(lambda db: store.get_by_token(db, token))
+        new_token = self.run_db(lambda db: store.rotate(db, session))
+        self.assertNotEqual(new_token, token)
+        self.assertIsNone(self.run_db(lambda db: store.get_by_token(db, token)))
+        self.assertIsNone(self.run_db(lambda db: SessionStore().get_by_token(db, token)))
+        # 会话 id 不变，绑定会话的 access token / 票据继续有效
+        self.assertEqual(self.run_db(lambda db: SessionStore().get_by_token(db, new_token)).id, entry.id)
+        # 同一个旧令牌被重复使用 (另一个进程拿着旧缓存) 时轮换失败
+        self.assertIsNone(self.run_db(lambda db: SessionStore().rotate(db, session)))
+
+    def test_revoke_reaches_other_process_after_ttl(self):
+        here, there = SessionStore(ttl=30), SessionStore(ttl=30)
+        token, entry = self.run_db(lambda db: here.create(db, self.user))
+        self.assertIsNotNone(self.run_db(lambda db: there.get_by_id(db, entry.id)))
+        self.run_db(lambda db: here.revoke(db, token))
+        # 另一个进程在 ttl 内仍命中旧缓存，过期后回库看到吊销
+        self.assertIsNotNone(self.run_db(lambda db: there.get_by_id(db, entry.id)))
+        later = mock.patch("app.sessions.time.monotonic", return_value=10 ** 9)
+        with later:
+            self.assertIsNone(self.run_db(lambda db: there.get_by_id(db, entry.id)))
+        self.assertEqual(there.misses, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+from unittest import mock
+
+from db_case import HAS_DB_DEPS as HAS_DEPS, AsyncDBTestCase
+
+if HAS_DEPS:
+    from sqlalchemy.exc import IntegrityError
+    from app.database import Base
+    from app.models import User
+    from app.stats import StatsWriter, load_profile, round_deltas
+
+RON = {
+    "type": "ron", "winner": 1, "from": 2,
+    "result": {
+        "han": 3,
+        "yakus": [("yaku.tanyao", 1), ("yaku.dora", 2), ("yaku.ura_dora", 0)],
+        "yakuman": 0,
+        "yakuman_yakus": [],
+    },
+}
+
+
+@unittest.skipUnless(HAS_DEPS, "sqlalchemy / aiosqlite not installed")
+class TestStats(AsyncDBTestCase):
+    def setUp(self):
+        self.Base = Base
+        super().setUp()
+
+    async def seed(self, db):
+        users = [User(username=f"p{i}", email=f"p{i}@example.com", hashed_password="x") for i in range(4)]
+        db.add_all(users)
+        await db.commit()
+        self.ids = [u.id for u in users]
+
+    def profile(self, user_id):
+        return self.run_db(lambda db: load_profile(db, user_id))
+
+    def test_round_deltas(self):
+        deltas = round_deltas(self.ids, RON)
+        self.assertEqual([d.games for d in deltas.values()], [1, 1, 1, 1])
+        winner, loser = deltas[self.ids[1]], deltas[self.ids[2]]
+        self.assertEqual((winner.wins, winner.han_total, loser.deal_ins), (1, 3, 1))
+        # 0 番的里宝牌条目不计入
+        self.assertEqual(winner.yaku, {"yaku.tanyao": 1, "yaku.dora": 1})
+
+    def test_flush_accumulates(self):
+        writer = StatsWriter()
+        writer._session_factory = self.Session
+
+        writer.submit(self.ids, RON)
+        writer.submit(self.ids, {"type": "ryuukyoku"})
+        self.run_async(writer.flush())
+        self.assertEqual(writer.pending, {})
+
+        # 第二次写入走 UPDATE 累加，不覆盖
+        writer.submit(self.ids, dict(RON, result=dict(RON["result"], han=5, yakus=[("yaku.tanyao", 1)])))
+        self.run_async(writer.flush())
+
+        winner = self.profile(self.ids[1])
+        self.assertEqual((winner["games"], winner["wins"], winner["deal_ins"]), (3, 2, 0))
+        self.assertEqual(winner["avg_han"], 4.0)
+        self.assertEqual(winner["yaku"], {"yaku.tanyao": 2, "yaku.dora": 1})
+        self.assertEqual(self.profile(self.ids[2])["deal_ins"], 2)
+        self.assertEqual(self.profile(self.ids[0])["yaku"], {})
+        self.assertIsNone(self.profile(9999))
+
+    def test_stop_retries_duplicate_first_row(self):
+        writer = StatsWriter()
+        writer._session_factory = self.Session
+        writer.submit(self.ids, RON)
+        original = StatsWriter._apply
+        calls = []
+
+        async def apply_after_race(db, user_id, delta):
+            calls.append(user_id)
+            if len(calls) == 1:
+                # 另一个进程抢先插入了同一玩家的首行
+                raise IntegrityError("INSERT INTO user_stats", {}, Exception("duplicate"))
+            await original(db, user_id, delta)
+
+        with mock.patch.object(StatsWriter, "_apply", staticmethod(apply_after_race)):
+            self.run_async(writer.stop())
+        self.assertEqual(writer.pending, {})
+        self.assertEqual(self.profile(self.ids[1])["wins"], 1)
+        self.assertEqual(self.profile(self.ids[2])["deal_ins"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
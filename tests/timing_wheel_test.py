@@ -0,0 +1,72 @@
+import asyncio
+import contextlib
+import io
+import random
+import unittest
+
+from app.timing_wheel import TimingWheel
+
+
+class TestTimingWheel(unittest.TestCase):
+    def test_fires_on_expiry_tick_across_levels(self):
+        # 小轮子 (4 格 × 3 层 = 64 tick) 方便覆盖下放和溢出
+        wheel = TimingWheel(tick=1.0, slots=4, levels=3)
+        rng = random.Random(7)
+        fired = []
+        expected = {}
+        for i in range(300):
+            delay = rng.randint(1, 150)
+            wheel.schedule(delay, lambda i=i: fired.append((wheel.current, i)))
+            expected[i] = delay
+        wheel.advance(200)
+        self.assertEqual(sorted(fired), sorted((d, i) for i, d in expected.items()))
+        self.assertEqual(wheel.pending(), 0)
+
+    def test_cancel_and_schedule_mid_run(self):
+        wheel = TimingWheel(tick=0.1, slots=8, levels=2)
+        fired = []
+        keep = wheel.schedule(0.5, fired.append, "keep")
+        drop = wheel.schedule(0.5, fired.append, "drop")
+        wheel.advance(3)
+        drop.cancel()
+        later = wheel.schedule(2.0, fired.append, "later")
+        self.assertEqual(wheel.advance(2), 1)
+        self.assertEqual(fired, ["keep"])
+        self.assertIsNone(keep.slot)
+        wheel.advance(20)
+        self.assertEqual(fired, ["keep", "later"])
+        self.assertEqual(later.expires, 3 + 20)
+
+    def test_coroutine_callback_is_kept_and_errors_reported(self):
+        wheel = TimingWheel(tick=1.0, slots=4, levels=2)
+        done = []
+
+        async def ok():
+            await asyncio.sleep(0)
+            done.append("ok")
+
+        async def broken():
+            raise RuntimeError("boom")
+
+        async def run():
+            wheel.schedule(1, ok)
+            wheel.schedule(1, broken)
+            wheel.advance(1)
+            self.assertEqual(len(wheel._callback_tasks), 2)
+            for _ in range(3):
+                await asyncio.sleep(0)
+
+        output = io.StringIO()
+        loop = asyncio.new_event_loop()
+        try:
+            with contextlib.redirect_stdout(output):
+                loop.run_until_complete(run())
+        finally:
+            loop.close()
+        self.assertEqual(done, ["ok"])
+        self.assertEqual(wheel._callback_tasks, set())
+        self.assertIn("Timer callback error: boom", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import time
+import unittest
+from unittest import mock
+
+from jose import JWTError, jwt
+
+from core.token_cache import TokenVerifier
+
+SECRET = "test-secret"
+ALG = "HS256"
+
+
+def make_token(sub: str, exp: float, secret: str = SECRET, algorithm: str = ALG) -> str:
+    return jwt.encode({"sub": sub, "exp": int(exp)}, secret, algorithm=algorithm)
+
+
+class TestTokenVerifier(unittest.TestCase):
+    def test_second_decode_hits_cache(self):
+        verifier = TokenVerifier()
+        token = make_token("alice", time.time() + 60)
+        first = verifier.decode(token, SECRET, ALG)
+        second = verifier.decode(token, SECRET, ALG)
+        self.assertEqual(first, second)
+        self.assertEqual(first["sub"], "alice")
+        self.assertEqual(verifier.stats(), {"size": 1, "hits": 1, "misses": 1})
+        # 返回的是副本，调用方改了不影响缓存
+        second["sub"] = "mallory"
+        self.assertEqual(verifier.decode(token, SECRET, ALG)["sub"], "alice")
+
+    def test_entry_expires_at_exp(self):
+        verifier = TokenVerifier()
+        exp = int(time.time()) + 60
+        token = make_token("alice", exp)
+        verifier.decode(token, SECRET, ALG)
+        with mock.patch("core.token_cache.time.time", return_value=exp - 1):
+            verifier.decode(token, SECRET, ALG)
+        self.assertEqual(verifier.hits, 1)
+        # 到了 exp 缓存不再命中，重新走签名校验
+        with mock.patch("core.token_cache.time.time", return_value=exp):
+            verifier.decode(token, SECRET, ALG)
+        self.assertEqual(verifier.hits, 1)
+        self.assertEqual(verifier.misses, 2)
+
+    def test_expired_token_is_rejected(self):
+        verifier = TokenVerifier()
+        token = make_token("alice", time.time() - 10)
+        with self.assertRaises(JWTError):
+            verifier.decode(token, SECRET, ALG)
+        self.assertEqual(verifier.stats()["size"], 0)
+
+    def test_lru_eviction(self):
+        verifier = TokenVerifier(max_size=2)
+        exp = time.time() + 60
+        a, b, c = (make_token(name, exp) for name in ("a", "b", "c"))
+        verifier.decode(a, SECRET, ALG)
+        verifier.decode(b, SECRET, ALG)
+        verifier.decode(a, SECRET, ALG)  # a 变成最近使用
+        verifier.decode(c, SECRET, ALG)  # 挤掉最久未用的 b
+        self.assertEqual(verifier.stats()["size"], 2)
+        hits = verifier.hits
+        verifier.decode(a, SECRET, ALG)
+        self.assertEqual(verifier.hits, hits + 1)
+        verifier.decode(b, SECRET, ALG)
+        self.assertEqual(verifier.hits, hits + 1)
+
+    def test_key_and_algorithm_are_part_of_cache_key(self):
+        verifier = TokenVerifier()
+        token = make_token("alice", time.time() + 60)
+        verifier.decode(token, SECRET, ALG)
+        with self.assertRaises(JWTError):
+            verifier.decode(token, "other-secret", ALG)
+        with self.assertRaises(JWTError):
+            verifier.decode(token, SECRET, "HS512")
+        self.assertEqual(verifier.hits, 0)
+
+    def test_invalidate(self):
+        verifier = TokenVerifier()
+        token = make_token("alice", time.time() + 60)
+        verifier.decode(token, SECRET, ALG)
+        verifier.invalidate(token, SECRET, ALG)
+        verifier.decode(token, SECRET, ALG)
+        self.assertEqual(verifier.stats(), {"size": 1, "hits": 0, "misses": 2})
+
+if __name__ == '__main__':
+    unittest.main()
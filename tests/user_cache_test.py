@@ -0,0 +1,73 @@
+import unittest
+
+from db_case import HAS_DB_DEPS as HAS_DEPS, AsyncDBTestCase
+
+if HAS_DEPS:
+    from sqlalchemy.future import select
+    from app.database import Base
+    from app.models import User
+    from core.user_cache import UserCache, watch_user_model
+
+
+@unittest.skipUnless(HAS_DEPS, "sqlalchemy / aiosqlite not installed")
+class TestUserCache(AsyncDBTestCase):
+    def setUp(self):
+        self.Base = Base
+        self.cache = UserCache(ttl=60)
+        self.unwatch = watch_user_model(self.cache, User)
+        self.loads = 0
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        self.unwatch()
+
+    async def seed(self, db):
+        db.add(User(username="alice", email="a@example.com", hashed_password="x", points=1000))
+        await db.commit()
+
+    def get(self, user_id=1):
+        async def run(db):
+            async def load(uid):
+                self.loads += 1
+                return (await db.execute(select(User).where(User.id == uid))).scalars().first()
+            return await self.cache.get(user_id, load)
+        return self.run_db(run)
+
+    def update(self, **values):
+        async def run(db):
+            user = (await db.execute(select(User).where(User.id == 1))).scalars().first()
+            for name, value in values.items():
+                setattr(user, name, value)
+            await db.commit()
+        self.run_db(run)
+
+    def test_read_through(self):
+        self.assertEqual(self.get().username, "alice")
+        self.assertEqual(self.get().points, 1000)
+        self.assertEqual(self.loads, 1)
+        self.assertIsNone(self.get(42))
+
+    def test_invalidated_on_points_and_active_change(self):
+        self.get()
+        self.update(points=1500)
+        self.assertEqual(self.get().points, 1500)
+        self.update(is_active=False)
+        self.assertFalse(self.get().is_active)
+        self.assertEqual(self.loads, 3)
+
+    def test_unrelated_change_keeps_entry(self):
+        self.get()
+        self.update(email="alice@example.com")
+        self.get()
+        self.assertEqual(self.loads, 1)
+
+    def test_ttl(self):
+        self.cache.ttl = 0
+        self.get()
+        self.get()
+        self.assertEqual(self.loads, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import json
+import unittest
+from app.utils.wire_codec import encode_tile, decode_tile, encode_frame, decode_frame, WireDecodeError
+
+class TestWireCodec(unittest.TestCase):
+    def test_tile_round_trip(self):
+        tiles = ["{}{}".format(n, s) for s in "mps" for n in range(10)] + ["{}z".format(n) for n in range(1, 8)]
+        for tile in tiles:
+            with self.subTest(tile=tile):
+                byte = encode_tile(tile)
+                self.assertLess(byte, 256)
+                self.assertEqual(decode_tile(byte), tile)
+
+    def test_frame_round_trip(self):
+        events = [
+            ("player_discard", {"seat": 0, "user_id": 300, "tile": "0p"}, 17),
+            ("player_draw", {"tile": "7z"}, 18),
+            ("player_draw_secret", {"user_idx": 1}, 19),
+            ("game_start", {"seat": 2, "hand": ["1m", "5z", "9s"], "dora": "1m"}, 0),
+        ]
+        self.assertEqual(decode_frame(encode_frame(events)), events)
+
+    def test_extra_fields_are_dropped(self):
+        frame = encode_frame([("player_discard", {"sid": "abc", "seat": 1, "user_id": 2, "tile": "1m"}, 0)])
+        self.assertEqual(decode_frame(frame), [("player_discard", {"seat": 1, "user_id": 2, "tile": "1m"}, 0)])
+
+    def test_unknown_event_falls_back(self):
+        self.assertIsNone(encode_frame([("room_joined", {"room_name": "a"}, 0)]))
+        self.assertIsNone(encode_frame([("player_draw", {}, 0)]))
+
+    def test_smaller_than_json(self):
+        data = {"sid": "Zx8s7a6d5f4g3h2j", "seat": 3, "user_id": 1024, "tile": "5s"}
+        frame = encode_frame([("player_discard", data, 1000)])
+        self.assertLess(len(frame) * 8, len(json.dumps(["player_discard", data])))
+
+    def test_truncated_frame(self):
+        frame = encode_frame([("game_start", {"seat": 2, "hand": ["1m", "2m"], "dora": "1m"}, 0)])
+        with self.assertRaises(WireDecodeError):
+            decode_frame(frame[:-2])
+
+if __name__ == '__main__':
+    unittest.main()